@@ -1,12 +1,16 @@
-import io
+import os
 
-from fastapi import APIRouter, Depends, File, UploadFile, Query
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Query, status
 from fastapi.responses import StreamingResponse
 
 from app.api import deps
+from app.services.bulk_export import MEDIA_TYPES
+from app.services.bulk_io import spool_upload
+from app.services.bulk_jobs import FILE_PREFIX, BulkJobStore, is_job_id, job_dir, job_view, new_job_id
 from app.services.bulk_service import BulkService, BulkImportMode
-from app.db import get_db_session
+from app.db import SessionLocal, get_db_session
 from app.graph.client import neo4j_dependency
+from app.core.cache import job_redis_dependency, redis_dependency
 
 router = APIRouter(prefix="/bulk", tags=["import_export"])
 
@@ -20,34 +24,122 @@ async def bulk_import(
     session=Depends(get_db_session),
     current_user=Depends(deps.get_current_user),
     neo4j_driver=Depends(neo4j_dependency),
+    redis=Depends(redis_dependency),
 ):
-    content = await file.read()
-    service = BulkService(session, lineage_driver=neo4j_driver)
-    return await service.bulk_import(
-        file_bytes=content,
-        file_format=format,
-        mode=mode,
-        rollback_on_error=rollback_on_error,
-    )
+    # spooled to disk and parsed in chunks, so a large upload never sits in memory
+    path = await spool_upload(file)
+    try:
+        service = BulkService(session, lineage_driver=neo4j_driver, redis=redis)
+        return await service.bulk_import(
+            file_path=path,
+            file_format=format,
+            mode=mode,
+            rollback_on_error=rollback_on_error,
+        )
+    finally:
+        os.unlink(path)
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_bulk_job(
+    file: UploadFile = File(...),
+    format: str = Query(..., alias="format"),
+    mode: str = Query(BulkImportMode.EXECUTE),
+    current_user=Depends(deps.get_current_user),
+    redis=Depends(job_redis_dependency),
+):
+    BulkService.check_import_args(format, mode)
+    job_id = new_job_id()
+    path = await spool_upload(file, directory=job_dir(), prefix=f"{FILE_PREFIX}{job_id}-")
+    try:
+        job = await BulkJobStore(redis).create(
+            job_id,
+            path=path,
+            file_format=format,
+            mode=mode,
+            created_by=str(current_user.id),
+        )
+    except BaseException:
+        os.unlink(path)
+        raise
+    return job_view(job)
+
+
+async def _job_or_404(store: BulkJobStore, job_id: str) -> dict:
+    job = await store.get(job_id) if is_job_id(job_id) else None
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_bulk_job(
+    job_id: str,
+    current_user=Depends(deps.get_current_user),
+    redis=Depends(job_redis_dependency),
+):
+    return job_view(await _job_or_404(BulkJobStore(redis), job_id))
+
+
+@router.get("/jobs/{job_id}/errors")
+async def get_bulk_job_errors(
+    job_id: str,
+    chunk: int | None = Query(None, ge=0),
+    current_user=Depends(deps.get_current_user),
+    redis=Depends(job_redis_dependency),
+):
+    store = BulkJobStore(redis)
+    job = await _job_or_404(store, job_id)
+    return {"job_id": job_id, "error_count": job["error_count"], "chunks": await store.errors(job_id, chunk)}
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_bulk_job(
+    job_id: str,
+    current_user=Depends(deps.get_current_user),
+    redis=Depends(job_redis_dependency),
+):
+    store = BulkJobStore(redis)
+    await _job_or_404(store, job_id)
+    job = await store.request_cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Bulk job has already finished")
+    return job_view(job)
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_bulk_job(
+    job_id: str,
+    current_user=Depends(deps.get_current_user),
+    redis=Depends(job_redis_dependency),
+):
+    store = BulkJobStore(redis)
+    await _job_or_404(store, job_id)
+    job = await store.resume(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only a failed job (or one whose worker stopped) with its upload still kept can be resumed",
+        )
+    return job_view(job)
 
 
 @router.get("/export")
 async def bulk_export(
     format: str = Query(...),
-    session=Depends(get_db_session),
     current_user=Depends(deps.get_current_user),
+    neo4j_driver=Depends(neo4j_dependency),
 ):
-    service = BulkService(session)
-    data = await service.bulk_export(file_format=format)
-    media_types = {
-        "csv": "text/csv",
-        "json": "application/json",
-        "yaml": "application/x-yaml",
-        "yml": "application/x-yaml",
-        "xlsx": "application/vnd.ms-excel",
-    }
+    BulkService.check_export_format(format)
+
+    async def stream():
+        # own session: a dependency's session is closed before a streamed body is sent
+        async with SessionLocal() as session:
+            async for block in BulkService(session, lineage_driver=neo4j_driver).bulk_export(file_format=format):
+                yield block
+
     return StreamingResponse(
-        io.BytesIO(data),
-        media_type=media_types.get(format, "application/octet-stream"),
-        headers={"Content-Disposition": f'attachment; filename="metadata.{format}"'},
+        stream(),
+        media_type=MEDIA_TYPES[format.lower()],
+        headers={"Content-Disposition": f'attachment; filename="metadata.{format.lower()}"'},
     )
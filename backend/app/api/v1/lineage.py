@@ -1,6 +1,8 @@
+import json
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 
 from app.api import deps
 from app.schemas.user import User
@@ -11,13 +13,19 @@ from app.schemas.lineage import (
     FieldLineageCreateRequest,
     LineageRelationship,
     PathsResponse,
+    ReachabilityResponse,
     CycleListResponse,
     ImpactAnalysisResponse,
+    ChangeSetImpactRequest,
+    ChangeSetImpactResponse,
     LineageRelationshipDetail,
+    TableLineageBatchRequest,
+    FieldLineageBatchRequest,
+    LineageBatchResponse,
 )
 from app.services.lineage_service import LineageService
 from app.graph.client import neo4j_dependency
-from app.db import get_db_session
+from app.db import SessionLocal, get_db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.cache import redis_dependency
 
@@ -59,6 +67,28 @@ async def create_field_lineage(
     )
 
 
+@router.post("/table/batch", response_model=LineageBatchResponse)
+async def create_table_lineage_batch(
+    payload: TableLineageBatchRequest,
+    driver=Depends(neo4j_dependency),
+    redis=Depends(redis_dependency),
+    current_user: Annotated[User, Depends(deps.get_current_user)] = None,
+):
+    service = LineageService(driver, redis=redis)
+    return await service.create_table_lineage_batch(payload.items)
+
+
+@router.post("/field/batch", response_model=LineageBatchResponse)
+async def create_field_lineage_batch(
+    payload: FieldLineageBatchRequest,
+    driver=Depends(neo4j_dependency),
+    redis=Depends(redis_dependency),
+    current_user: Annotated[User, Depends(deps.get_current_user)] = None,
+):
+    service = LineageService(driver, redis=redis)
+    return await service.create_field_lineage_batch(payload.items)
+
+
 @router.get("/table/{table_id}/upstream", response_model=LineageGraphResponse)
 async def get_upstream(
     table_id: str,
@@ -90,12 +120,13 @@ async def get_graph(
     table_id: str,
     direction: str = "downstream",
     depth: int = 3,
+    granularity: str = "field",
     driver=Depends(neo4j_dependency),
     redis=Depends(redis_dependency),
     session: AsyncSession = Depends(get_db_session),
 ):
     service = LineageService(driver, db_session=session, redis=redis)
-    return await service.get_graph(table_id=table_id, depth=depth, direction=direction)
+    return await service.get_graph(table_id=table_id, depth=depth, direction=direction, granularity=granularity)
 
 
 @router.delete("/{rel_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -128,12 +159,61 @@ async def find_paths(
     end_node_id: str,
     max_depth: int = 20,
     shortest_only: bool = False,
+    limit: int | None = None,
+    weight: str = "hops",
     driver=Depends(neo4j_dependency),
     redis=Depends(redis_dependency),
     session: AsyncSession = Depends(get_db_session),
 ):
     service = LineageService(driver, db_session=session, redis=redis)
-    return await service.find_paths(start_id=start_node_id, end_id=end_node_id, max_depth=max_depth, shortest_only=shortest_only)
+    return await service.find_paths(
+        start_id=start_node_id,
+        end_id=end_node_id,
+        max_depth=max_depth,
+        shortest_only=shortest_only,
+        limit=limit,
+        weight=weight,
+    )
+
+
+@router.get("/reachable", response_model=ReachabilityResponse)
+async def is_reachable(
+    from_id: str = Query(..., alias="from"),
+    to_id: str = Query(..., alias="to"),
+    driver=Depends(neo4j_dependency),
+):
+    service = LineageService(driver)
+    return await service.is_reachable(from_id=from_id, to_id=to_id)
+
+
+@router.get("/paths/stream")
+async def stream_paths(
+    start_node_id: str,
+    end_node_id: str,
+    max_depth: int = 20,
+    shortest_only: bool = False,
+    limit: int | None = None,
+    weight: str = "hops",
+    driver=Depends(neo4j_dependency),
+):
+    service = LineageService(driver)
+    events = service.stream_paths(
+        start_id=start_node_id,
+        end_id=end_node_id,
+        max_depth=max_depth,
+        shortest_only=shortest_only,
+        limit=limit,
+        weight=weight,
+    )
+
+    async def event_stream():
+        # request-scoped dependencies may be torn down while the body streams; enrich with our own session
+        async with SessionLocal() as session:
+            service.db_session = session
+            async for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @router.get("/cycles", response_model=CycleListResponse)
@@ -175,6 +255,17 @@ async def blast_radius(
     return await service.blast_radius(table_id=table_id, direction=direction, depth=depth, granularity=granularity)
 
 
+@router.post("/analysis/blast-radius/batch", response_model=ChangeSetImpactResponse)
+async def change_set_impact(
+    payload: ChangeSetImpactRequest,
+    driver=Depends(neo4j_dependency),
+    redis=Depends(redis_dependency),
+    session: AsyncSession = Depends(get_db_session),
+):
+    service = LineageService(driver, db_session=session, redis=redis)
+    return await service.change_set_impact(root_ids=payload.root_ids, direction=payload.direction, depth=payload.depth)
+
+
 @router.get("/analysis/quality-check/{table_id}")
 async def quality_check(
     table_id: str,
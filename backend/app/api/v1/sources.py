@@ -13,6 +13,7 @@ from app.repositories.audit_repo import ConnectionTestLogRepository
 from app.models.audit import ConnectionTestLog
 from app.api import deps
 from app.services.tag_service import TagService
+from app.core.cache import redis_dependency
 
 router = APIRouter(prefix="/sources", tags=["sources"])
 
@@ -53,8 +54,9 @@ async def update_source(
     source_id: str,
     payload: SourceUpdate,
     session: AsyncSession = Depends(get_db_session),
+    redis=Depends(redis_dependency),
 ):
-    service = SourceService(session)
+    service = SourceService(session, redis=redis)
     return await service.update_source(source_id, payload)
 
 
@@ -62,8 +64,9 @@ async def update_source(
 async def delete_source(
     source_id: str,
     session: AsyncSession = Depends(get_db_session),
+    redis=Depends(redis_dependency),
 ):
-    service = SourceService(session)
+    service = SourceService(session, redis=redis)
     await service.delete_source(source_id)
     return None
 
@@ -8,7 +8,6 @@ from app.services.field_service import FieldService
 from app.services.tag_service import TagService
 from app.schemas.field import FieldList, FieldCreate, FieldCreateInTable, Field
 from app.db import get_db_session
-from app.graph.client import neo4j_dependency
 
 router = APIRouter(prefix="/tables", tags=["tables"])
 
@@ -23,9 +22,21 @@ async def list_tables(
     tags: str | None = None,
     tag_match: str | None = "any",
     include_subtags: bool = False,
+    sort: str | None = None,
+    order: str = "desc",
+    min_downstream: int | None = None,
+    min_upstream: int | None = None,
+    min_domains: int | None = None,
+    min_depth: int | None = None,
 ):
     table_service = TableService(session)
     tag_ids = tags.split(",") if tags else None
+    min_metrics = {
+        "downstream_count": min_downstream,
+        "upstream_count": min_upstream,
+        "impacted_domains": min_domains,
+        "max_depth": min_depth,
+    }
     items, total = await table_service.list_tables(
         page=page,
         size=size,
@@ -34,14 +45,17 @@ async def list_tables(
         tag_ids=tag_ids,
         tag_match=tag_match,
         include_subtags=include_subtags,
+        sort=sort,
+        order=order,
+        min_metrics=min_metrics,
     )
     pages = (total + size - 1) // size if size else 0
     return TableList(total=total, page=page, size=size, pages=pages, items=items)
 
 
 @router.post("", response_model=Table, status_code=status.HTTP_201_CREATED)
-async def create_table(payload: TableCreate, session: AsyncSession = Depends(get_db_session), neo4j_driver=Depends(neo4j_dependency)):
-    table_service = TableService(session, lineage_driver=neo4j_driver)
+async def create_table(payload: TableCreate, session: AsyncSession = Depends(get_db_session)):
+    table_service = TableService(session)
     return await table_service.create_table(payload)
 
 
@@ -59,22 +73,21 @@ async def update_table(
     table_id: str,
     payload: TableUpdate,
     session: AsyncSession = Depends(get_db_session),
-    neo4j_driver=Depends(neo4j_dependency),
 ):
-    table_service = TableService(session, lineage_driver=neo4j_driver)
+    table_service = TableService(session)
     return await table_service.update_table(table_id, payload)
 
 
 @router.delete("/{table_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_table(table_id: str, session: AsyncSession = Depends(get_db_session), neo4j_driver=Depends(neo4j_dependency)):
-    table_service = TableService(session, lineage_driver=neo4j_driver)
+async def delete_table(table_id: str, session: AsyncSession = Depends(get_db_session)):
+    table_service = TableService(session)
     await table_service.delete_table(table_id)
     return None
 
 
 @router.get("/{table_id}/fields", response_model=FieldList, tags=["fields"])
-async def list_table_fields(table_id: str, session: AsyncSession = Depends(get_db_session), neo4j_driver=Depends(neo4j_dependency)):
-    field_service = FieldService(session, lineage_driver=neo4j_driver)
+async def list_table_fields(table_id: str, session: AsyncSession = Depends(get_db_session)):
+    field_service = FieldService(session)
     fields = await field_service.list_fields_for_table(table_id)
     return FieldList(items=fields)
 
@@ -84,9 +97,8 @@ async def create_field_for_table(
     table_id: str,
     payload: FieldCreateInTable,
     session: AsyncSession = Depends(get_db_session),
-    neo4j_driver=Depends(neo4j_dependency),
 ):
-    field_service = FieldService(session, lineage_driver=neo4j_driver)
+    field_service = FieldService(session)
     created = await field_service.create_field(payload, table_id=table_id)
     return created
 
@@ -96,9 +108,8 @@ async def batch_create_fields(
     table_id: str,
     payload: list[FieldCreateInTable],
     session: AsyncSession = Depends(get_db_session),
-    neo4j_driver=Depends(neo4j_dependency),
 ):
-    field_service = FieldService(session, lineage_driver=neo4j_driver)
+    field_service = FieldService(session)
     created = await field_service.create_fields_batch(table_id=table_id, payloads=payload)
     return FieldList(items=created)
 
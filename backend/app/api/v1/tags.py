@@ -16,12 +16,16 @@ from app.schemas.tag import (
 )
 from app.services.tag_service import TagService
 from app.db import get_db_session
+from app.core.cache import redis_dependency
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
 
-def get_tag_service(session: AsyncSession = Depends(get_db_session)) -> TagService:
-    return TagService(session)
+def get_tag_service(
+    session: AsyncSession = Depends(get_db_session),
+    redis=Depends(redis_dependency),
+) -> TagService:
+    return TagService(session, redis=redis)
 
 
 @router.get("", response_model=TagTreeResponse)
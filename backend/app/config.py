@@ -33,7 +33,7 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str | None = None
     ADMIN_PASSWORD: str | None = None
 
-    # Celery (phase 4+)
+    # Celery (phase 4+); the broker Redis also holds the bulk job queue (REDIS_URL when unset)
     CELERY_BROKER_URL: str | None = None
     CELERY_RESULT_BACKEND: str | None = None
 
@@ -52,6 +52,51 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = 20
     DB_MAX_OVERFLOW: int = 10
     REDIS_POOL_SIZE: int = 10
+    NEO4J_MAX_POOL_SIZE: int = 50
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 30.0  # seconds
+    NEO4J_MAX_CONNECTION_LIFETIME: int = 3600  # seconds
+
+    # Lineage
+    LINEAGE_PROJECTION_ENABLED: bool = False
+    LINEAGE_PROJECTION_REFRESH_SECONDS: int = 300
+    LINEAGE_L1_MAX_ENTRIES: int = 1024
+    LINEAGE_L1_MAX_BYTES: int = 64 * 1024 * 1024
+    LINEAGE_CACHE_STALE_SECONDS: int = 300  # serve-stale window after TTL expiry
+    LINEAGE_CACHE_LOCK_MS: int = 10000  # cross-worker recompute lock
+    LINEAGE_CACHE_COMPRESS_MIN_BYTES: int = 2048  # compress cached payloads at or above this size
+    LINEAGE_BATCH_CHUNK_SIZE: int = 1000  # lineage edges per write transaction
+    LINEAGE_CYCLE_SAMPLES: int = 10  # representative cycles stored per strongly connected component
+    LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES: int = 200  # queued edges folded in per poll; larger batches mark the index for a rebuild
+    LINEAGE_CYCLE_REBUILD_SECONDS: int = 3600  # periodic full rebuild; 0 disables
+    LINEAGE_CYCLE_POLL_SECONDS: float = 30.0  # how often queued lineage inserts are folded into the cycle index
+    LINEAGE_INDEX_LEASE_SECONDS: int = 120  # lease letting one app process run each index loop; above the poll intervals
+    LINEAGE_CRITICALITY_REBUILD_SECONDS: int = 3600  # periodic full recompute of table criticality; 0 disables
+    LINEAGE_CRITICALITY_POLL_SECONDS: float = 30.0  # how often lineage writes are folded into the metrics
+    LINEAGE_CRITICALITY_SKETCH_SIZE: int = 64  # bottom-k sketch size; counts below this are exact
+    LINEAGE_CRITICALITY_INCREMENTAL_MAX_NODES: int = 20000  # larger affected regions trigger a full recompute
+    LINEAGE_ENRICH_TTL_SECONDS: int = 3600  # cached table name/source/primary tag used to decorate lineage nodes
+    LINEAGE_TRACE_MAX_RESULTS: int = 5000  # fields returned per direction by the field trace
+    LINEAGE_PATHS_DEFAULT_LIMIT: int = 10  # paths returned by find_paths unless `limit` is given
+    LINEAGE_PATHS_MAX_LIMIT: int = 100  # hard cap on `limit`
+    LINEAGE_PATHS_TIMEOUT_MS: int = 2000  # search budget; results found so far are returned as truncated
+
+    # Graph outbox (Postgres -> Neo4j node sync)
+    GRAPH_OUTBOX_ENABLED: bool = True
+    GRAPH_OUTBOX_BATCH_SIZE: int = 500  # events claimed per dispatch
+    GRAPH_OUTBOX_POLL_SECONDS: float = 2.0  # idle poll interval when no commit wakes the dispatcher
+    GRAPH_OUTBOX_MAX_BACKOFF_SECONDS: int = 300  # retry delay cap for failing events
+
+    # Bulk import/export
+    BULK_IMPORT_CHUNK_SIZE: int = 1000  # records parsed, validated and upserted per statement
+    BULK_IMPORT_MAX_ERRORS: int = 1000  # errors listed in a result; all are counted in summary.skipped
+    BULK_PREVIEW_MAX_ITEMS: int = 1000  # items listed per preview bucket; all are counted in the summary
+    BULK_PREVIEW_KEYS_TTL_SECONDS: int = 3600  # Redis set of the new keys a running preview has seen so far
+    BULK_EXPORT_CHUNK_SIZE: int = 5000  # rows fetched per cursor round trip (source nodes per lineage page) in exports
+    BULK_JOB_WORKERS: int = 2  # import jobs run concurrently per app process; 0 leaves jobs to other processes
+    BULK_JOB_DIR: str | None = None  # job uploads, kept until the job ends; must be shared by all app processes
+    BULK_JOB_POLL_SECONDS: int = 5  # how long an idle worker blocks on the queue
+    BULK_JOB_LOCK_SECONDS: int = 60  # a running job whose worker stopped refreshing its lock can be resumed
+    BULK_JOB_TTL_SECONDS: int = 7 * 24 * 3600  # job state and errors kept after the last update
 
     # Oracle thick client (optional)
     ORACLE_CLIENT_LIB_DIR: str | None = "/Users/shenshunan/projects/Ariadne/tools/oracle"
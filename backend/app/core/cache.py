@@ -1,9 +1,31 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
 from typing import AsyncIterator
 from redis.asyncio import Redis
 
 from app.config import settings
 
 
+# claim a free lease or renew our own; 1 when we hold it afterwards
+_CLAIM_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return 1
+end
+return 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
 def get_redis_client() -> Redis:
     return Redis.from_url(
         settings.REDIS_URL,
@@ -12,9 +34,63 @@ def get_redis_client() -> Redis:
     )
 
 
+def get_job_redis_client() -> Redis:
+    """Redis holding the bulk job queue and job state: CELERY_BROKER_URL when set, else REDIS_URL."""
+    return Redis.from_url(
+        settings.CELERY_BROKER_URL or settings.REDIS_URL,
+        decode_responses=True,
+        max_connections=settings.REDIS_POOL_SIZE,
+    )
+
+
 async def redis_dependency() -> AsyncIterator[Redis]:
     client = get_redis_client()
     try:
         yield client
     finally:
         await client.aclose()
+
+
+async def job_redis_dependency() -> AsyncIterator[Redis]:
+    client = get_job_redis_client()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+class Lease:
+    """A Redis lease held by one process at a time.
+
+    Background loops that every app process starts claim it before each round,
+    so only the holder does the work; it lapses after ``ttl`` seconds unless
+    renewed, letting another process take over when the holder stops.
+    """
+
+    def __init__(self, redis: Redis, key: str, ttl: float):
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self._claim = redis.register_script(_CLAIM_LEASE)
+        self._release = redis.register_script(_RELEASE_LEASE)
+
+    async def claim(self) -> bool:
+        return bool(await self._claim(keys=[self.key], args=[self.token, int(self.ttl * 1000)]))
+
+    async def release(self) -> None:
+        await self._release(keys=[self.key], args=[self.token])
+
+    @asynccontextmanager
+    async def kept(self) -> AsyncIterator[None]:
+        """Keep renewing the lease while the body runs, for rounds that can outlast ``ttl``."""
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                await self.claim()
+
+        task = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            task.cancel()
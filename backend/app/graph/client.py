@@ -1,26 +1,133 @@
-from typing import AsyncIterator
-from neo4j import AsyncGraphDatabase, AsyncDriver
+import time
+from typing import Any, AsyncIterator
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncSession
 
 from app.config import settings
 from app.graph import queries
 
 
-def get_neo4j_driver() -> AsyncDriver:
+class PoolMetrics:
+    """Counters kept around the shared driver's sessions.
+
+    Only the driver's public API is used: a session holds at most one pooled
+    connection while it is open, so open sessions bound the connections in use
+    and a session opened while ``NEO4J_MAX_POOL_SIZE`` are open may have to
+    wait for one.
+    """
+
+    def __init__(self) -> None:
+        self.opened = 0
+        self.in_use = 0
+        self.peak = 0
+        self.saturated = 0
+        self.held_total_ms = 0.0
+        self.held_max_ms = 0.0
+
+    def session_opened(self) -> None:
+        self.opened += 1
+        if self.in_use >= settings.NEO4J_MAX_POOL_SIZE:
+            self.saturated += 1
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+
+    def session_closed(self, held_ms: float) -> None:
+        self.in_use -= 1
+        self.held_total_ms += held_ms
+        self.held_max_ms = max(self.held_max_ms, held_ms)
+
+
+_driver: AsyncDriver | None = None
+pool_metrics = PoolMetrics()
+
+
+class _CountedSession:
+    """``async with driver.session()`` that keeps ``pool_metrics`` up to date."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+        self._started = 0.0
+
+    async def __aenter__(self) -> AsyncSession:
+        pool_metrics.session_opened()
+        self._started = time.perf_counter()
+        try:
+            return await self._session.__aenter__()
+        except BaseException:
+            self._closed()
+            raise
+
+    async def __aexit__(self, *exc: Any) -> None:
+        try:
+            await self._session.__aexit__(*exc)
+        finally:
+            self._closed()
+
+    def _closed(self) -> None:
+        pool_metrics.session_closed((time.perf_counter() - self._started) * 1000)
+
+
+def _count_sessions(driver: AsyncDriver) -> None:
+    session = driver.session
+
+    def counted_session(**config: Any) -> _CountedSession:
+        return _CountedSession(session(**config))
+
+    driver.session = counted_session
+
+
+def create_neo4j_driver() -> AsyncDriver:
     return AsyncGraphDatabase.driver(
         settings.NEO4J_URI,
         auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+        max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
     )
 
 
-async def neo4j_dependency() -> AsyncIterator[AsyncDriver]:
-    driver = get_neo4j_driver()
-    try:
-        yield driver
-    finally:
+def get_neo4j_driver() -> AsyncDriver:
+    """Return the process-wide driver, creating it on first use.
+
+    The driver owns the Bolt connection pool, so it must be shared rather than
+    built per request; the app lifespan closes it on shutdown.
+    """
+    global _driver
+    if _driver is None:
+        _driver = create_neo4j_driver()
+        _count_sessions(_driver)
+    return _driver
+
+
+async def close_neo4j_driver() -> None:
+    global _driver
+    if _driver is not None:
+        driver, _driver = _driver, None
         await driver.close()
 
 
+async def neo4j_dependency() -> AsyncIterator[AsyncDriver]:
+    yield get_neo4j_driver()
+
+
+def neo4j_pool_stats() -> dict[str, Any]:
+    """Snapshot of the shared driver's sessions: open now, at peak, and how long they are held."""
+    closed = pool_metrics.opened - pool_metrics.in_use
+    return {
+        "initialized": _driver is not None,
+        "max_size": settings.NEO4J_MAX_POOL_SIZE,
+        "in_use": pool_metrics.in_use,
+        "peak_in_use": pool_metrics.peak,
+        "sessions": pool_metrics.opened,
+        "saturated": pool_metrics.saturated,
+        "held_avg_ms": round(pool_metrics.held_total_ms / closed, 3) if closed else 0.0,
+        "held_max_ms": round(pool_metrics.held_max_ms, 3),
+    }
+
+
 async def ensure_constraints(driver: AsyncDriver) -> None:
+    """Create the id uniqueness constraints and the property indexes lookups rely on."""
     async with driver.session() as session:
         await session.run(queries.CREATE_TABLE_CONSTRAINT)
         await session.run(queries.CREATE_FIELD_CONSTRAINT)
+        for statement in queries.CREATE_INDEXES:
+            await session.run(statement)
@@ -0,0 +1,118 @@
+"""Per-table reachability metrics by dynamic programming over the SCC condensation.
+
+The set of tables a component reaches is summarised by a bottom-k sketch: the
+``k`` smallest 64-bit hashes of its members. The sketch of a union is the ``k``
+smallest of the merged sketches, so every condensation edge costs O(k) and a
+pass over the whole graph is linear in its size. A sketch with fewer than ``k``
+hashes is the exact set; a full one estimates the cardinality as
+``(k - 1) / max hash`` (relative error about ``1 / sqrt(k)``).
+
+``propagate`` also takes stored results for nodes just outside the region it
+recomputes, which is what lets lineage writes refresh only the ancestors (or
+descendants) of the edges they touch.
+"""
+import hashlib
+import heapq
+from collections import Counter
+from typing import Iterable, Mapping, NamedTuple, Sequence
+
+from app.graph.cycles import strongly_connected_components
+
+
+HASH_SPACE = 1 << 64
+
+
+class Reach(NamedTuple):
+    sketch: tuple[int, ...]  # a component's members and everything they reach
+    domains: frozenset[str]  # primary tags of the same set
+    depth: int  # longest chain of condensation hops below the component
+
+
+class Metrics(NamedTuple):
+    count: int  # reachable tables, excluding the table itself
+    domains: int  # distinct primary tags among them
+    depth: int
+    reach: Reach
+
+
+def node_hash(node_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def merge(sketches: Iterable[Sequence[int]], k: int) -> tuple[int, ...]:
+    out: list[int] = []
+    for h in heapq.merge(*sketches):
+        if not out or h != out[-1]:
+            out.append(h)
+            if len(out) == k:
+                break
+    return tuple(out)
+
+
+def estimate(sketch: Sequence[int], k: int) -> int:
+    if len(sketch) < k:
+        return len(sketch)
+    return max(k, round((k - 1) * HASH_SPACE / (sketch[-1] + 1)))
+
+
+def pack(sketch: Sequence[int]) -> bytes:
+    return b"".join(h.to_bytes(8, "big") for h in sketch)
+
+
+def unpack(data: bytes | None) -> tuple[int, ...]:
+    if not data:
+        return ()
+    return tuple(int.from_bytes(data[i:i + 8], "big") for i in range(0, len(data), 8))
+
+
+def propagate(
+    nodes: Iterable[str],
+    succ: Mapping[str, Iterable[str]],
+    domain_of: Mapping[str, str | None],
+    k: int,
+    boundary: Mapping[str, Reach] | None = None,
+) -> dict[str, Metrics]:
+    """Metrics for every node in ``nodes`` following ``succ``.
+
+    Pass successors for downstream metrics and predecessors for upstream ones.
+    Next nodes outside ``nodes`` take their reach from ``boundary`` and count
+    as leaves when they have none.
+    """
+    region = set(nodes)
+    boundary = boundary or {}
+    comp_of: dict[str, int] = {}
+    reach_of: list[Reach] = []
+    result: dict[str, Metrics] = {}
+
+    # Tarjan emits components sinks first, so every child is done before its parents
+    for ci, members in enumerate(strongly_connected_components(region, succ)):
+        for n in members:
+            comp_of[n] = ci
+        children: dict[object, Reach] = {}
+        for n in members:
+            for m in succ.get(n, ()):
+                if m in region:
+                    if comp_of[m] != ci:
+                        children[comp_of[m]] = reach_of[comp_of[m]]
+                elif m not in children:
+                    tag = domain_of.get(m)
+                    children[m] = boundary.get(m) or Reach((node_hash(m),), frozenset([tag] if tag else ()), 0)
+
+        below = children.values()
+        own = sorted(node_hash(n) for n in members)
+        below_domains = frozenset().union(*(r.domains for r in below))
+        tags = Counter(domain_of.get(n) for n in members)
+        reach = Reach(
+            merge([own, *(r.sketch for r in below)], k),
+            below_domains | {t for t in tags if t},
+            max((r.depth + 1 for r in below), default=0),
+        )
+        reach_of.append(reach)
+
+        count = estimate(reach.sketch, k) - 1
+        for n in members:
+            tag = domain_of.get(n)
+            # a table's own tag only counts when something it reaches shares it
+            own_only = bool(tag) and tags[tag] == 1 and tag not in below_domains
+            result[n] = Metrics(count, len(reach.domains) - own_only, reach.depth, reach)
+    return result
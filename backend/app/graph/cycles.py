@@ -0,0 +1,127 @@
+"""Strongly connected components and representative cycles of the lineage graph.
+
+Pure functions over an adjacency mapping ``node -> iterable of successors``;
+callers decide where the graph comes from (a full Neo4j scan or the subgraph
+around one lineage write).
+"""
+from collections import deque
+from typing import Hashable, Iterable, Mapping, TypeVar
+
+
+N = TypeVar("N", bound=Hashable)
+
+
+def strongly_connected_components(nodes: Iterable[N], succ: Mapping[N, Iterable[N]]) -> list[list[N]]:
+    """Tarjan's algorithm, iterative so deep lineage chains cannot hit the recursion limit.
+
+    Runs in O(V + E). Successors that are not in ``nodes`` are ignored, which lets
+    callers restrict the search to a subgraph without copying the adjacency.
+    """
+    universe = set(nodes)
+    index: dict[N, int] = {}
+    low: dict[N, int] = {}
+    on_stack: set[N] = set()
+    stack: list[N] = []
+    components: list[list[N]] = []
+    counter = 0
+
+    for root in universe:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(succ.get(root, ())))]
+        while work:
+            node, it = work[-1]
+            advanced = False
+            for nxt in it:
+                if nxt not in universe:
+                    continue
+                if nxt not in index:
+                    index[nxt] = low[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(succ.get(nxt, ()))))
+                    advanced = True
+                    break
+                if nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def is_cyclic(component: list[N], succ: Mapping[N, Iterable[N]]) -> bool:
+    """A component is a cycle if it has several members or a self-loop."""
+    if len(component) > 1:
+        return True
+    node = component[0]
+    return node in succ.get(node, ())
+
+
+def _shortest_cycle_through(start: N, members: set[N], succ: Mapping[N, Iterable[N]]) -> list[N] | None:
+    parent: dict[N, N] = {}
+    queue: deque[N] = deque()
+    for nxt in succ.get(start, ()):
+        if nxt == start:
+            return [start]
+        if nxt in members and nxt not in parent:
+            parent[nxt] = start
+            queue.append(nxt)
+    while queue:
+        node = queue.popleft()
+        for nxt in succ.get(node, ()):
+            if nxt == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path
+            if nxt in members and nxt not in parent:
+                parent[nxt] = node
+                queue.append(nxt)
+    return None
+
+
+def _canonical(cycle: list[N]) -> tuple[N, ...]:
+    # directed cycles: only rotations are equivalent
+    pivot = min(range(len(cycle)), key=lambda i: cycle[i])
+    return tuple(cycle[pivot:] + cycle[:pivot])
+
+
+def representative_cycles(
+    component: list[N], succ: Mapping[N, Iterable[N]], limit: int
+) -> list[list[N]]:
+    """Up to ``limit`` distinct shortest cycles, each through a different start node.
+
+    Every BFS stays inside the component, so the cost is O(limit * (V + E)) of the
+    component rather than the exponential enumeration of all simple cycles.
+    """
+    members = set(component)
+    found: dict[tuple[N, ...], list[N]] = {}
+    attempts = 0
+    for start in sorted(component):
+        if len(found) >= limit or attempts >= limit * 4:
+            break
+        attempts += 1
+        cycle = _shortest_cycle_through(start, members, succ)
+        if cycle:
+            key = _canonical(cycle)
+            found.setdefault(key, list(key))
+    return list(found.values())
@@ -0,0 +1,78 @@
+"""One-off graph maintenance commands.
+
+Usage (from ``backend/``)::
+
+    python -m app.graph.maintenance backfill-has-field [--batch-size 5000]
+    python -m app.graph.maintenance rebuild-cycles
+    python -m app.graph.maintenance rebuild-criticality
+"""
+import argparse
+import asyncio
+
+from neo4j import AsyncDriver
+import structlog
+
+from app.core.cache import get_redis_client
+from app.graph import queries
+from app.graph.client import close_neo4j_driver, ensure_constraints, get_neo4j_driver
+from app.services.criticality_index import CriticalityIndex
+from app.services.cycle_index import CycleIndex
+
+
+log = structlog.get_logger(__name__)
+
+
+async def backfill_has_field(driver: AsyncDriver, batch_size: int = 5000) -> dict[str, int]:
+    """Link every existing Field to its Table with HAS_FIELD, one write transaction per batch.
+
+    Fields are paged by id, so the run is resumable and fields whose table is
+    missing do not stall progress.
+    """
+
+    async def run_batch(tx, after: str):
+        result = await tx.run(queries.BACKFILL_HAS_FIELD, after=after, batch_size=batch_size)
+        return await result.single()
+
+    after = ""
+    totals = {"scanned": 0, "linked": 0, "batches": 0}
+    async with driver.session() as session:
+        while True:
+            record = await session.execute_write(run_batch, after)
+            if not record or not record["scanned"]:
+                break
+            totals["scanned"] += record["scanned"]
+            totals["linked"] += record["linked"]
+            totals["batches"] += 1
+            after = record["last_id"]
+            log.info("has_field_backfill_batch", after=after, **totals)
+    return totals
+
+
+async def _main(args: argparse.Namespace) -> None:
+    driver = get_neo4j_driver()
+    try:
+        await ensure_constraints(driver)
+        if args.command == "backfill-has-field":
+            totals = await backfill_has_field(driver, batch_size=args.batch_size)
+            log.info("has_field_backfill_done", **totals)
+        elif args.command == "rebuild-cycles":
+            # with Redis, so cached cycle answers for changed components are invalidated
+            redis = get_redis_client()
+            try:
+                await CycleIndex(driver, redis=redis).rebuild()
+            finally:
+                await redis.aclose()
+        elif args.command == "rebuild-criticality":
+            await CriticalityIndex(driver).rebuild()
+    finally:
+        await close_neo4j_driver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lineage graph maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill-has-field", help="create (:Table)-[:HAS_FIELD]->(:Field) for existing fields")
+    backfill.add_argument("--batch-size", type=int, default=5000)
+    sub.add_parser("rebuild-cycles", help="recompute the persisted strongly connected component index")
+    sub.add_parser("rebuild-criticality", help="recompute the per-table criticality metrics")
+    asyncio.run(_main(parser.parse_args()))
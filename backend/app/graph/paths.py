@@ -0,0 +1,136 @@
+"""Bounded k-shortest simple paths (Yen's algorithm) over a small adjacency map.
+
+Callers first cut the graph down to the nodes between source and target (see
+``LineageProjection.between`` / ``queries.PATH_SUBGRAPH``), then iterate
+``k_shortest_paths``: paths come out cheapest first, one at a time, so the
+caller can stream them and stop on a count or time budget.
+"""
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Iterator, Mapping, NamedTuple, Sequence
+
+
+WEIGHTS = ("hops", "confidence")
+MIN_CONFIDENCE = 1e-6
+# keeps fully confident (zero-cost) edges from making longer paths tie with shorter ones
+HOP_EPSILON = 1e-9
+
+
+class Path(NamedTuple):
+    cost: float
+    nodes: tuple[str, ...]
+    edges: tuple[Any, ...]
+
+
+# node -> [(next node, edge key, cost)]
+Adjacency = Mapping[str, Sequence[tuple[str, Any, float]]]
+
+
+def edge_cost(confidence: Any, weight: str) -> float:
+    """``hops``: every edge costs 1. ``confidence``: -log(confidence), so the
+    cheapest path is the one with the highest product of confidences; edges
+    without a confidence count as certain."""
+    if weight != "confidence":
+        return 1.0
+    try:
+        value = float(confidence) if confidence is not None else 1.0
+    except (TypeError, ValueError):
+        value = 1.0
+    return -math.log(min(max(value, MIN_CONFIDENCE), 1.0)) + HOP_EPSILON
+
+
+def _cheapest(
+    source: str,
+    target: str,
+    adj: Adjacency,
+    banned_nodes: set[str],
+    banned_edges: set[Any],
+    max_hops: int,
+) -> Path | None:
+    """Cheapest path from ``source`` to ``target`` within ``max_hops``, skipping banned nodes/edges.
+
+    Dijkstra over (node, hops) labels: a cheaper route with more hops must not
+    hide a costlier one that is the only route within the bound, so a node is
+    only passed over again when it was already reached cheaper *and* in no more
+    hops. Labels come off the heap in (cost, hops) order, which makes that test
+    a single "fewest hops settled so far" per node.
+    """
+    if max_hops < 0:
+        return None
+    counter = itertools.count()
+    # label: (node, edge into it, index of the parent label)
+    labels: list[tuple[str, Any, int]] = [(source, None, -1)]
+    heap: list[tuple[float, int, int, int]] = [(0.0, 0, next(counter), 0)]
+    settled: dict[str, int] = {}  # node -> fewest hops of a label already expanded
+    while heap:
+        cost, hops, _, label = heapq.heappop(heap)
+        node = labels[label][0]
+        if node == target:
+            nodes, edges = [], []
+            while label >= 0:
+                node, edge, label = labels[label]
+                nodes.append(node)
+                edges.append(edge)
+            return Path(cost, tuple(reversed(nodes)), tuple(reversed(edges[:-1])))
+        if hops >= settled.get(node, max_hops + 1) or hops >= max_hops:
+            continue
+        settled[node] = hops
+        for nxt, edge, step in adj.get(node, ()):
+            if nxt in banned_nodes or edge in banned_edges or hops + 1 >= settled.get(nxt, max_hops + 1):
+                continue
+            labels.append((nxt, edge, label))
+            heapq.heappush(heap, (cost + step, hops + 1, next(counter), len(labels) - 1))
+    return None
+
+
+def k_shortest_paths(
+    source: str,
+    target: str,
+    adj: Adjacency,
+    k: int,
+    max_hops: int,
+    deadline: float | None = None,
+) -> Iterator[Path]:
+    """Yield up to ``k`` loopless paths in non-decreasing cost, stopping early at ``deadline``.
+
+    ``deadline`` is a ``time.monotonic()`` value. With the ``hops`` weight the
+    order is exact; with ``confidence`` the hop bound is applied while searching,
+    so a cheaper path longer than ``max_hops`` is never returned in its place.
+    """
+    if source == target or k <= 0:
+        return
+    costs = {edge: step for out in adj.values() for _, edge, step in out}
+    first = _cheapest(source, target, adj, set(), set(), max_hops)
+    if first is None:
+        return
+    found = [first]
+    yield first
+
+    candidates: list[tuple[float, int, int, Path]] = []
+    seen = {first.edges}
+    counter = itertools.count()
+    while len(found) < k:
+        last = found[-1]
+        for i in range(len(last.nodes) - 1):
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            spur = last.nodes[i]
+            root_nodes = last.nodes[: i + 1]
+            root_edges = last.edges[:i]
+            banned_edges = {p.edges[i] for p in found if p.nodes[: i + 1] == root_nodes}
+            spur_path = _cheapest(spur, target, adj, set(root_nodes[:-1]), banned_edges, max_hops - i)
+            if spur_path is None:
+                continue
+            edges = root_edges + spur_path.edges
+            if edges in seen:
+                continue
+            seen.add(edges)
+            cost = sum(costs[e] for e in root_edges) + spur_path.cost
+            path = Path(cost, root_nodes[:-1] + spur_path.nodes, edges)
+            heapq.heappush(candidates, (cost, len(edges), next(counter), path))
+        if not candidates:
+            return
+        found.append(heapq.heappop(candidates)[3])
+        yield found[-1]
@@ -0,0 +1,459 @@
+"""In-process projection of the lineage graph.
+
+Neo4j stays the source of truth. The projection mirrors Table/Field nodes and
+FEEDS_INTO/DERIVES_FROM relationships into integer-keyed, array-backed forward
+and reverse adjacency lists so lineage traversals can run without a Bolt round
+trip. It is loaded at startup, patched by LineageService on every write made in
+this process and periodically reloaded so writes from other workers converge.
+Each load is stamped with the lineage write sequence it started at, so callers
+can tell when an answer may predate a write to the nodes it covers.
+"""
+import asyncio
+from array import array
+from typing import Any, Iterable
+
+from neo4j import AsyncDriver
+from redis.asyncio import Redis
+import structlog
+
+from app.graph import queries
+from app.graph.reachability import ReachabilityIndex
+from app.graph.traversal import multi_source_bfs
+from app.services.lineage_cache import LineageCache
+
+
+log = structlog.get_logger(__name__)
+
+TABLE = 0
+FIELD = 1
+FEEDS_INTO = 0
+DERIVES_FROM = 1
+REL_TYPES = {"FEEDS_INTO": FEEDS_INTO, "DERIVES_FROM": DERIVES_FROM}
+REL_NAMES = ("FEEDS_INTO", "DERIVES_FROM")
+
+
+class _Graph:
+    """Slot-based storage; node and edge slots are never reused, only tombstoned."""
+
+    def __init__(self) -> None:
+        # node slots
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.kind = bytearray()
+        self.alive = bytearray()
+        self.name: list[str | None] = []
+        self.source: list[str | None] = []
+        self.parent = array("i")  # field slot -> table slot, -1 for tables
+        self.children: list[array] = []  # table slot -> field slots
+        self.out: list[array] = []  # node slot -> outgoing edge slots
+        self.inc: list[array] = []  # node slot -> incoming edge slots
+        # edge slots
+        self.esrc = array("i")
+        self.edst = array("i")
+        self.etype = bytearray()
+        self.ealive = bytearray()
+        self.erel: list[Any] = []
+        self.eattrs: list[tuple[Any, Any]] = []
+        self.edge_index: dict[str, int] = {}
+        self.node_count = 0
+        self.edge_count = 0
+        # kept in step by the mutators below; built lazily on the first query
+        self.reach = ReachabilityIndex(self)
+
+    # ---- nodes ----
+    def slot(self, node_id: str, kind: int) -> int:
+        idx = self.index.get(node_id)
+        if idx is not None:
+            return idx
+        idx = len(self.ids)
+        self.index[node_id] = idx
+        self.ids.append(node_id)
+        self.kind.append(kind)
+        self.alive.append(0)
+        self.name.append(None)
+        self.source.append(None)
+        self.parent.append(-1)
+        self.children.append(array("i"))
+        self.out.append(array("i"))
+        self.inc.append(array("i"))
+        return idx
+
+    def _revive(self, idx: int) -> None:
+        if not self.alive[idx]:
+            self.alive[idx] = 1
+            self.node_count += 1
+            self.reach.node_added(idx)
+
+    def upsert_table(self, table_id: str, name: str | None, source_id: str | None) -> None:
+        idx = self.slot(table_id, TABLE)
+        self._revive(idx)
+        self.name[idx] = name
+        self.source[idx] = source_id
+
+    def upsert_field(self, field_id: str, name: str | None, table_id: str | None) -> None:
+        idx = self.slot(field_id, FIELD)
+        self._revive(idx)
+        self.name[idx] = name
+        parent = self.slot(table_id, TABLE) if table_id else -1
+        if self.parent[idx] != parent:
+            if self.parent[idx] >= 0:
+                self.children[self.parent[idx]].remove(idx)
+            if parent >= 0:
+                self.children[parent].append(idx)
+            self.parent[idx] = parent
+
+    def remove_node(self, node_id: str) -> None:
+        idx = self.index.get(node_id)
+        if idx is None or not self.alive[idx]:
+            return
+        if self.kind[idx] == TABLE:
+            for child in list(self.children[idx]):
+                self.remove_node(self.ids[child])
+        elif self.parent[idx] >= 0:
+            self.children[self.parent[idx]].remove(idx)
+            self.parent[idx] = -1
+        for e in list(self.out[idx]) + list(self.inc[idx]):
+            self._drop_edge(e)
+        self.alive[idx] = 0
+        self.node_count -= 1
+        self.reach.node_removed(idx)
+
+    # ---- edges ----
+    def add_edge(
+        self,
+        rel_id: Any,
+        from_id: str,
+        to_id: str,
+        rel_type: str,
+        lineage_source: Any = None,
+        confidence: Any = None,
+    ) -> None:
+        etype = REL_TYPES[rel_type]
+        key = str(rel_id)
+        existing = self.edge_index.get(key)
+        if existing is not None and self.ealive[existing]:
+            self.eattrs[existing] = (lineage_source, confidence)
+            return
+        kind = TABLE if etype == FEEDS_INTO else FIELD
+        src = self.slot(from_id, kind)
+        dst = self.slot(to_id, kind)
+        self._revive(src)
+        self._revive(dst)
+        e = len(self.erel)
+        self.esrc.append(src)
+        self.edst.append(dst)
+        self.etype.append(etype)
+        self.ealive.append(1)
+        self.erel.append(rel_id)
+        self.eattrs.append((lineage_source, confidence))
+        self.edge_index[key] = e
+        self.out[src].append(e)
+        self.inc[dst].append(e)
+        self.edge_count += 1
+        self.reach.edge_added(src, dst)
+
+    def remove_edge(self, rel_id: Any) -> None:
+        e = self.edge_index.get(str(rel_id))
+        if e is not None:
+            self._drop_edge(e)
+
+    def _drop_edge(self, e: int) -> None:
+        if not self.ealive[e]:
+            return
+        self.ealive[e] = 0
+        self.out[self.esrc[e]].remove(e)
+        self.inc[self.edst[e]].remove(e)
+        del self.edge_index[str(self.erel[e])]
+        self.edge_count -= 1
+        self.reach.edge_removed(self.esrc[e], self.edst[e])
+
+    # ---- traversal ----
+    def bfs(self, starts: Iterable[int], direction: str, depth: int, etype: int) -> dict[int, int]:
+        """Level-synchronous BFS returning slot -> minimum hop count (<= depth)."""
+        forward = direction in ("downstream", "both")
+        backward = direction in ("upstream", "both")
+        dist = {s: 0 for s in starts}
+        frontier = list(dist)
+        level = 0
+        while frontier and level < depth:
+            level += 1
+            nxt: list[int] = []
+            for u in frontier:
+                if forward:
+                    for e in self.out[u]:
+                        if self.etype[e] == etype:
+                            v = self.edst[e]
+                            if v not in dist:
+                                dist[v] = level
+                                nxt.append(v)
+                if backward:
+                    for e in self.inc[u]:
+                        if self.etype[e] == etype:
+                            v = self.esrc[e]
+                            if v not in dist:
+                                dist[v] = level
+                                nxt.append(v)
+            frontier = nxt
+        return dist
+
+    def edge_dict(self, e: int) -> dict[str, Any]:
+        lineage_source, confidence = self.eattrs[e]
+        return {
+            "id": self.erel[e],
+            "from": self.ids[self.esrc[e]],
+            "to": self.ids[self.edst[e]],
+            "lineage_source": lineage_source,
+            "confidence": confidence,
+            "rel_type": REL_NAMES[self.etype[e]],
+        }
+
+    def node_dict(self, idx: int) -> dict[str, Any]:
+        if self.kind[idx] == FIELD:
+            parent = self.parent[idx]
+            return {
+                "id": self.ids[idx],
+                "name": self.name[idx],
+                "table_id": self.ids[parent] if parent >= 0 else None,
+            }
+        return {"id": self.ids[idx], "name": self.name[idx], "source_id": self.source[idx]}
+
+
+class LineageProjection:
+    """Process-local mirror of the lineage graph used for Neo4j-free traversals."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._graph = _Graph()
+        self._loading = False
+        self._pending: list[tuple[str, tuple]] = []
+        # lineage write sequence read before the current graph was loaded; None when unknown
+        self.generation: int | None = None
+        # bumped whenever a query is answered from the graph
+        self.answers = 0
+
+    # ---- lifecycle ----
+    async def load(self, driver: AsyncDriver, redis: Redis | None = None) -> None:
+        """Rebuild from Neo4j and swap in atomically; writes seen meanwhile are replayed."""
+        self._loading = True
+        self._pending = []
+        graph = _Graph()
+        try:
+            generation = await LineageCache(redis).generation() if redis else None
+            async with driver.session() as session:
+                result = await session.run(queries.PROJECTION_TABLES)
+                async for rec in result:
+                    graph.upsert_table(rec["id"], rec["name"], rec["source_id"])
+                result = await session.run(queries.PROJECTION_FIELDS)
+                async for rec in result:
+                    graph.upsert_field(rec["id"], rec["name"], rec["table_id"])
+                result = await session.run(queries.PROJECTION_EDGES)
+                async for rec in result:
+                    graph.add_edge(
+                        rec["rel_id"],
+                        rec["from_id"],
+                        rec["to_id"],
+                        rec["rel_type"],
+                        rec["lineage_source"],
+                        rec["confidence"],
+                    )
+            for op, args in self._pending:
+                getattr(graph, op)(*args)
+            graph.reach.rebuild()
+            self._graph = graph
+            self.generation = generation
+            self.ready = True
+        finally:
+            self._loading = False
+            self._pending = []
+        log.info("lineage_projection_loaded", nodes=graph.node_count, edges=graph.edge_count)
+
+    async def refresh_forever(self, driver: AsyncDriver, interval: float, redis: Redis | None = None) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(driver, redis)
+            except Exception as exc:  # pragma: no cover - external service
+                log.warning("lineage_projection_refresh_failed", error=str(exc))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "generation": self.generation,
+            "nodes": self._graph.node_count,
+            "edges": self._graph.edge_count,
+            "reachability": self._graph.reach.stats(),
+        }
+
+    # ---- incremental updates ----
+    def _apply(self, op: str, *args: Any) -> None:
+        if self._loading:
+            self._pending.append((op, args))
+        if self.ready:
+            getattr(self._graph, op)(*args)
+
+    def upsert_table(self, table_id: str, name: str | None, source_id: str | None) -> None:
+        self._apply("upsert_table", table_id, name, source_id)
+
+    def upsert_field(self, field_id: str, name: str | None, table_id: str | None) -> None:
+        self._apply("upsert_field", field_id, name, table_id)
+
+    def remove_node(self, node_id: str) -> None:
+        self._apply("remove_node", node_id)
+
+    def add_edge(
+        self,
+        rel_id: Any,
+        from_id: str,
+        to_id: str,
+        rel_type: str,
+        lineage_source: Any = None,
+        confidence: Any = None,
+    ) -> None:
+        self._apply("add_edge", rel_id, from_id, to_id, rel_type, lineage_source, confidence)
+
+    def remove_edge(self, rel_id: Any) -> None:
+        self._apply("remove_edge", rel_id)
+
+    # ---- queries ----
+    def has_table(self, table_id: str) -> bool:
+        g = self._graph
+        idx = g.index.get(table_id)
+        return self.ready and idx is not None and bool(g.alive[idx]) and g.kind[idx] == TABLE
+
+    def reachable(self, from_id: str, to_id: str) -> bool | None:
+        """Whether ``to_id`` is downstream of ``from_id``; None when the projection cannot tell."""
+        g = self._graph
+        src = g.index.get(from_id)
+        dst = g.index.get(to_id)
+        if not self.ready:
+            return None
+        self.answers += 1
+        if src is None or dst is None or not g.alive[src] or not g.alive[dst]:
+            return False
+        return g.reach.reachable(src, dst)
+
+    def traverse(self, node_id: str, direction: str, depth: int, rel_type: str = "FEEDS_INTO") -> dict[str, int]:
+        """Return node id -> hop distance for everything reachable within ``depth``."""
+        g = self._graph
+        idx = g.index.get(node_id)
+        if not self.ready or idx is None or not g.alive[idx]:
+            return {}
+        self.answers += 1
+        dist = g.bfs([idx], direction, depth, REL_TYPES[rel_type])
+        return {g.ids[slot]: d for slot, d in dist.items()}
+
+    def multi_source(
+        self, root_ids: list[str], direction: str, depth: int
+    ) -> dict[str, tuple[dict[str, Any], int, int, int]] | None:
+        """One FEEDS_INTO BFS from every root table at once.
+
+        Returns table id -> (node dict, distance, roots mask, nearest-roots mask)
+        with bit ``i`` standing for ``root_ids[i]``; roots the projection does
+        not know are left out. None when the projection is not loaded.
+        """
+        if not self.ready:
+            return None
+        self.answers += 1
+        g = self._graph
+        forward = direction == "downstream"
+        starts = []
+        for i, root_id in enumerate(root_ids):
+            idx = g.index.get(root_id)
+            known = idx is not None and g.alive[idx] and g.kind[idx] == TABLE
+            starts.append(idx if known else -1 - i)  # unique placeholder keeps bit i aligned
+
+        def neighbors(u: int) -> Iterable[int]:
+            if u < 0:
+                return ()
+            if forward:
+                return [g.edst[e] for e in g.out[u] if g.etype[e] == FEEDS_INTO]
+            return [g.esrc[e] for e in g.inc[u] if g.etype[e] == FEEDS_INTO]
+
+        hits = multi_source_bfs(starts, neighbors, depth)
+        return {
+            g.ids[u]: (g.node_dict(u), d, mask, nearest)
+            for u, (d, mask, nearest) in hits.items()
+            if u >= 0
+        }
+
+    def graph_record(
+        self, table_id: str, direction: str, depth: int, granularity: str = "all"
+    ) -> dict[str, Any] | None:
+        """Build the same shape the GET_GRAPH queries return (root_id/nodes/rels).
+
+        ``granularity`` mirrors the query variants: ``table`` skips fields,
+        ``field`` adds only fields joined by DERIVES_FROM inside the graph and
+        ``all`` adds every field of every table. Returns None when the root has
+        no lineage in ``direction``, mirroring the empty result of the APOC
+        expansion.
+        """
+        g = self._graph
+        root = g.index[table_id]
+        self.answers += 1
+        dist = g.bfs([root], direction, depth, FEEDS_INTO)
+        if len(dist) == 1:
+            return None
+
+        forward = direction in ("downstream", "both")
+        backward = direction in ("upstream", "both")
+        edges: dict[int, None] = {}
+        for u, d in dist.items():
+            if d >= depth:
+                continue
+            if forward:
+                for e in g.out[u]:
+                    if g.etype[e] == FEEDS_INTO:
+                        edges[e] = None
+            if backward:
+                for e in g.inc[u]:
+                    if g.etype[e] == FEEDS_INTO:
+                        edges[e] = None
+
+        nodes = [g.node_dict(t) for t in dist]
+        if granularity != "table":
+            fields: dict[int, None] = {}
+            for t in dist:
+                for f in g.children[t]:
+                    if granularity == "all":
+                        fields[f] = None
+                    for e in g.out[f]:
+                        if g.etype[e] == DERIVES_FROM and g.parent[g.edst[e]] in dist:
+                            edges[e] = None
+                            fields[f] = None
+                            fields[g.edst[e]] = None
+            nodes.extend(g.node_dict(f) for f in fields)
+
+        return {
+            "root_id": table_id,
+            "nodes": nodes,
+            "rels": [g.edge_dict(e) for e in edges],
+        }
+
+    def between(self, start_id: str, end_id: str, max_depth: int) -> dict[str, Any] | None:
+        """Nodes and edges that can lie on a path of at most ``max_depth`` hops from start to end.
+
+        Same shape as ``queries.PATH_SUBGRAPH``; None when the projection does not
+        know the start node.
+        """
+        g = self._graph
+        start = g.index.get(start_id)
+        end = g.index.get(end_id)
+        if not self.ready or start is None or not g.alive[start]:
+            return None
+        self.answers += 1
+        if end is None or not g.alive[end]:
+            return {"nodes": [], "rels": []}
+        etype = FEEDS_INTO if g.kind[start] == TABLE else DERIVES_FROM
+        forward = g.bfs([start], "downstream", max_depth, etype)
+        backward = g.bfs([end], "upstream", max_depth, etype)
+        region = {u for u, d in forward.items() if u in backward and d + backward[u] <= max_depth}
+        rels = [
+            g.edge_dict(e)
+            for u in region
+            for e in g.out[u]
+            if g.etype[e] == etype and g.edst[e] in region
+        ]
+        return {"nodes": [g.node_dict(u) for u in region], "rels": rels}
+
+
+lineage_projection = LineageProjection()
@@ -1,29 +1,63 @@
-CREATE_TABLE_NODE = """
-MERGE (t:Table {id: $id})
-SET t.name = $name,
-    t.schema_name = $schema_name,
-    t.qualified_name = $qualified_name,
-    t.source_id = $source_id
+# Node sync runs in batches (one row per entity) from the graph outbox dispatcher.
+SYNC_TABLE_NODES = """
+UNWIND $rows AS row
+MERGE (t:Table {id: row.id})
+SET t.name = row.name,
+    t.schema_name = row.schema_name,
+    t.qualified_name = row.qualified_name,
+    t.source_id = row.source_id
+WITH t
+OPTIONAL MATCH (f:Field {table_id: t.id})
+WHERE NOT (t)-[:HAS_FIELD]->(f)
+FOREACH (_ IN CASE WHEN f IS NULL THEN [] ELSE [1] END | MERGE (t)-[:HAS_FIELD]->(f))
 """
 
-CREATE_FIELD_NODE = """
-MERGE (f:Field {id: $id})
-SET f.name = $name,
-    f.data_type = $data_type,
-    f.table_id = $table_id
+SYNC_FIELD_NODES = """
+UNWIND $rows AS row
+MERGE (f:Field {id: row.id})
+SET f.name = row.name,
+    f.data_type = row.data_type,
+    f.table_id = row.table_id
+WITH f, row
+OPTIONAL MATCH (old:Table)-[h:HAS_FIELD]->(f)
+WHERE old.id <> row.table_id
+DELETE h
+WITH DISTINCT f, row
+OPTIONAL MATCH (t:Table {id: row.table_id})
+FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END | MERGE (t)-[:HAS_FIELD]->(f))
 """
 
-DELETE_TABLE_NODE = """
-MATCH (t:Table {id: $id}) DETACH DELETE t
+DELETE_TABLE_NODES = """
+UNWIND $ids AS id
+MATCH (t:Table {id: id}) DETACH DELETE t
 """
 
-DELETE_FIELD_NODE = """
-MATCH (f:Field {id: $id}) DETACH DELETE f
+DELETE_FIELD_NODES = """
+UNWIND $ids AS id
+MATCH (f:Field {id: id})
+WITH f, f.table_id AS table_id
+DETACH DELETE f
+RETURN collect(DISTINCT table_id) AS table_ids
 """
 
-DELETE_FIELDS_BY_TABLE = """
-MATCH (f:Field {table_id: $table_id}) DETACH DELETE f
+DELETE_FIELDS_BY_TABLES = """
+UNWIND $table_ids AS table_id
+CALL {
+  WITH table_id
+  OPTIONAL MATCH (:Table {id: table_id})-[:HAS_FIELD]->(linked:Field)
+  WITH table_id, collect(linked) AS linked
+  // fields not yet linked by the HAS_FIELD backfill
+  OPTIONAL MATCH (unlinked:Field {table_id: table_id})
+  WITH linked + collect(unlinked) AS fields
+  UNWIND fields AS f
+  WITH DISTINCT f
+  WITH f, f.id AS field_id
+  DETACH DELETE f
+  RETURN collect(field_id) AS field_ids
+}
+RETURN apoc.coll.flatten(collect(field_ids)) AS field_ids
 """
+
 CREATE_TABLE_CONSTRAINT = """
 CREATE CONSTRAINT table_id IF NOT EXISTS
 FOR (t:Table)
@@ -36,6 +70,22 @@ FOR (f:Field)
 REQUIRE f.id IS UNIQUE
 """
 
+CREATE_INDEXES = [
+    "CREATE INDEX field_table_id IF NOT EXISTS FOR (f:Field) ON (f.table_id)",
+    "CREATE INDEX table_source_id IF NOT EXISTS FOR (t:Table) ON (t.source_id)",
+    "CREATE INDEX table_qualified_name IF NOT EXISTS FOR (t:Table) ON (t.qualified_name)",
+]
+
+# One batch of the HAS_FIELD backfill, paging through fields by id.
+BACKFILL_HAS_FIELD = """
+MATCH (f:Field)
+WHERE f.id > $after
+WITH f ORDER BY f.id LIMIT $batch_size
+OPTIONAL MATCH (t:Table {id: f.table_id})
+FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END | MERGE (t)-[:HAS_FIELD]->(f))
+RETURN max(f.id) AS last_id, count(f) AS scanned, count(t) AS linked
+"""
+
 CREATE_TABLE_LINEAGE = """
 MATCH (s:Table {id: $source_id}), (t:Table {id: $target_id})
 MERGE (s)-[r:FEEDS_INTO]->(t)
@@ -52,14 +102,87 @@ MERGE (s)-[r:DERIVES_FROM]->(t)
 SET r.lineage_source = $lineage_source,
     r.transformation_logic = $transformation_logic,
     r.confidence = $confidence
-RETURN id(r) AS rel_id
+RETURN id(r) AS rel_id, s.table_id AS source_table_id, t.table_id AS target_table_id
+"""
+
+# Batch variants: rows whose endpoints are missing produce no output row.
+CREATE_TABLE_LINEAGE_BATCH = """
+UNWIND $rows AS row
+MATCH (s:Table {id: row.source_id}), (t:Table {id: row.target_id})
+MERGE (s)-[r:FEEDS_INTO]->(t)
+SET r.lineage_source = row.lineage_source,
+    r.transformation_type = row.transformation_type,
+    r.transformation_logic = row.transformation_logic,
+    r.confidence = row.confidence
+RETURN row.idx AS idx, id(r) AS rel_id
+"""
+
+CREATE_FIELD_LINEAGE_BATCH = """
+UNWIND $rows AS row
+MATCH (s:Field {id: row.source_id}), (t:Field {id: row.target_id})
+MERGE (s)-[r:DERIVES_FROM]->(t)
+SET r.lineage_source = row.lineage_source,
+    r.transformation_logic = row.transformation_logic,
+    r.confidence = row.confidence
+RETURN row.idx AS idx, id(r) AS rel_id, s.table_id AS source_table_id, t.table_id AS target_table_id
 """
 
 DELETE_LINEAGE = """
-MATCH ()-[r]-() WHERE id(r) = $rel_id
-WITH r
+// only lineage edges: a HAS_FIELD id must not delete a table's column link
+OPTIONAL MATCH (s)-[r:FEEDS_INTO|DERIVES_FROM]->(t) WHERE id(r) = $rel_id
+WITH r, type(r) AS rel_type, [s.id, t.id, s.table_id, t.table_id] AS touched
 DELETE r
-RETURN count(r) AS deleted_count
+RETURN count(r) AS deleted_count, rel_type, touched
+"""
+
+# GET_GRAPH variants by granularity:
+#   GET_GRAPH_TABLES  - tables and FEEDS_INTO edges only
+#   GET_GRAPH_FIELDS  - plus fields that take part in DERIVES_FROM edges inside the graph
+#   GET_GRAPH         - plus every column of every table in the graph (explicit opt-in)
+GET_GRAPH_TABLES = """
+MATCH (root:Table {id: $table_id})
+CALL apoc.path.expandConfig(root, {relationshipFilter:$rel_filter, minLevel:1, maxLevel:$depth, bfs:true, filterStartNode:false}) YIELD path
+WITH root,
+     apoc.coll.toSet(apoc.coll.flatten(collect(nodes(path)) + [root])) AS nodes,
+     apoc.coll.toSet(apoc.coll.flatten(collect(relationships(path)))) AS rel_objs
+WITH root, nodes,
+     [r IN rel_objs |
+        { id: id(r),
+          from: startNode(r).id,
+          to: endNode(r).id,
+          lineage_source: r.lineage_source,
+          confidence: r.confidence,
+          rel_type: type(r)
+        }
+     ] AS rels
+RETURN root.id AS root_id, nodes, rels
+"""
+
+GET_GRAPH_FIELDS = """
+MATCH (root:Table {id: $table_id})
+CALL apoc.path.expandConfig(root, {relationshipFilter:$rel_filter, minLevel:1, maxLevel:$depth, bfs:true, filterStartNode:false}) YIELD path
+WITH root,
+     apoc.coll.toSet(apoc.coll.flatten(collect(nodes(path)) + [root])) AS table_nodes,
+     apoc.coll.toSet(apoc.coll.flatten(collect(relationships(path)))) AS table_rels
+UNWIND table_nodes AS t
+OPTIONAL MATCH (t)-[:HAS_FIELD]->(f1:Field)-[fr:DERIVES_FROM]->(f2:Field)<-[:HAS_FIELD]-(t2:Table)
+WHERE t2 IN table_nodes
+WITH root, table_nodes, table_rels, collect(fr) AS field_rels,
+     collect(f1) + collect(f2) AS field_nodes
+WITH root,
+     apoc.coll.toSet(table_nodes + field_nodes) AS nodes,
+     apoc.coll.toSet(table_rels + field_rels) AS rel_objs
+WITH root, nodes,
+     [r IN rel_objs |
+        { id: id(r),
+          from: startNode(r).id,
+          to: endNode(r).id,
+          lineage_source: r.lineage_source,
+          confidence: r.confidence,
+          rel_type: type(r)
+        }
+     ] AS rels
+RETURN root.id AS root_id, nodes, rels
 """
 
 GET_GRAPH = """
@@ -68,16 +191,11 @@ CALL apoc.path.expandConfig(root, {relationshipFilter:$rel_filter, minLevel:1, m
 WITH root,
      apoc.coll.toSet(apoc.coll.flatten(collect(nodes(path)) + [root])) AS table_nodes,
      apoc.coll.toSet(apoc.coll.flatten(collect(relationships(path)))) AS table_rels
-WITH root, table_nodes, table_rels, [t IN table_nodes | t.id] AS table_ids
-OPTIONAL MATCH (f1:Field)-[fr:DERIVES_FROM]->(f2:Field)
-WHERE f1.table_id IN table_ids AND f2.table_id IN table_ids
-WITH root, table_nodes, table_rels, collect(DISTINCT fr) AS field_rels, table_ids,
-     apoc.coll.toSet(collect(DISTINCT startNode(fr)) + collect(DISTINCT endNode(fr))) AS field_nodes
-OPTIONAL MATCH (ff:Field)
-WHERE ff.table_id IN table_ids
-WITH root, table_nodes, table_rels, field_rels, field_nodes, table_ids, collect(DISTINCT ff) AS all_fields
-WITH root, table_nodes, table_rels, field_rels,
-     apoc.coll.toSet(field_nodes + all_fields) AS field_nodes
+UNWIND table_nodes AS t
+OPTIONAL MATCH (t)-[:HAS_FIELD]->(ff:Field)
+OPTIONAL MATCH (ff)-[fr:DERIVES_FROM]->(:Field)<-[:HAS_FIELD]-(t2:Table)
+WHERE t2 IN table_nodes
+WITH root, table_nodes, table_rels, collect(DISTINCT fr) AS field_rels, collect(DISTINCT ff) AS field_nodes
 WITH root,
      apoc.coll.toSet(table_nodes + field_nodes) AS nodes,
      apoc.coll.toSet(table_rels + field_rels) AS rel_objs
@@ -94,66 +212,138 @@ WITH root, nodes,
 RETURN root.id AS root_id, nodes, rels
 """
 
-TRACE_FIELD_UPSTREAM = """
-MATCH path = (f:Field {id: $field_id})<-[:DERIVES_FROM*]-(up:Field)
-WHERE length(path) >= 1 AND length(path) <= $depth
-WITH up, path
-RETURN up.id AS field_id,
-       up.name AS field_name,
-       up.table_id AS table_id,
-       length(path) AS distance
-ORDER BY distance ASC
+TRACE_FIELD = """
+// BFS with global node uniqueness: every field once, at its minimum distance, with the
+// neighbour one hop closer to the traced field; each direction stops after $limit fields
+MATCH (f:Field {id: $field_id})
+CALL {
+  WITH f
+  WITH f WHERE $upstream
+  CALL apoc.path.expandConfig(f, {
+    relationshipFilter: '<DERIVES_FROM',
+    minLevel: 1,
+    maxLevel: $depth,
+    uniqueness: 'NODE_GLOBAL',
+    bfs: true,
+    limit: $limit
+  }) YIELD path
+  WITH last(nodes(path)) AS n, length(path) AS distance, nodes(path)[-2] AS via
+  RETURN collect({field_id: n.id, field_name: n.name, table_id: n.table_id, distance: distance, via: via.id}) AS upstream
+}
+CALL {
+  WITH f
+  WITH f WHERE $downstream
+  CALL apoc.path.expandConfig(f, {
+    relationshipFilter: 'DERIVES_FROM>',
+    minLevel: 1,
+    maxLevel: $depth,
+    uniqueness: 'NODE_GLOBAL',
+    bfs: true,
+    limit: $limit
+  }) YIELD path
+  WITH last(nodes(path)) AS n, length(path) AS distance, nodes(path)[-2] AS via
+  RETURN collect({field_id: n.id, field_name: n.name, table_id: n.table_id, distance: distance, via: via.id}) AS downstream
+}
+RETURN upstream, downstream
 """
 
-TRACE_FIELD_DOWNSTREAM = """
-MATCH path = (f:Field {id: $field_id})-[:DERIVES_FROM*]->(down:Field)
-WHERE length(path) >= 1 AND length(path) <= $depth
-WITH down, path
-RETURN down.id AS field_id,
-       down.name AS field_name,
-       down.table_id AS table_id,
-       length(path) AS distance
-ORDER BY distance ASC
+PATH_SUBGRAPH = """
+// Nodes within $max_depth hops downstream of the start and upstream of the end, and the edges between them
+CALL {
+  MATCH (n:Table {id: $start_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $start_id}) RETURN n
+}
+CALL apoc.path.subgraphNodes(n, {relationshipFilter: 'FEEDS_INTO>|DERIVES_FROM>', maxLevel: $max_depth}) YIELD node
+WITH collect(node) AS downstream
+CALL {
+  MATCH (n:Table {id: $end_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $end_id}) RETURN n
+}
+CALL apoc.path.subgraphNodes(n, {relationshipFilter: '<FEEDS_INTO|<DERIVES_FROM', maxLevel: $max_depth}) YIELD node
+WITH downstream, collect(node) AS upstream
+WITH apoc.coll.intersection(downstream, upstream) AS region
+UNWIND region AS n
+OPTIONAL MATCH (n)-[r:FEEDS_INTO|DERIVES_FROM]->(m)
+WHERE m IN region
+RETURN collect(DISTINCT n {.*, labels: labels(n)}) AS nodes,
+       collect(CASE WHEN r IS NULL THEN NULL ELSE {
+         id: id(r), from: n.id, to: m.id, rel_type: type(r), lineage_source: r.lineage_source, confidence: r.confidence
+       } END) AS rels
 """
 
-ALL_PATHS = """
-// Find all simple paths (up to max_depth) between arbitrary nodes (Table or Field)
-MATCH (startNode {id: $start_id}), (endNode {id: $end_id})
-CALL apoc.algo.allSimplePaths(startNode, endNode, 'FEEDS_INTO|DERIVES_FROM>', $max_depth) YIELD path
-RETURN path
+REACHABLE = """
+// BFS visiting each node at most once (NODE_GLOBAL), stopping at the first path found; a negative
+// answer costs one pass over the downstream cone, not one per path through it
+CALL {
+  MATCH (n:Table {id: $to_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $to_id}) RETURN n
+}
+WITH n AS target
+CALL {
+  MATCH (n:Table {id: $from_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $from_id}) RETURN n
+}
+CALL apoc.path.expandConfig(n, {
+  relationshipFilter: 'FEEDS_INTO>|DERIVES_FROM>',
+  terminatorNodes: [target],
+  uniqueness: 'NODE_GLOBAL',
+  bfs: true,
+  limit: 1
+}) YIELD path
+RETURN length(path) AS hops
 """
 
-SHORTEST_PATHS = """
-// Shortest paths between arbitrary nodes (Table or Field)
-MATCH (startNode {id: $start_id}), (endNode {id: $end_id})
-CALL apoc.algo.dijkstra(startNode, endNode, 'FEEDS_INTO|DERIVES_FROM>', 'weight', 1) YIELD path AS path, weight
-RETURN path
+CYCLE_REGION = """
+// Nodes on a cycle through the new edge (from)->(to): downstream of `to` and upstream of `from`
+CALL {
+  MATCH (n:Table {id: $to_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $to_id}) RETURN n
+}
+CALL apoc.path.subgraphNodes(n, {relationshipFilter: 'FEEDS_INTO>|DERIVES_FROM>'}) YIELD node
+WITH collect(node.id) AS downstream
+CALL {
+  MATCH (n:Table {id: $from_id}) RETURN n
+  UNION
+  MATCH (n:Field {id: $from_id}) RETURN n
+}
+CALL apoc.path.subgraphNodes(n, {relationshipFilter: '<FEEDS_INTO|<DERIVES_FROM'}) YIELD node
+WITH downstream, collect(node.id) AS upstream
+RETURN apoc.coll.intersection(downstream, upstream) AS ids
 """
 
-CYCLES_BY_TABLE = """
-// Find cycles reachable from a given table (or all if table_id is null)
-MATCH (t:Table)
-WHERE $table_id IS NULL OR t.id = $table_id
-CALL apoc.algo.allSimplePaths(t, t, 'FEEDS_INTO>', $max_depth) YIELD path
-RETURN path
+CYCLE_SUBGRAPH = """
+// Node properties and outgoing lineage edges of the given nodes (callers keep the internal ones)
+UNWIND $ids AS node_id
+CALL {
+  WITH node_id
+  MATCH (n:Table {id: node_id}) RETURN n
+  UNION
+  WITH node_id
+  MATCH (n:Field {id: node_id}) RETURN n
+}
+OPTIONAL MATCH (n)-[r:FEEDS_INTO|DERIVES_FROM]->(m)
+RETURN n.id AS id,
+       n.name AS name,
+       labels(n) AS labels,
+       n.table_id AS table_id,
+       n.source_id AS source_id,
+       collect(CASE WHEN r IS NULL THEN NULL ELSE {
+         id: id(r), to: m.id, rel_type: type(r), lineage_source: r.lineage_source, confidence: r.confidence
+       } END) AS out
 """
 
-QUALITY_CHECK_CYCLES = """
-// Directed cycles starting/ending at the focal node, respecting edge direction and bounded depth
-MATCH (root {id: $table_id})
-CALL apoc.nodes.cycles(
-  [root],
-  {
-    maxDepth: $max_depth,
-    relationshipFilter: 'FEEDS_INTO>|DERIVES_FROM>',
-    filterStartNode: true
-  }
-) YIELD path
-RETURN path
+CYCLE_EDGES = """
+MATCH (s)-[:FEEDS_INTO|DERIVES_FROM]->(t)
+RETURN s.id AS from_id, t.id AS to_id
 """
 
 GET_RELATIONSHIP_DETAIL = """
-MATCH (s)-[r]-(t)
+MATCH (s)-[r:FEEDS_INTO|DERIVES_FROM]-(t)
 WHERE elementId(r) = $rel_element_id OR id(r) = $rel_int
 RETURN elementId(r) AS rel_id,
        id(r) AS rel_int,
@@ -170,3 +360,85 @@ RETURN elementId(r) AS rel_id,
        t.id AS target_id,
        t.name AS target_name
 """
+
+PROJECTION_TABLES = """
+MATCH (t:Table)
+RETURN t.id AS id, t.name AS name, t.source_id AS source_id
+"""
+
+PROJECTION_FIELDS = """
+MATCH (f:Field)
+RETURN f.id AS id, f.name AS name, f.table_id AS table_id
+"""
+
+PROJECTION_EDGES = """
+MATCH (s)-[r:FEEDS_INTO|DERIVES_FROM]->(t)
+RETURN id(r) AS rel_id,
+       s.id AS from_id,
+       t.id AS to_id,
+       type(r) AS rel_type,
+       r.lineage_source AS lineage_source,
+       r.confidence AS confidence
+"""
+
+
+CHANGE_SET_SUBGRAPH = """
+// Union of the FEEDS_INTO neighbourhoods of all roots, fetched once; the caller runs the BFS
+MATCH (r:Table) WHERE r.id IN $root_ids
+WITH collect(r) AS roots
+WHERE size(roots) > 0
+CALL apoc.path.subgraphAll(roots, {relationshipFilter: $rel_filter, maxLevel: $depth}) YIELD nodes, relationships
+RETURN
+  [n IN nodes | n {.id, .name, .source_id}] AS nodes,
+  [rel IN relationships WHERE type(rel) = 'FEEDS_INTO' | {from: startNode(rel).id, to: endNode(rel).id}] AS rels
+"""
+
+CRITICALITY_EDGES = """
+MATCH (s:Table)-[:FEEDS_INTO]->(t:Table)
+RETURN s.id AS from_id, t.id AS to_id
+"""
+
+CRITICALITY_ANCESTORS = """
+// Tables whose downstream contains one of the seeds, with their direct downstream tables
+MATCH (s:Table) WHERE s.id IN $ids
+WITH collect(s) AS seeds
+WHERE size(seeds) > 0
+CALL apoc.path.subgraphNodes(seeds, {relationshipFilter: '<FEEDS_INTO', labelFilter: '+Table'}) YIELD node
+RETURN node.id AS id, [(node)-[:FEEDS_INTO]->(n:Table) | n.id] AS next
+"""
+
+CRITICALITY_DESCENDANTS = """
+// Tables whose upstream contains one of the seeds, with their direct upstream tables
+MATCH (s:Table) WHERE s.id IN $ids
+WITH collect(s) AS seeds
+WHERE size(seeds) > 0
+CALL apoc.path.subgraphNodes(seeds, {relationshipFilter: 'FEEDS_INTO>', labelFilter: '+Table'}) YIELD node
+RETURN node.id AS id, [(node)<-[:FEEDS_INTO]-(n:Table) | n.id] AS next
+"""
+
+# Catalog export: outgoing lineage of the next $limit source nodes after $after, in id order
+# (backed by the id constraints); a source without edges returns one row with a null target.
+EXPORT_TABLE_LINEAGE = """
+MATCH (s:Table)
+WHERE s.id > $after
+WITH s ORDER BY s.id LIMIT $limit
+OPTIONAL MATCH (s)-[r:FEEDS_INTO]->(t:Table)
+RETURN s.id AS source_id,
+       t.id AS target_id,
+       r.lineage_source AS lineage_source,
+       r.transformation_type AS transformation_type,
+       r.transformation_logic AS transformation_logic,
+       r.confidence AS confidence
+"""
+
+EXPORT_FIELD_LINEAGE = """
+MATCH (s:Field)
+WHERE s.id > $after
+WITH s ORDER BY s.id LIMIT $limit
+OPTIONAL MATCH (s)-[r:DERIVES_FROM]->(t:Field)
+RETURN s.id AS source_id,
+       t.id AS target_id,
+       r.lineage_source AS lineage_source,
+       r.transformation_logic AS transformation_logic,
+       r.confidence AS confidence
+"""
@@ -0,0 +1,250 @@
+"""Reachability index over the lineage projection.
+
+Nodes are condensed into strongly connected components; the condensation is a
+DAG that carries
+
+* a topological position per component (edges go from lower to higher), kept
+  valid on insert with the Pearce-Kelly local reordering, and
+* two GRAIL interval labels per component: if ``u`` reaches ``v`` then
+  ``L(v)`` is contained in ``L(u)``, so a failed containment or position check
+  answers "no" immediately. Labels are only ever widened, so they stay valid
+  (if less selective) as edges come and go.
+
+Queries that pass both filters are settled by a DFS over the condensation
+that applies the same filters to every component it visits. Changes that can
+split a component, or an insert that closes a cycle, mark the index dirty; it
+is rebuilt in O(V + E) on the next query.
+"""
+from array import array
+from typing import TYPE_CHECKING
+
+from app.graph.cycles import strongly_connected_components
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.graph.projection import _Graph
+
+
+TRAVERSALS = 2
+
+
+class ReachabilityIndex:
+    def __init__(self, graph: "_Graph") -> None:
+        self.graph = graph
+        self.dirty = True
+        self.rebuilds = 0
+
+    # ---- build ----
+    def rebuild(self) -> None:
+        g = self.graph
+        self.comp = array("i", [-1]) * len(g.ids)
+        self.size = array("i")
+        self.pos = array("i")
+        self.cout: list[dict[int, int] | None] = []
+        self.cin: list[dict[int, int] | None] = []
+        self.lo = [array("i") for _ in range(TRAVERSALS)]
+        self.hi = [array("i") for _ in range(TRAVERSALS)]
+
+        linked = [u for u in range(len(g.ids)) if g.alive[u] and (g.out[u] or g.inc[u])]
+        succ = {u: [g.edst[e] for e in g.out[u]] for u in linked}
+        # Tarjan emits components sinks first, i.e. in reverse topological order
+        components = strongly_connected_components(linked, succ)
+        components.reverse()
+        components += [[u] for u in range(len(g.ids)) if g.alive[u] and not (g.out[u] or g.inc[u])]
+        for members in components:
+            c = self._new_component()
+            self.size[c] = len(members)
+            for u in members:
+                self.comp[u] = c
+        for u in linked:
+            for v in succ[u]:
+                self._link(self.comp[u], self.comp[v], 1)
+
+        for t in range(TRAVERSALS):
+            self._label(t)
+        self.next_rank = len(self.pos)
+        self.dirty = False
+        self.rebuilds += 1
+
+    def _new_component(self) -> int:
+        c = len(self.pos)
+        self.size.append(0)
+        self.pos.append(c)
+        self.cout.append(None)
+        self.cin.append(None)
+        for t in range(TRAVERSALS):
+            self.lo[t].append(0)
+            self.hi[t].append(0)
+        return c
+
+    def _label(self, t: int) -> None:
+        """GRAIL labels from one post-order traversal; children are visited forwards or backwards by ``t``."""
+        n = len(self.pos)
+        lo, hi = self.lo[t], self.hi[t]
+        done = bytearray(n)
+        rank = 0
+        roots = [c for c in range(n) if not self.cin[c]]
+        for root in roots if t == 0 else reversed(roots):
+            if done[root]:
+                continue
+            stack = [(root, self._children(root, t))]
+            done[root] = 1
+            low = {root: n}
+            while stack:
+                c, it = stack[-1]
+                for child in it:
+                    if not done[child]:
+                        done[child] = 1
+                        low[child] = n
+                        stack.append((child, self._children(child, t)))
+                        break
+                    low[c] = min(low[c], lo[child])
+                else:
+                    stack.pop()
+                    hi[c] = rank
+                    lo[c] = min(low.pop(c), rank)
+                    rank += 1
+                    if stack:
+                        parent = stack[-1][0]
+                        low[parent] = min(low[parent], lo[c])
+
+    def _children(self, c: int, t: int):
+        out = list(self.cout[c] or ())
+        return iter(out if t == 0 else reversed(out))
+
+    def _link(self, a: int, b: int, delta: int) -> bool:
+        """Adjust the condensed edge count a->b; returns True when the edge appears or disappears."""
+        if a == b:
+            return False
+        out = self.cout[a] if self.cout[a] is not None else {}
+        inc = self.cin[b] if self.cin[b] is not None else {}
+        count = out.get(b, 0) + delta
+        if count > 0:
+            out[b] = inc[a] = count
+        else:
+            out.pop(b, None)
+            inc.pop(a, None)
+        self.cout[a], self.cin[b] = out or None, inc or None
+        return count == delta or count <= 0
+
+    # ---- queries ----
+    def _contains(self, a: int, b: int) -> bool:
+        return all(
+            self.lo[t][a] <= self.lo[t][b] and self.hi[t][b] <= self.hi[t][a] for t in range(TRAVERSALS)
+        )
+
+    def reachable(self, src: int, dst: int) -> bool:
+        if self.dirty:
+            self.rebuild()
+        a, b = self.comp[src], self.comp[dst]
+        if a < 0 or b < 0:
+            return False
+        if a == b:
+            return True
+        target = self.pos[b]
+        if self.pos[a] >= target or not self._contains(a, b):
+            return False
+        seen = {a}
+        stack = [a]
+        while stack:
+            for c in self.cout[stack.pop()] or ():
+                if c == b:
+                    return True
+                if c in seen or self.pos[c] >= target or not self._contains(c, b):
+                    continue
+                seen.add(c)
+                stack.append(c)
+        return False
+
+    # ---- incremental maintenance (called by _Graph) ----
+    def node_added(self, slot: int) -> None:
+        if self.dirty:
+            return
+        if slot >= len(self.comp):
+            self.comp.extend([-1] * (slot + 1 - len(self.comp)))
+        c = self._new_component()
+        self.size[c] = 1
+        self.comp[slot] = c
+        for t in range(TRAVERSALS):
+            self.lo[t][c] = self.hi[t][c] = self.next_rank
+        self.next_rank += 1
+
+    def node_removed(self, slot: int) -> None:
+        if self.dirty:
+            return
+        c = self.comp[slot]
+        self.comp[slot] = -1
+        self.size[c] -= 1
+        if self.size[c] > 0:
+            self.dirty = True  # the rest of the component may fall apart
+
+    def edge_added(self, src: int, dst: int) -> None:
+        if self.dirty:
+            return
+        a, b = self.comp[src], self.comp[dst]
+        if a < 0 or b < 0:
+            self.dirty = True
+            return
+        if not self._link(a, b, 1):
+            return
+        if self.pos[a] > self.pos[b] and not self._reorder(a, b):
+            self.dirty = True  # the edge closed a cycle: components merge
+            return
+        self._widen(a, b)
+
+    def edge_removed(self, src: int, dst: int) -> None:
+        if self.dirty:
+            return
+        a, b = self.comp[src], self.comp[dst]
+        if a == b:
+            if self.size[a] > 1:
+                self.dirty = True
+            return
+        self._link(a, b, -1)
+
+    def _widen(self, a: int, b: int) -> None:
+        """Grow the labels of ``a`` and its ancestors until they contain ``b``'s."""
+        for t in range(TRAVERSALS):
+            lo, hi = self.lo[t], self.hi[t]
+            stack = [a]
+            while stack:
+                c = stack.pop()
+                if lo[c] <= lo[b] and hi[b] <= hi[c]:
+                    continue
+                lo[c] = min(lo[c], lo[b])
+                hi[c] = max(hi[c], hi[b])
+                stack.extend(self.cin[c] or ())
+
+    def _reorder(self, a: int, b: int) -> bool:
+        """Pearce-Kelly: restore pos[a] < pos[b] after inserting a->b; False if a is reachable from b."""
+        lower, upper = self.pos[b], self.pos[a]
+        forward: list[int] = []
+        seen = {b}
+        stack = [b]
+        while stack:
+            c = stack.pop()
+            forward.append(c)
+            for nxt in self.cout[c] or ():
+                if nxt == a:
+                    return False
+                if nxt not in seen and self.pos[nxt] < upper:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        backward: list[int] = []
+        seen = {a}
+        stack = [a]
+        while stack:
+            c = stack.pop()
+            backward.append(c)
+            for prev in self.cin[c] or ():
+                if prev not in seen and self.pos[prev] > lower:
+                    seen.add(prev)
+                    stack.append(prev)
+        backward.sort(key=self.pos.__getitem__)
+        forward.sort(key=self.pos.__getitem__)
+        slots = sorted(self.pos[c] for c in backward + forward)
+        for c, p in zip(backward + forward, slots):
+            self.pos[c] = p
+        return True
+
+    def stats(self) -> dict[str, int | bool]:
+        return {"dirty": self.dirty, "rebuilds": self.rebuilds, "components": 0 if self.dirty else len(self.pos)}
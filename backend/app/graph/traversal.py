@@ -0,0 +1,51 @@
+"""Traversals shared by the projection and the Neo4j-backed fallbacks."""
+from typing import Callable, Hashable, Iterable, Sequence, TypeVar
+
+
+N = TypeVar("N", bound=Hashable)
+
+
+def multi_source_bfs(
+    roots: Sequence[N], neighbors: Callable[[N], Iterable[N]], depth: int
+) -> dict[N, tuple[int, int, int]]:
+    """One BFS from all ``roots`` at once, with per-root attribution.
+
+    Returns node -> (minimum distance from any root, bitmask of the roots that
+    reach it within ``depth``, bitmask of the roots at that minimum distance),
+    where bit ``i`` stands for ``roots[i]``. A node is expanded once per level
+    in which it gains new root bits, so overlapping downstream sets are walked
+    together rather than once per root; the worst case is O((V + E) * depth).
+    """
+    seen: dict[N, int] = {}
+    dist: dict[N, int] = {}
+    nearest: dict[N, int] = {}
+    frontier: dict[N, int] = {}
+    for i, root in enumerate(roots):
+        frontier[root] = frontier.get(root, 0) | (1 << i)
+    for node, bits in frontier.items():
+        seen[node] = nearest[node] = bits
+        dist[node] = 0
+
+    level = 0
+    while frontier and level < depth:
+        level += 1
+        nxt: dict[N, int] = {}
+        for node, bits in frontier.items():
+            for other in neighbors(node):
+                new = bits & ~seen.get(other, 0)
+                if new:
+                    seen[other] = seen.get(other, 0) | new
+                    nxt[other] = nxt.get(other, 0) | new
+                    if dist.setdefault(other, level) == level:
+                        nearest[other] = nearest.get(other, 0) | new
+        frontier = nxt
+    return {node: (dist[node], bits, nearest[node]) for node, bits in seen.items()}
+
+
+def mask_members(mask: int, roots: Sequence[N]) -> list[N]:
+    members = []
+    while mask:
+        low = mask & -mask
+        members.append(roots[low.bit_length() - 1])
+        mask ^= low
+    return members
@@ -10,7 +10,17 @@ from app.db import SessionLocal
 from app.repositories.user_repo import UserRepository
 from app.models.user import User
 from app.core.security import get_password_hash
-from app.graph.client import get_neo4j_driver, ensure_constraints
+from app.graph.client import get_neo4j_driver, close_neo4j_driver, ensure_constraints, neo4j_pool_stats
+from app.graph.projection import lineage_projection
+from app.core.cache import get_job_redis_client, get_redis_client
+from app.services.lineage_cache import cache_stats, listen_for_invalidations
+from app.services.graph_outbox import GraphOutboxDispatcher, outbox_stats
+from app.services.bulk_jobs import BulkJobRunner, bulk_job_stats
+from app.services.cycle_index import CycleIndex, cycle_stats
+from app.services.criticality_index import CriticalityIndex, criticality_stats
+from app.services.lineage_service import graph_cache_stats, stage_stats
+from app.services.table_enrichment import enrichment_stats
+import asyncio
 import structlog
 
 
@@ -34,16 +44,89 @@ async def lifespan(app: FastAPI):
                 await repo.add(user)
                 await session.commit()
                 logger.info("bootstrap_admin_created", email=settings.ADMIN_EMAIL)
-    # Startup: ensure Neo4j constraints (best-effort)
+    # Startup: create the shared Neo4j driver and ensure constraints (best-effort)
+    driver = get_neo4j_driver()
     try:
-        driver = get_neo4j_driver()
         await ensure_constraints(driver)
-        await driver.close()
         logger.info("neo4j_constraints_ensured")
     except Exception as exc:  # pragma: no cover - external service
         logger.warning("neo4j_constraint_init_failed", error=str(exc))
+    # Startup: load the in-memory lineage projection (optional)
+    projection_redis = None
+    refresh_task = None
+    if settings.LINEAGE_PROJECTION_ENABLED:
+        projection_redis = get_redis_client()
+        try:
+            await lineage_projection.load(driver, projection_redis)
+        except Exception as exc:  # pragma: no cover - external service
+            logger.warning("lineage_projection_load_failed", error=str(exc))
+        if settings.LINEAGE_PROJECTION_REFRESH_SECONDS > 0:
+            refresh_task = asyncio.create_task(
+                lineage_projection.refresh_forever(
+                    driver, settings.LINEAGE_PROJECTION_REFRESH_SECONDS, projection_redis
+                )
+            )
+    # Startup: drop local L1 lineage cache entries when other workers write
+    invalidation_redis = get_redis_client()
+    invalidation_task = asyncio.create_task(listen_for_invalidations(invalidation_redis))
+    # Startup: sync committed table/field changes to Neo4j from the graph outbox
+    outbox_redis = None
+    outbox_task = None
+    if settings.GRAPH_OUTBOX_ENABLED:
+        outbox_redis = get_redis_client()
+        outbox_task = asyncio.create_task(GraphOutboxDispatcher(driver, redis=outbox_redis).run_forever())
+    # Startup: (re)build the persisted cycle index in the background and keep it converged (one process at a time)
+    cycle_redis = None
+    cycle_task = None
+    if settings.LINEAGE_CYCLE_REBUILD_SECONDS > 0:
+        cycle_redis = get_redis_client()
+        cycle_task = asyncio.create_task(
+            CycleIndex(driver, redis=cycle_redis).run_forever(
+                settings.LINEAGE_CYCLE_POLL_SECONDS, settings.LINEAGE_CYCLE_REBUILD_SECONDS
+            )
+        )
+    # Startup: materialise table criticality and fold lineage writes into it (one process at a time)
+    criticality_redis = None
+    criticality_task = None
+    if settings.LINEAGE_CRITICALITY_REBUILD_SECONDS > 0:
+        criticality_redis = get_redis_client()
+        criticality_task = asyncio.create_task(
+            CriticalityIndex(driver, redis=criticality_redis).run_forever(
+                settings.LINEAGE_CRITICALITY_POLL_SECONDS, settings.LINEAGE_CRITICALITY_REBUILD_SECONDS
+            )
+        )
+    # Startup: run queued bulk import jobs
+    job_redis = None
+    job_lineage_redis = None
+    job_task = None
+    if settings.BULK_JOB_WORKERS > 0:
+        job_redis = get_job_redis_client()
+        job_lineage_redis = get_redis_client()
+        job_task = asyncio.create_task(
+            BulkJobRunner(driver, job_redis, lineage_redis=job_lineage_redis).run_forever(settings.BULK_JOB_WORKERS)
+        )
     yield
-    # Shutdown: nothing yet
+    # Shutdown: stop background work, wait for it to unwind, then release pooled connections
+    tasks = [
+        task
+        for task in (refresh_task, invalidation_task, cycle_task, criticality_task, outbox_task, job_task)
+        if task is not None
+    ]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for client in (
+        projection_redis,
+        invalidation_redis,
+        cycle_redis,
+        criticality_redis,
+        outbox_redis,
+        job_redis,
+        job_lineage_redis,
+    ):
+        if client is not None:
+            await client.aclose()
+    await close_neo4j_driver()
 
 
 def create_app() -> FastAPI:
@@ -76,6 +159,21 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok"}
 
+    @app.get("/metrics")
+    async def metrics():
+        return {
+            "neo4j_pool": neo4j_pool_stats(),
+            "lineage_projection": lineage_projection.stats(),
+            "lineage_cache": cache_stats(),
+            "lineage_graph_cache": graph_cache_stats(),
+            "table_enrichment": enrichment_stats(),
+            "graph_outbox": outbox_stats(),
+            "lineage_cycles": cycle_stats(),
+            "table_criticality": criticality_stats(),
+            "lineage_stages": stage_stats(),
+            "bulk_jobs": bulk_job_stats(),
+        }
+
     return app
 
 
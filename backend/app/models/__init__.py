@@ -5,3 +5,6 @@ from app.models.table import MetadataTable  # noqa: F401
 from app.models.field import MetadataField  # noqa: F401
 from app.models.audit import ConnectionTestLog  # noqa: F401
 from app.models.ai import Conversation, Message  # noqa: F401
+from app.models.outbox import GraphOutboxEvent  # noqa: F401
+from app.models.lineage_cycle import LineageCycleComponent, LineageCycleMember  # noqa: F401
+from app.models.table_criticality import TableCriticality  # noqa: F401
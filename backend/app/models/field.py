@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Boolean, ForeignKey, String, Text
+from sqlalchemy import Boolean, ForeignKey, Index, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -8,6 +8,7 @@ from app.models.base import Base, TimestampMixin, generate_uuid
 
 class MetadataField(TimestampMixin, Base):
     __tablename__ = "fields"
+    __table_args__ = (Index("ix_fields_table_name", "table_id", "name"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     table_id: Mapped[uuid.UUID] = mapped_column(
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class LineageCycleComponent(Base):
+    """A non-trivial strongly connected component of the lineage graph."""
+
+    __tablename__ = "lineage_cycle_components"
+
+    # smallest member id, so a component keeps its key while its membership is unchanged
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    node_type: Mapped[str] = mapped_column(String(16), nullable=False)  # table | field
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    # bounded list of representative cycles: [{"nodes": [...], "edges": [...]}]
+    cycles: Mapped[list[dict[str, Any]]] = mapped_column(JSONB, nullable=False, default=list)
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class LineageCycleMember(Base):
+    __tablename__ = "lineage_cycle_members"
+
+    node_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    component_id: Mapped[str] = mapped_column(
+        String(64), ForeignKey("lineage_cycle_components.id", ondelete="CASCADE"), nullable=False, index=True
+    )
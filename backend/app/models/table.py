@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import BigInteger, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -8,6 +8,8 @@ from app.models.base import Base, TimestampMixin, generate_uuid
 
 class MetadataTable(TimestampMixin, Base):
     __tablename__ = "tables"
+    # bulk import upserts on this key (ON CONFLICT (source_id, name_normalized))
+    __table_args__ = (Index("ux_tables_source_norm", "source_id", "name_normalized", unique=True),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     source_id: Mapped[uuid.UUID | None] = mapped_column(
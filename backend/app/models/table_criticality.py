@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, LargeBinary, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class TableCriticality(Base):
+    """Reachability metrics of one table, maintained by the criticality index."""
+
+    __tablename__ = "table_criticality"
+    # GET /tables filters and sorts on a metric with table_id as tie-break
+    __table_args__ = tuple(
+        Index(f"ix_table_criticality_{metric}", metric, "table_id")
+        for metric in ("downstream_count", "upstream_count", "impacted_domains", "max_depth")
+    )
+
+    table_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("tables.id", ondelete="CASCADE"), primary_key=True
+    )
+    downstream_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    upstream_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    impacted_domains: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    max_depth: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # bottom-k sketches and downstream tags, the inputs incremental updates start from
+    downstream_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    upstream_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    downstream_domains: Mapped[list[str] | None] = mapped_column(ARRAY(String(64)), nullable=True)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
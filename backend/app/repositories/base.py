@@ -1,5 +1,7 @@
-from typing import Generic, Optional, Sequence, TypeVar
-from sqlalchemy import select
+from typing import Any, Generic, Mapping, Optional, Sequence, TypeVar
+from sqlalchemy import Column, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql.selectable import TableValuedAlias
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.base import Base
@@ -7,6 +9,19 @@ from app.models.base import Base
 ModelT = TypeVar("ModelT", bound=Base)
 
 
+def unnest_rows(columns: Sequence[Column[Any]], rows: Sequence[Mapping[str, Any]]) -> TableValuedAlias:
+    """``unnest($1::type[], $2::type[], ...) AS batch(col, ...)`` over ``rows`` keyed by the column names.
+
+    One array parameter per column however many rows: the statement text stays the
+    same for every batch (one prepared plan) and never nears the bind-parameter limit.
+    """
+    arrays = [
+        bindparam(f"rows_{col.name}", [row.get(col.name) for row in rows], type_=ARRAY(col.type))
+        for col in columns
+    ]
+    return func.unnest(*arrays).table_valued(*(col.name for col in columns)).render_derived(name="batch")
+
+
 class BaseRepository(Generic[ModelT]):
     def __init__(self, session: AsyncSession, model: type[ModelT]):
         self.session = session
@@ -0,0 +1,86 @@
+import uuid
+from typing import Any, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.table import MetadataTable
+from app.models.table_criticality import TableCriticality
+from app.repositories.base import BaseRepository, unnest_rows
+
+
+ROW_CHUNK = 2000  # rows per INSERT, well below the bind-parameter limit
+LOOKUP_CHUNK = 10000
+
+
+def _uuids(ids: Iterable[str]) -> list[uuid.UUID]:
+    out = []
+    for value in ids:
+        try:
+            out.append(uuid.UUID(str(value)))
+        except ValueError:
+            continue  # graph-only node ids never match a table row
+    return out
+
+
+class TableCriticalityRepository(BaseRepository[TableCriticality]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, TableCriticality)
+
+    async def domains(self, table_ids: Iterable[str] | None = None) -> dict[str, str | None]:
+        """table id -> primary tag id, for the given tables or all of them."""
+        query = select(MetadataTable.id, MetadataTable.primary_tag_id)
+        if table_ids is None:
+            result = await self.session.execute(query)
+            return {str(t): str(tag) if tag else None for t, tag in result.all()}
+        ids = _uuids(table_ids)
+        mapping: dict[str, str | None] = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            result = await self.session.execute(query.where(MetadataTable.id.in_(ids[start:start + LOOKUP_CHUNK])))
+            mapping.update({str(t): str(tag) if tag else None for t, tag in result.all()})
+        return mapping
+
+    async def get_many(self, table_ids: Iterable[str]) -> dict[str, TableCriticality]:
+        ids = _uuids(table_ids)
+        rows: dict[str, TableCriticality] = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            result = await self.session.execute(
+                select(TableCriticality).where(TableCriticality.table_id.in_(ids[start:start + LOOKUP_CHUNK]))
+            )
+            rows.update({str(row.table_id): row for row in result.scalars().all()})
+        return rows
+
+    async def upsert(self, rows: list[dict[str, Any]]) -> None:
+        """Insert or update rows; only the columns present in the rows are overwritten.
+
+        All rows in one call must carry the same keys, including ``table_id``.
+        """
+        if not rows:
+            return
+        columns = [c for c in rows[0] if c != "table_id"]
+        for start in range(0, len(rows), ROW_CHUNK):
+            chunk = [{**row, "table_id": uuid.UUID(str(row["table_id"]))} for row in rows[start:start + ROW_CHUNK]]
+            stmt = insert(TableCriticality).values(chunk)
+            set_ = {c: getattr(stmt.excluded, c) for c in columns}
+            set_["computed_at"] = stmt.excluded.computed_at
+            stmt = stmt.on_conflict_do_update(index_elements=[TableCriticality.table_id], set_=set_)
+            await self.session.execute(stmt)
+
+    async def ensure_rows(self, table_ids: Iterable[uuid.UUID]) -> None:
+        """Add zero rows for tables without one: every table has a row, so GET /tables can join and sort on the indexes."""
+        ids = list(table_ids)
+        if not ids:
+            return
+        table = TableCriticality.__table__
+        batch = unnest_rows([table.c.table_id], [{"table_id": t} for t in ids])
+        stmt = insert(table).from_select(["table_id"], select(batch.c.table_id))
+        await self.session.execute(stmt.on_conflict_do_nothing(index_elements=[table.c.table_id]))
+
+    async def replace(self, rows: list[dict[str, Any]]) -> None:
+        """Overwrite the rows of a full recompute.
+
+        Nothing is deleted first: rows of deleted tables go with them (ON DELETE
+        CASCADE), and a table created during the recompute keeps its zero row.
+        """
+        await self.upsert(rows)
@@ -0,0 +1,88 @@
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.lineage_cycle import LineageCycleComponent, LineageCycleMember
+from app.repositories.base import BaseRepository
+
+
+MEMBER_CHUNK = 5000  # rows per INSERT, well below the bind-parameter limit
+
+
+class LineageCycleRepository(BaseRepository[LineageCycleComponent]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, LineageCycleComponent)
+
+    async def component_for(self, node_id: str) -> Optional[LineageCycleComponent]:
+        result = await self.session.execute(
+            select(LineageCycleComponent)
+            .join(LineageCycleMember, LineageCycleMember.component_id == LineageCycleComponent.id)
+            .where(LineageCycleMember.node_id == node_id)
+        )
+        return result.scalars().first()
+
+    async def list_components(self, node_type: str | None = None) -> Sequence[LineageCycleComponent]:
+        query = select(LineageCycleComponent)
+        if node_type:
+            query = query.where(LineageCycleComponent.node_type == node_type)
+        result = await self.session.execute(query.order_by(LineageCycleComponent.id))
+        return result.scalars().all()
+
+    async def memberships(self, node_ids: Iterable[str]) -> dict[str, str]:
+        """node id -> component id for the given nodes that are on a cycle."""
+        ids = list(node_ids)
+        if not ids:
+            return {}
+        result = await self.session.execute(
+            select(LineageCycleMember.node_id, LineageCycleMember.component_id).where(LineageCycleMember.node_id.in_(ids))
+        )
+        return {node_id: component_id for node_id, component_id in result.all()}
+
+    async def all_memberships(self) -> dict[str, str]:
+        result = await self.session.execute(select(LineageCycleMember.node_id, LineageCycleMember.component_id))
+        return {node_id: component_id for node_id, component_id in result.all()}
+
+    async def members_of(self, component_ids: Iterable[str]) -> list[str]:
+        ids = list(component_ids)
+        if not ids:
+            return []
+        result = await self.session.execute(
+            select(LineageCycleMember.node_id).where(LineageCycleMember.component_id.in_(ids))
+        )
+        return list(result.scalars().all())
+
+    async def replace(self, old_component_ids: Iterable[str] | None, components: list[dict[str, Any]]) -> None:
+        """Swap components for recomputed ones; ``None`` replaces the whole index.
+
+        Each component dict carries ``id``, ``node_type``, ``members`` and ``cycles``.
+        """
+        if old_component_ids is None:
+            await self.session.execute(delete(LineageCycleComponent))
+        else:
+            old = list(old_component_ids)
+            if old:
+                await self.session.execute(delete(LineageCycleComponent).where(LineageCycleComponent.id.in_(old)))
+        for component in components:
+            stmt = insert(LineageCycleComponent).values(
+                id=component["id"],
+                node_type=component["node_type"],
+                size=len(component["members"]),
+                cycles=component["cycles"],
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[LineageCycleComponent.id],
+                set_={"node_type": stmt.excluded.node_type, "size": stmt.excluded.size, "cycles": stmt.excluded.cycles},
+            )
+            await self.session.execute(stmt)
+            node_ids = component["members"]
+            for start in range(0, len(node_ids), MEMBER_CHUNK):
+                members = insert(LineageCycleMember).values(
+                    [{"node_id": node_id, "component_id": component["id"]} for node_id in node_ids[start:start + MEMBER_CHUNK]]
+                )
+                members = members.on_conflict_do_update(
+                    index_elements=[LineageCycleMember.node_id],
+                    set_={"component_id": members.excluded.component_id},
+                )
+                await self.session.execute(members)
@@ -1,9 +1,26 @@
-from typing import Sequence
-from sqlalchemy import select
+import uuid
+from typing import Any, Sequence
+from sqlalchemy import Row, exists, false, func, select, true, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.field import MetadataField
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, unnest_rows
+
+
+# columns written by upsert_many; the optional ones keep their stored value when
+# the incoming one is empty
+UPSERT_COLUMNS = (
+    "id",
+    "table_id",
+    "name",
+    "data_type",
+    "description",
+    "is_nullable",
+    "is_primary_key",
+    "is_foreign_key",
+)
+UPSERT_KEEP_STORED = ("description", "is_nullable", "is_primary_key", "is_foreign_key")
 
 
 class FieldRepository(BaseRepository[MetadataField]):
@@ -23,3 +40,47 @@ class FieldRepository(BaseRepository[MetadataField]):
             select(MetadataField).where(MetadataField.table_id == table_id)
         )
         return result.scalars().all()
+
+    async def ids_by_key(self, keys: list[tuple[uuid.UUID, str]]) -> dict[tuple[uuid.UUID, str], uuid.UUID]:
+        """(table_id, name) -> field id for the keys that exist, in one join on ix_fields_table_name.
+
+        Of duplicate names within a table, one id is returned.
+        """
+        if not keys:
+            return {}
+        fields = MetadataField.__table__
+        batch = unnest_rows([fields.c.table_id, fields.c.name], [{"table_id": t, "name": n} for t, n in keys])
+        stmt = select(fields.c.id, fields.c.table_id, fields.c.name).join(
+            batch, (fields.c.table_id == batch.c.table_id) & (fields.c.name == batch.c.name)
+        )
+        result = await self.session.execute(stmt)
+        return {(table_id, name): field_id for field_id, table_id, name in result.all()}
+
+    async def upsert_many(self, rows: list[dict[str, Any]]) -> Sequence[Row]:
+        """Insert or update fields by ``(table_id, name)`` in one statement.
+
+        ``fields`` has no unique key to resolve a conflict on (older catalogs may
+        hold duplicate names), so the batch is merged instead: one CTE updates the
+        fields that exist, another inserts the rest. Rows carry ``UPSERT_COLUMNS``
+        and must not repeat a key. Returns id, name, data_type and table_id of every
+        written row, with ``inserted`` false for rows that already existed.
+        """
+        if not rows:
+            return []
+        fields = MetadataField.__table__
+        batch = select(unnest_rows([fields.c[name] for name in UPSERT_COLUMNS], rows)).cte("batch_rows")
+        same_key = (fields.c.table_id == batch.c.table_id) & (fields.c.name == batch.c.name)
+        values = {"data_type": batch.c.data_type, "updated_at": func.now()}
+        for name in UPSERT_KEEP_STORED:
+            values[name] = func.coalesce(batch.c[name], fields.c[name])
+        returned = (fields.c.id, fields.c.name, fields.c.data_type, fields.c.table_id)
+        updated = update(fields).where(same_key).values(values).returning(*returned).cte("updated")
+        inserted = (
+            insert(fields)
+            .from_select(list(UPSERT_COLUMNS), select(*batch.c).where(~exists().where(same_key)))
+            .returning(*returned)
+            .cte("inserted")
+        )
+        stmt = select(*updated.c, false().label("inserted")).union_all(select(*inserted.c, true().label("inserted")))
+        result = await self.session.execute(stmt)
+        return result.all()
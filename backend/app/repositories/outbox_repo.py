@@ -0,0 +1,98 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.field import MetadataField
+from app.models.outbox import GraphOutboxEvent
+from app.models.table import MetadataTable
+from app.repositories.base import BaseRepository
+
+
+def table_payload(table: MetadataTable) -> dict[str, Any]:
+    return {
+        "id": str(table.id),
+        "name": table.name,
+        "schema_name": table.schema_name,
+        "qualified_name": table.qualified_name,
+        "source_id": str(table.source_id) if table.source_id else None,
+    }
+
+
+def field_payload(field: MetadataField) -> dict[str, Any]:
+    return {
+        "id": str(field.id),
+        "name": field.name,
+        "data_type": field.data_type,
+        "table_id": str(field.table_id),
+    }
+
+
+class GraphOutboxRepository(BaseRepository[GraphOutboxEvent]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, GraphOutboxEvent)
+
+    def enqueue_table(self, table: MetadataTable) -> None:
+        self._enqueue("table", table.id, "upsert", table_payload(table))
+
+    def enqueue_field(self, field: MetadataField) -> None:
+        self._enqueue("field", field.id, "upsert", field_payload(field))
+
+    async def enqueue_upserts(self, entity_type: str, rows: Sequence[Any]) -> None:
+        """Queue upserts for rows written by a set-based statement (anything with the payload attributes)."""
+        if not rows:
+            return
+        payload = table_payload if entity_type == "table" else field_payload
+        await self.session.execute(
+            insert(GraphOutboxEvent.__table__),
+            [{"entity_type": entity_type, "entity_id": row.id, "op": "upsert", "payload": payload(row)} for row in rows],
+        )
+
+    def enqueue_delete(self, entity_type: str, entity_id: uuid.UUID | str) -> None:
+        self._enqueue(entity_type, entity_id, "delete", {"id": str(entity_id)})
+
+    def _enqueue(self, entity_type: str, entity_id: uuid.UUID | str, op: str, payload: dict[str, Any]) -> None:
+        # Added to the caller's session, so the event commits (or rolls back) with the change itself.
+        entity_uuid = entity_id if isinstance(entity_id, uuid.UUID) else uuid.UUID(str(entity_id))
+        self.session.add(GraphOutboxEvent(entity_type=entity_type, entity_id=entity_uuid, op=op, payload=payload))
+
+    async def claim_batch(self, limit: int) -> Sequence[GraphOutboxEvent]:
+        """Lock up to ``limit`` due events, at most the oldest one per entity.
+
+        An event is only claimable once every earlier event for the same entity is
+        gone, so concurrent dispatchers never apply one entity's changes out of order.
+        """
+        earlier = aliased(GraphOutboxEvent)
+        stmt = (
+            select(GraphOutboxEvent)
+            .where(GraphOutboxEvent.available_at <= func.now())
+            .where(
+                ~exists().where(
+                    earlier.entity_id == GraphOutboxEvent.entity_id,
+                    earlier.id < GraphOutboxEvent.id,
+                )
+            )
+            .order_by(GraphOutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def remove(self, ids: list[int]) -> None:
+        if ids:
+            await self.session.execute(delete(GraphOutboxEvent).where(GraphOutboxEvent.id.in_(ids)))
+
+    def mark_failed(self, events: Sequence[GraphOutboxEvent], error: str, max_backoff: float) -> None:
+        now = datetime.now(timezone.utc)
+        for event in events:
+            event.attempts += 1
+            event.last_error = error[:2000]
+            event.available_at = now + timedelta(seconds=min(2 ** event.attempts, max_backoff))
+
+    async def pending_count(self) -> int:
+        result = await self.session.execute(select(func.count()).select_from(GraphOutboxEvent))
+        return int(result.scalar_one())
@@ -1,10 +1,22 @@
-from typing import Sequence
+from typing import Any, Sequence
 import uuid
-from sqlalchemy import func, select
+from sqlalchemy import Row, any_, bindparam, func, literal_column, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.table import MetadataTable
-from app.repositories.base import BaseRepository
+from app.models.table_criticality import TableCriticality
+from app.repositories.base import BaseRepository, unnest_rows
+from app.repositories.criticality_repo import TableCriticalityRepository
+
+
+# columns written by upsert_many; schema_name, qualified_name and description keep
+# their stored value when the incoming one is empty
+UPSERT_COLUMNS = ("id", "source_id", "name", "name_normalized", "schema_name", "qualified_name", "description")
+UPSERT_KEEP_STORED = ("schema_name", "qualified_name", "description")
+
+# GET /tables sort keys backed by table_criticality (every table has a row, zeros until computed)
+CRITICALITY_SORTS = ("downstream_count", "upstream_count", "impacted_domains", "max_depth")
 
 
 class TableRepository(BaseRepository[MetadataTable]):
@@ -52,7 +64,8 @@ class TableRepository(BaseRepository[MetadataTable]):
             )
             .outerjoin(Tag, MetadataTable.primary_tag_id == Tag.id)
             .outerjoin(DataSource, MetadataTable.source_id == DataSource.id)
-            .where(MetadataTable.id.in_(table_ids))
+            # one array parameter however many ids: short statement text and a reusable prepared plan
+            .where(MetadataTable.id == any_(bindparam("table_ids", list(table_ids), type_=ARRAY(UUID(as_uuid=True)))))
         )
         result = await self.session.execute(stmt)
         mapping: dict[str, dict] = {}
@@ -85,6 +98,63 @@ class TableRepository(BaseRepository[MetadataTable]):
             }
         return mapping
 
+    async def ids_with_primary_tags(self, tag_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        if not tag_ids:
+            return []
+        result = await self.session.execute(select(MetadataTable.id).where(MetadataTable.primary_tag_id.in_(tag_ids)))
+        return list(result.scalars().all())
+
+    async def ids_for_source(self, source_id: uuid.UUID) -> list[uuid.UUID]:
+        result = await self.session.execute(select(MetadataTable.id).where(MetadataTable.source_id == source_id))
+        return list(result.scalars().all())
+
+    async def ids_by_key(self, keys: list[tuple[uuid.UUID, str]]) -> dict[tuple[uuid.UUID, str], uuid.UUID]:
+        """(source_id, name_normalized) -> table id for the keys that exist, in one indexed join."""
+        if not keys:
+            return {}
+        table = MetadataTable.__table__
+        batch = unnest_rows(
+            [table.c.source_id, table.c.name_normalized],
+            [{"source_id": source_id, "name_normalized": name} for source_id, name in keys],
+        )
+        stmt = select(table.c.id, table.c.source_id, table.c.name_normalized).join(
+            batch,
+            (table.c.source_id == batch.c.source_id) & (table.c.name_normalized == batch.c.name_normalized),
+        )
+        result = await self.session.execute(stmt)
+        return {(source_id, name): table_id for table_id, source_id, name in result.all()}
+
+    async def upsert_many(self, rows: list[dict[str, Any]]) -> Sequence[Row]:
+        """Insert or update tables by ``(source_id, name_normalized)`` in one statement.
+
+        Rows carry ``UPSERT_COLUMNS`` and must not repeat a key. Returns id, name,
+        schema_name, qualified_name and source_id of every written row, with
+        ``inserted`` false for rows that already existed.
+        """
+        if not rows:
+            return []
+        table = MetadataTable.__table__
+        batch = unnest_rows([table.c[name] for name in UPSERT_COLUMNS], rows)
+        stmt = insert(table).from_select(list(UPSERT_COLUMNS), select(*batch.c))
+        set_ = {"name": stmt.excluded.name, "updated_at": func.now()}
+        for name in UPSERT_KEEP_STORED:
+            set_[name] = func.coalesce(stmt.excluded[name], table.c[name])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.source_id, table.c.name_normalized], set_=set_
+        ).returning(
+            table.c.id,
+            table.c.name,
+            table.c.schema_name,
+            table.c.qualified_name,
+            table.c.source_id,
+            # xmax is only set on a row version written by the DO UPDATE branch
+            literal_column("(xmax = 0)").label("inserted"),
+        )
+        result = await self.session.execute(stmt)
+        written = result.all()
+        await TableCriticalityRepository(self.session).ensure_rows(row.id for row in written if row.inserted)
+        return written
+
     async def paginate(
         self,
         page: int,
@@ -94,10 +164,24 @@ class TableRepository(BaseRepository[MetadataTable]):
         tag_ids: list[str] | None = None,
         tag_match: str | None = "any",
         include_subtags: bool = False,
+        sort: str | None = None,
+        order: str = "desc",
+        min_metrics: dict[str, int] | None = None,
     ) -> tuple[Sequence[MetadataTable], int]:
         query = select(MetadataTable)
         count_query = select(func.count()).select_from(MetadataTable)
 
+        min_metrics = {k: v for k, v in (min_metrics or {}).items() if v is not None}
+        if sort in CRITICALITY_SORTS or min_metrics:
+            # inner join on the raw columns, so the (metric, table_id) indexes serve filter and order
+            join_on = TableCriticality.table_id == MetadataTable.id
+            query = query.join(TableCriticality, join_on)
+            count_query = count_query.join(TableCriticality, join_on)
+            for metric, minimum in min_metrics.items():
+                condition = getattr(TableCriticality, metric) >= minimum
+                query = query.where(condition)
+                count_query = count_query.where(condition)
+
         if search:
             pattern = f"%{search}%"
             query = query.where(MetadataTable.name.ilike(pattern))
@@ -130,7 +214,13 @@ class TableRepository(BaseRepository[MetadataTable]):
         total_result = await self.session.execute(count_query)
         total = total_result.scalar_one()
 
-        result = await self.session.execute(
-            query.offset((page - 1) * size).limit(size).order_by(MetadataTable.created_at.desc())
-        )
+        if sort in CRITICALITY_SORTS:
+            metric, tie = getattr(TableCriticality, sort), TableCriticality.table_id
+            if order == "asc":
+                query = query.order_by(metric.asc(), tie.asc())
+            else:
+                query = query.order_by(metric.desc(), tie.desc())
+        else:
+            query = query.order_by(MetadataTable.created_at.desc())
+        result = await self.session.execute(query.offset((page - 1) * size).limit(size))
         return result.scalars().all(), total
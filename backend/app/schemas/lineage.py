@@ -44,6 +44,27 @@ class LineageRelationship(BaseModel):
     confidence: Optional[float] = None
 
 
+class TableLineageBatchRequest(BaseModel):
+    items: list[TableLineageCreateRequest] = Field(min_length=1)
+
+
+class FieldLineageBatchRequest(BaseModel):
+    items: list[FieldLineageCreateRequest] = Field(min_length=1)
+
+
+class LineageBatchItemResult(BaseModel):
+    index: int
+    status: Literal["created", "error"]
+    relationship: Optional[LineageRelationship] = None
+    error: Optional[str] = None
+
+
+class LineageBatchResponse(BaseModel):
+    created: int = 0
+    failed: int = 0
+    results: list[LineageBatchItemResult] = Field(default_factory=list)
+
+
 class LineageGraphNode(BaseModel):
     id: str
     label: Optional[str] = None
@@ -86,6 +107,8 @@ class TracePathItem(BaseModel):
     field_id: str
     field_name: Optional[str] = None
     distance: int
+    # neighbour one hop closer to the traced field on a shortest path; follow it to rebuild the path
+    via_field_id: Optional[str] = None
     primary_tag_path: Optional[str] = None
     source_name: Optional[str] = None
 
@@ -107,17 +130,31 @@ class FieldTraceResponse(BaseModel):
     trace_path: TracePath
     involved_tables: list[str] = Field(default_factory=list)
     involved_fields: list[str] = Field(default_factory=list)
+    # set when a direction hit LINEAGE_TRACE_MAX_RESULTS; the nearest fields are kept
+    truncated: bool = False
 
 
 class PathItem(BaseModel):
     path: list[str] = Field(default_factory=list)
     length: int | None = None
+    cost: float | None = None
+    edge_ids: list[str] = Field(default_factory=list)
 
 
 class PathsResponse(BaseModel):
     nodes: list[LineageGraphNode] = Field(default_factory=list)
     edges: list[LineageGraphEdge] = Field(default_factory=list)
     paths: list[PathItem] = Field(default_factory=list)
+    # set when the path limit or time budget stopped the search: "limit" | "timeout"
+    truncated: Optional[str] = None
+
+
+class ReachabilityResponse(BaseModel):
+    from_id: str
+    to_id: str
+    reachable: bool
+    # what answered: the in-process reachability index or a Neo4j traversal
+    index: Literal["projection", "neo4j"]
 
 
 class CycleListResponse(BaseModel):
@@ -166,6 +203,45 @@ class BlastRadiusResponse(BaseModel):
     depth_map: dict[int, int] = Field(default_factory=dict)
 
 
+class ChangeSetImpactRequest(BaseModel):
+    root_ids: list[str] = Field(min_length=1, max_length=1000)
+    direction: Literal["upstream", "downstream"] = "downstream"
+    depth: int = Field(default=5, ge=1, le=20)
+
+
+class ChangeSetImpactedTable(BaseModel):
+    id: str
+    name: Optional[str] = None
+    distance: int
+    # roots that reach this table within `depth`, and the nearest of them
+    roots: list[str] = Field(default_factory=list)
+    nearest_root: Optional[str] = None
+    primary_tag: Optional[dict[str, Any]] = None
+    source_name: Optional[str] = None
+
+
+class ChangeSetRootSummary(BaseModel):
+    root_id: str
+    impacted_tables: int
+    # tables impacted by this root and no other root in the change set
+    exclusive_tables: int
+
+
+class ChangeSetImpactResponse(BaseModel):
+    root_ids: list[str]
+    direction: Literal["upstream", "downstream"]
+    depth: int
+    missing_roots: list[str] = Field(default_factory=list)
+    total_impacted_tables: int
+    total_impacted_domains: int
+    max_depth_reached: int
+    severity_level: Literal["high", "medium", "low"]
+    impacted: list[ChangeSetImpactedTable] = Field(default_factory=list)
+    per_root: list[ChangeSetRootSummary] = Field(default_factory=list)
+    domain_groups: list[DomainGroup] = Field(default_factory=list)
+    depth_map: dict[int, int] = Field(default_factory=dict)
+
+
 class QualityCheckNode(BaseModel):
     id: str
     name: Optional[str] = None
@@ -15,6 +15,16 @@ class TagSummary(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TableCriticality(BaseModel):
+    downstream_count: int = 0
+    upstream_count: int = 0
+    impacted_domains: int = 0
+    max_depth: int = 0
+    computed_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class TableBase(BaseModel):
     source_id: str | None = None
     name: str
@@ -56,6 +66,7 @@ class Table(BaseModel):
     field_count: int | None = None
     schema_name: str | None = None
     qualified_name: str | None = None
+    criticality: TableCriticality | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
 
@@ -0,0 +1,285 @@
+"""Streaming export of the whole catalog.
+
+Records are produced in chunks of ``BULK_EXPORT_CHUNK_SIZE``: tables, fields,
+tags and table-tag links come from Postgres through server-side cursors
+(``AsyncSession.stream`` with ``yield_per``), table and field lineage from
+Neo4j in pages of source nodes walked in id order, each page its own short
+read. Every record carries a ``type`` (``table``, ``field``, ``tag``,
+``table_tag``, ``table_lineage``, ``field_lineage``). Table, field and lineage
+records use the column names the importer reads; the importer skips ``tag`` and
+``table_tag`` records, so importing an export does not restore tagging.
+
+``encode`` turns the chunks into the bytes of the requested format as they
+arrive: CSV and XLSX share one header covering every record type, JSON is one
+array, NDJSON one object per line and YAML one sequence. An XLSX file can only
+be sent once complete, so it is built with openpyxl's write-only workbook in a
+temporary file (rows are not kept in memory) and then streamed; a sheet holds
+at most ``XLSX_MAX_ROWS`` rows and the rest go to further sheets.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterable, Mapping
+
+import yaml
+from neo4j import AsyncDriver
+from openpyxl import Workbook
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.graph import queries
+from app.models.field import MetadataField
+from app.models.table import MetadataTable
+from app.models.tag import TableTag, Tag
+
+
+EXPORT_FORMATS = {"csv", "json", "ndjson", "yaml", "yml", "xlsx"}
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "yaml": "application/x-yaml",
+    "yml": "application/x-yaml",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+COLUMNS = (
+    "type",
+    "id",
+    "name",
+    "source_id",
+    "schema_name",
+    "qualified_name",
+    "table_type",
+    "row_count",
+    "field_count",
+    "primary_tag_id",
+    "table_id",
+    "data_type",
+    "is_nullable",
+    "is_primary_key",
+    "is_foreign_key",
+    "parent_id",
+    "level",
+    "path",
+    "tag_id",
+    "source_table_id",
+    "target_table_id",
+    "source_field_id",
+    "target_field_id",
+    "lineage_source",
+    "transformation_type",
+    "transformation_logic",
+    "confidence",
+    "description",
+    "created_at",
+    "updated_at",
+)
+
+XLSX_MAX_ROWS = 1_048_576  # per sheet, header included
+FILE_BLOCK = 1 << 20
+
+Record = dict[str, Any]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _record(kind: str, row: Mapping[str, Any], renames: Mapping[str, str] | None = None) -> Record:
+    renames = renames or {}
+    out: Record = {"type": kind}
+    for key, value in row.items():
+        out[renames.get(key, key)] = _plain(value)
+    return out
+
+
+# (record type, query, column renames); each query has a stable order so exports are reproducible
+_PG_SOURCES: tuple[tuple[str, Select, dict[str, str]], ...] = (
+    (
+        "table",
+        select(
+            MetadataTable.id,
+            MetadataTable.name,
+            MetadataTable.source_id,
+            MetadataTable.schema_name,
+            MetadataTable.qualified_name,
+            MetadataTable.type,
+            MetadataTable.row_count,
+            MetadataTable.field_count,
+            MetadataTable.primary_tag_id,
+            MetadataTable.description,
+            MetadataTable.created_at,
+            MetadataTable.updated_at,
+        ).order_by(MetadataTable.id),
+        {"type": "table_type"},
+    ),
+    (
+        "field",
+        select(
+            MetadataField.id,
+            MetadataField.table_id,
+            MetadataField.name,
+            MetadataField.data_type,
+            MetadataField.is_nullable,
+            MetadataField.is_primary_key,
+            MetadataField.is_foreign_key,
+            MetadataField.description,
+            MetadataField.created_at,
+            MetadataField.updated_at,
+        ).order_by(MetadataField.table_id, MetadataField.id),
+        {},
+    ),
+    # parents before children
+    ("tag", select(Tag.id, Tag.name, Tag.parent_id, Tag.level, Tag.path).order_by(Tag.level, Tag.path), {}),
+    ("table_tag", select(TableTag.table_id, TableTag.tag_id).order_by(TableTag.table_id, TableTag.tag_id), {}),
+)
+
+# (record type, query, endpoint column names)
+_LINEAGE_SOURCES = (
+    ("table_lineage", queries.EXPORT_TABLE_LINEAGE, ("source_table_id", "target_table_id")),
+    ("field_lineage", queries.EXPORT_FIELD_LINEAGE, ("source_field_id", "target_field_id")),
+)
+
+
+async def iter_catalog(
+    session: AsyncSession, driver: AsyncDriver | None, chunk_size: int
+) -> AsyncIterator[list[Record]]:
+    """Every exported record, in chunks of at most ``chunk_size``; lineage is left out without a driver."""
+    for kind, stmt, renames in _PG_SOURCES:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.mappings().partitions():
+            yield [_record(kind, row, renames) for row in rows]
+    if driver is None:
+        return
+    for kind, query, (from_key, to_key) in _LINEAGE_SOURCES:
+        async for chunk in _iter_lineage(driver, query, chunk_size):
+            yield [_record(kind, row, {"source_id": from_key, "target_id": to_key}) for row in chunk]
+
+
+async def _iter_lineage(driver: AsyncDriver, query: str, page_size: int) -> AsyncIterator[list[Record]]:
+    """Outgoing edges of ``page_size`` source nodes at a time, keyed on the node id index."""
+    after = ""
+    while True:
+        rows: list[Record] = []
+        sources: set[str] = set()
+        async with driver.session() as session:
+            result = await session.run(query, after=after, limit=page_size)
+            async for rec in result:
+                sources.add(rec["source_id"])
+                if rec["target_id"] is not None:
+                    rows.append(dict(rec))
+        if rows:
+            yield rows
+        if len(sources) < page_size:
+            return
+        after = max(sources)
+
+
+# ---- encoders ----
+
+def _csv_lines(records: Iterable[Record], header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS, extrasaction="ignore", lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return buf.getvalue().encode("utf-8")
+
+
+async def _encode_csv(chunks: AsyncIterator[list[Record]]) -> AsyncIterator[bytes]:
+    header = True
+    async for chunk in chunks:
+        yield _csv_lines(chunk, header)
+        header = False
+    if header:
+        yield _csv_lines((), True)
+
+
+async def _encode_json(chunks: AsyncIterator[list[Record]]) -> AsyncIterator[bytes]:
+    sep = "[\n"
+    async for chunk in chunks:
+        if chunk:
+            yield (sep + ",\n".join(json.dumps(rec) for rec in chunk)).encode("utf-8")
+            sep = ",\n"
+    yield b"[]\n" if sep == "[\n" else b"\n]\n"
+
+
+async def _encode_ndjson(chunks: AsyncIterator[list[Record]]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield "".join(json.dumps(rec) + "\n" for rec in chunk).encode("utf-8")
+
+
+async def _encode_yaml(chunks: AsyncIterator[list[Record]]) -> AsyncIterator[bytes]:
+    empty = True
+    async for chunk in chunks:
+        if chunk:
+            # block-style lists of one chunk each concatenate into one sequence
+            yield yaml.safe_dump(chunk, sort_keys=False, allow_unicode=True).encode("utf-8")
+            empty = False
+    if empty:
+        yield b"[]\n"
+
+
+class _XlsxWriter:
+    def __init__(self) -> None:
+        self.workbook = Workbook(write_only=True)
+        self.sheets = 0
+        self.sheet = None
+        self.rows = 0
+
+    def _next_sheet(self) -> None:
+        self.sheets += 1
+        self.sheet = self.workbook.create_sheet("catalog" if self.sheets == 1 else f"catalog_{self.sheets}")
+        self.sheet.append(COLUMNS)
+        self.rows = 1
+
+    def append(self, records: list[Record]) -> None:
+        for rec in records:
+            if self.sheet is None or self.rows >= XLSX_MAX_ROWS:
+                self._next_sheet()
+            self.sheet.append([rec.get(c) for c in COLUMNS])
+            self.rows += 1
+
+    def save(self, path: str) -> None:
+        if self.sheet is None:
+            self._next_sheet()
+        self.workbook.save(path)
+
+
+async def _encode_xlsx(chunks: AsyncIterator[list[Record]]) -> AsyncIterator[bytes]:
+    writer = _XlsxWriter()
+    fd, path = tempfile.mkstemp(prefix="bulk-export-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(writer.append, chunk)
+        await asyncio.to_thread(writer.save, path)
+        with open(path, "rb") as fh:
+            while block := await asyncio.to_thread(fh.read, FILE_BLOCK):
+                yield block
+    finally:
+        os.unlink(path)
+
+
+_ENCODERS: dict[str, Callable[[AsyncIterator[list[Record]]], AsyncIterator[bytes]]] = {
+    "csv": _encode_csv,
+    "json": _encode_json,
+    "ndjson": _encode_ndjson,
+    "yaml": _encode_yaml,
+    "yml": _encode_yaml,
+    "xlsx": _encode_xlsx,
+}
+
+
+def encode(chunks: AsyncIterator[list[Record]], file_format: str) -> AsyncIterator[bytes]:
+    return _ENCODERS[file_format.lower()](chunks)
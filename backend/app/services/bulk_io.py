@@ -0,0 +1,223 @@
+"""Streaming readers for bulk import files.
+
+Uploads are spooled to a temporary file and parsed incrementally, so memory
+stays flat however large the file is:
+
+* CSV: pandas in ``chunksize`` slices;
+* JSON: a top-level array is decoded one element at a time, anything else is
+  read as NDJSON (one object per line);
+* YAML: items of a top-level sequence are composed and constructed one by one;
+* XLSX: openpyxl in read-only mode, every worksheet in order, each with its
+  first row as header.
+
+Parsing is blocking, so ``read_chunks`` runs each step of the parser in a
+worker thread and hands lists of at most ``chunk_size`` records to the event
+loop.
+"""
+import asyncio
+import io
+import json
+import math
+import os
+import tempfile
+import zipfile
+from itertools import chain, islice
+from typing import IO, Any, AsyncIterator, Iterator
+
+import pandas as pd
+import yaml
+from fastapi import UploadFile
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+
+SPOOL_BLOCK = 1 << 20
+JSON_BLOCK = 1 << 16
+JSON_MAX_ELEMENT = 1 << 26  # a larger array element is treated as malformed input
+
+
+class ParseError(ValueError):
+    """The file could not be read in the declared format."""
+
+
+Source = str | bytes  # a spooled file path, or the file content for small in-memory inputs
+
+
+async def spool_upload(upload: UploadFile, directory: str | None = None, prefix: str = "bulk-") -> str:
+    """Copy an upload to a temporary file block by block and return its path; the caller removes it."""
+    fd, path = tempfile.mkstemp(prefix=prefix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while block := await upload.read(SPOOL_BLOCK):
+                await asyncio.to_thread(out.write, block)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _open(source: Source) -> IO[bytes]:
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def _clean(value: Any) -> Any:
+    # empty spreadsheet cells come back as NaN
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def iter_csv(source: Source, chunk_size: int) -> Iterator[dict[str, Any]]:
+    with _open(source) as fh:
+        try:
+            reader = pd.read_csv(fh, chunksize=chunk_size)
+        except pd.errors.EmptyDataError:
+            return
+        with reader:
+            for frame in reader:
+                for rec in frame.to_dict(orient="records"):
+                    yield {k: _clean(v) for k, v in rec.items()}
+
+
+def iter_json(source: Source) -> Iterator[Any]:
+    with _open(source) as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8")
+        head = text.read(JSON_BLOCK)
+        start = head.lstrip()
+        if start.startswith("["):
+            yield from _iter_json_array(text, start[1:])
+            return
+        # NDJSON: finish the line the first block cut off, then read line by line
+        for line in chain(io.StringIO(head + text.readline()), text):
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_json_array(text: IO[str], buf: str) -> Iterator[Any]:
+    """Decode the elements of a JSON array whose opening bracket was already consumed."""
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    block = JSON_BLOCK
+    expect_value = True
+
+    def refill() -> None:
+        nonlocal buf, pos, eof, block
+        more = text.read(block)
+        eof = not more
+        buf = buf[pos:] + more
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            refill()
+            continue
+        ch = buf[pos]
+        if ch == "]":
+            return
+        if not expect_value:
+            if ch != ",":
+                raise ValueError(f"Expected ',' in JSON array, got {ch!r}")
+            pos += 1
+            expect_value = True
+            continue
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or len(buf) - pos > JSON_MAX_ELEMENT:
+                raise
+            # element continues past the buffer; read more, growing the read for very large elements
+            refill()
+            block = min(block * 2, JSON_MAX_ELEMENT)
+            continue
+        if end == len(buf) and not eof:
+            refill()  # a number could continue in the next block
+            continue
+        block = JSON_BLOCK
+        yield value
+        pos = end
+        expect_value = False
+
+
+def iter_yaml(source: Source) -> Iterator[Any]:
+    with _open(source) as fh:
+        loader = yaml.SafeLoader(fh)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(yaml.SequenceStartEvent):
+                # not a list of records: construct the document as a whole
+                data = loader.construct_document(loader.compose_node(None, None))
+                if isinstance(data, list):
+                    yield from data
+                elif data is not None:
+                    yield data
+                return
+            loader.get_event()
+            index = 0
+            while not loader.check_event(yaml.SequenceEndEvent):
+                node = loader.compose_node(None, index)
+                yield loader.construct_document(node)
+                index += 1
+        finally:
+            loader.dispose()
+
+
+def iter_xlsx(source: Source) -> Iterator[dict[str, Any]]:
+    workbook = load_workbook(io.BytesIO(source) if isinstance(source, bytes) else source, read_only=True, data_only=True)
+    try:
+        # exports larger than one sheet continue on the following sheets
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                continue
+            for row in rows:
+                if any(v is not None for v in row):
+                    yield {str(k): v for k, v in zip(header, row) if k is not None}
+    finally:
+        workbook.close()
+
+
+def iter_records(source: Source, file_format: str, chunk_size: int) -> Iterator[Any]:
+    fmt = file_format.lower()
+    if fmt == "csv":
+        return iter_csv(source, chunk_size)
+    if fmt in {"json", "ndjson"}:
+        return iter_json(source)
+    if fmt in {"yaml", "yml"}:
+        return iter_yaml(source)
+    if fmt == "xlsx":
+        return iter_xlsx(source)
+    return iter(())
+
+
+def _batched(records: Iterator[Any], size: int) -> Iterator[list[Any]]:
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _next_batch(batches: Iterator[list[Any]]) -> list[Any] | None:
+    try:
+        return next(batches, None)
+    except (ValueError, yaml.YAMLError, zipfile.BadZipFile, InvalidFileException) as exc:
+        raise ParseError(str(exc)) from exc
+
+
+async def read_chunks(source: Source, file_format: str, chunk_size: int) -> AsyncIterator[list[Any]]:
+    """Parse ``source`` in a worker thread, yielding lists of at most ``chunk_size`` records.
+
+    Raises ``ParseError`` for malformed input.
+    """
+    records = iter_records(source, file_format, chunk_size)
+    batches = _batched(records, chunk_size)
+    try:
+        while (batch := await asyncio.to_thread(_next_batch, batches)) is not None:
+            yield batch
+    finally:
+        # release the file handle (and the workbook) even when the caller stops early
+        await asyncio.to_thread(getattr(records, "close", lambda: None))
@@ -0,0 +1,500 @@
+"""Background bulk import jobs with checkpointed progress.
+
+``POST /bulk/jobs`` spools the upload into ``BULK_JOB_DIR``, stores the job in
+Redis and pushes its id onto ``bulk:jobs:queue``. Every app process runs
+``BULK_JOB_WORKERS`` workers that pop ids and run the jobs with the same steps
+as ``BulkService.bulk_import``, chunk by chunk:
+
+* validate: the whole file is checked (and classified for preview); a
+  validate or preview job ends here, an EXECUTE job with errors fails here;
+* entities: each chunk of tables and fields is upserted and committed in its
+  own transaction;
+* lineage: each chunk of lineage rows is written to Neo4j. Rows that cannot
+  be written end the job ``partial`` (the entities stay); without a Neo4j
+  driver the job fails here and can be resumed once Neo4j is back.
+
+The hash ``bulk:job:<id>`` holds the request, the status, the summary and the
+checkpoint: the phase and the next chunk to process, moved after each commit.
+A failed job resumed with ``POST /bulk/jobs/<id>/resume`` continues from its
+checkpoint, skipping the chunks it had committed (a job that failed validation
+is validated again). A chunk committed just before a crash is written again;
+the upserts and lineage MERGEs make that harmless, though its rows then count
+as updated.
+
+While a worker runs a job it holds ``bulk:job:<id>:lock`` and keeps refreshing
+it, so a job left ``running`` by a worker that died becomes resumable once the
+lock expires. A job still ``queued`` whose id is neither in the queue nor
+locked was popped by a worker that died before starting it; the periodic sweep
+(and a resume) puts it back in the queue. Status changes out of ``queued`` (a
+worker starting the job, a cancel) are compare-and-set on the hash, so exactly
+one of them wins.
+Cancellation of a running job is checked between chunks; chunks already
+committed stay. Errors are kept per chunk in the hash
+``bulk:job:<id>:errors``.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from neo4j import AsyncDriver
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services.bulk_io import ParseError, read_chunks
+from app.services.bulk_service import LINEAGE_TYPES, BulkImportMode, BulkService, new_summary
+from app.services.graph_outbox import notify_graph_outbox
+
+
+log = structlog.get_logger(__name__)
+
+QUEUE = "bulk:jobs:queue"
+JOB_PREFIX = "bulk:job:"
+FILE_PREFIX = "bulk-job-"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+PARTIAL = "partial"  # entities written, some lineage rows not
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+VALIDATE = "validate"
+ENTITIES = "entities"
+LINEAGE = "lineage"
+
+SWEEP_INTERVAL = 600.0
+
+bulk_job_metrics: dict[str, int] = {
+    "submitted": 0,
+    "succeeded": 0,
+    "partial": 0,
+    "failed": 0,
+    "cancelled": 0,
+    "resumed": 0,
+    "requeued": 0,
+    "chunks": 0,
+}
+
+
+def bulk_job_stats() -> dict[str, int]:
+    return dict(bulk_job_metrics)
+
+
+def job_dir() -> str:
+    return settings.BULK_JOB_DIR or tempfile.gettempdir()
+
+
+def job_view(job: dict[str, Any]) -> dict[str, Any]:
+    """A job as the API returns it, without worker-only fields."""
+    return {k: v for k, v in job.items() if k not in ("path", "errors_stored")}
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_job_id(value: str) -> bool:
+    return len(value) == 32 and all(c in "0123456789abcdef" for c in value)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_key(job_id: str) -> str:
+    return JOB_PREFIX + job_id
+
+
+def _errors_key(job_id: str) -> str:
+    return JOB_PREFIX + job_id + ":errors"
+
+
+def _lock_key(job_id: str) -> str:
+    return JOB_PREFIX + job_id + ":lock"
+
+
+# HSET the field/value pairs in ARGV[2..] only while the job's status is ARGV[1]
+_SET_IF_STATUS = """
+if redis.call('HGET', KEYS[1], 'status') ~= ARGV[1] then
+  return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+return 1
+"""
+
+
+def _remove_file(path: str | None) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class BulkJobStore:
+    """Job state in Redis; see the module docstring for the keys."""
+
+    INT_FIELDS = ("chunk", "chunk_size", "lineage_rows", "lineage_errors", "error_count", "errors_stored")
+    JSON_FIELDS = ("summary", "preview")
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._set_if_status = redis.register_script(_SET_IF_STATUS)
+
+    async def create(
+        self,
+        job_id: str,
+        *,
+        path: str,
+        file_format: str,
+        mode: str,
+        created_by: str | None,
+    ) -> dict[str, Any]:
+        now = _now()
+        await self._write(
+            job_id,
+            {
+                "job_id": job_id,
+                "status": QUEUED,
+                "mode": mode,
+                "file_format": file_format,
+                "path": path,
+                "phase": VALIDATE,
+                "chunk": 0,
+                "chunk_size": settings.BULK_IMPORT_CHUNK_SIZE,
+                "summary": new_summary(),
+                "lineage_errors": 0,
+                "error_count": 0,
+                "errors_stored": 0,
+                "cancel_requested": 0,
+                "error": "",
+                "created_by": created_by or "",
+                "created_at": now,
+                "updated_at": now,
+            },
+        )
+        await self.redis.lpush(QUEUE, job_id)
+        bulk_job_metrics["submitted"] += 1
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> dict[str, Any] | None:
+        raw = await self.redis.hgetall(_job_key(job_id))
+        if not raw:
+            return None
+        job: dict[str, Any] = dict(raw)
+        for name in self.INT_FIELDS:
+            job[name] = int(job.get(name) or 0)
+        for name in self.JSON_FIELDS:
+            job[name] = json.loads(job[name]) if job.get(name) else None
+        job["cancel_requested"] = job.get("cancel_requested") == "1"
+        return job
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        await self._write(job_id, {**fields, "updated_at": _now()})
+
+    async def _write(self, job_id: str, fields: dict[str, Any]) -> None:
+        mapping = {
+            k: json.dumps(v) if k in self.JSON_FIELDS else int(v) if isinstance(v, bool) else v
+            for k, v in fields.items()
+        }
+        ttl = settings.BULK_JOB_TTL_SECONDS
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(_job_key(job_id), mapping=mapping)
+            pipe.expire(_job_key(job_id), ttl)
+            pipe.expire(_errors_key(job_id), ttl)
+            await pipe.execute()
+
+    async def add_errors(self, job_id: str, chunk: int, errors: list[dict[str, Any]]) -> None:
+        """Record a chunk's errors; all are counted, at most ``BULK_IMPORT_MAX_ERRORS`` per job are kept."""
+        if not errors:
+            return
+        job_key, errors_key = _job_key(job_id), _errors_key(job_id)
+        stored, existing = await asyncio.gather(
+            self.redis.hget(job_key, "errors_stored"), self.redis.hget(errors_key, str(chunk))
+        )
+        keep = errors[: max(settings.BULK_IMPORT_MAX_ERRORS - int(stored or 0), 0)]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(job_key, "error_count", len(errors))
+            if keep:
+                pipe.hincrby(job_key, "errors_stored", len(keep))
+                pipe.hset(errors_key, str(chunk), json.dumps((json.loads(existing) if existing else []) + keep))
+                pipe.expire(errors_key, settings.BULK_JOB_TTL_SECONDS)
+            await pipe.execute()
+
+    async def errors(self, job_id: str, chunk: int | None = None) -> list[dict[str, Any]]:
+        """[{chunk, errors}] in chunk order, for one chunk or all of them."""
+        if chunk is not None:
+            raw = await self.redis.hget(_errors_key(job_id), str(chunk))
+            return [{"chunk": chunk, "errors": json.loads(raw)}] if raw else []
+        entries = await self.redis.hgetall(_errors_key(job_id))
+        return [{"chunk": int(c), "errors": json.loads(v)} for c, v in sorted(entries.items(), key=lambda e: int(e[0]))]
+
+    async def reset_errors(self, job_id: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(_errors_key(job_id))
+            pipe.hset(_job_key(job_id), mapping={"error_count": 0, "errors_stored": 0})
+            await pipe.execute()
+
+    async def _transition(self, job_id: str, expected: str, **fields: Any) -> bool:
+        """Write ``fields`` only if the job's status is still ``expected``."""
+        fields["updated_at"] = _now()
+        args = [expected] + [str(int(v) if isinstance(v, bool) else v) for kv in fields.items() for v in kv]
+        return bool(await self._set_if_status(keys=[_job_key(job_id)], args=args))
+
+    async def start(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it was cancelled meanwhile."""
+        return await self._transition(job_id, QUEUED, status=RUNNING, started_at=_now())
+
+    async def request_cancel(self, job_id: str) -> dict[str, Any] | None:
+        """Cancel a queued job now, a running one after its current chunk; None if the job already ended."""
+        job = await self.get(job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            return None
+        if await self._transition(job_id, QUEUED, status=CANCELLED, cancel_requested=1, finished_at=_now()):
+            bulk_job_metrics[CANCELLED] += 1
+            _remove_file(job["path"])
+        elif not await self._transition(job_id, RUNNING, cancel_requested=1):
+            return None  # finished meanwhile
+        return await self.get(job_id)
+
+    async def resume(self, job_id: str) -> dict[str, Any] | None:
+        """Queue a failed job (or one whose worker died) again; None if it cannot be resumed."""
+        job = await self.get(job_id)
+        if job is None or not os.path.exists(job["path"]):
+            return None
+        if job["status"] == QUEUED:
+            return await self.get(job_id) if await self.requeue_orphan(job_id) else None
+        stale = job["status"] == RUNNING and not await self.redis.exists(_lock_key(job_id))
+        if job["status"] != FAILED and not stale:
+            return None
+        await self.update(job_id, status=QUEUED, cancel_requested=0, error="")
+        await self.redis.lpush(QUEUE, job_id)
+        bulk_job_metrics["resumed"] += 1
+        return await self.get(job_id)
+
+    async def requeue_orphan(self, job_id: str) -> bool:
+        """Queue a ``queued`` job again if no worker holds it and its id is not in the queue.
+
+        Holding the lock while checking keeps a worker that popped the id just now
+        from starting it meanwhile; that worker then skips it and the queue has it again.
+        """
+        if await self.redis.lpos(QUEUE, job_id) is not None or not await self.acquire(job_id):
+            return False
+        try:
+            job = await self.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                return False
+            await self.redis.lpush(QUEUE, job_id)
+        finally:
+            await self.release(job_id)
+        bulk_job_metrics["requeued"] += 1
+        log.info("bulk_job_requeued", job_id=job_id)
+        return True
+
+    async def finish(self, job_id: str, status: str, error: str = "") -> None:
+        job = await self.get(job_id)
+        await self.update(job_id, status=status, error=error, finished_at=_now())
+        bulk_job_metrics[status] += 1
+        if status != FAILED and job:
+            _remove_file(job["path"])  # a failed job keeps its file to be resumed
+
+    async def acquire(self, job_id: str) -> bool:
+        return bool(await self.redis.set(_lock_key(job_id), "1", nx=True, ex=settings.BULK_JOB_LOCK_SECONDS))
+
+    async def release(self, job_id: str) -> None:
+        await self.redis.delete(_lock_key(job_id))
+
+    async def keep_lock(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(settings.BULK_JOB_LOCK_SECONDS / 3)
+            await self.redis.expire(_lock_key(job_id), settings.BULK_JOB_LOCK_SECONDS)
+
+    async def checkpoint(self, job_id: str, **fields: Any) -> None:
+        """Save progress and stop if a cancel was requested."""
+        await self.update(job_id, **fields)
+        if await self.redis.hget(_job_key(job_id), "cancel_requested") == "1":
+            raise JobCancelled()
+
+    async def sweep_files(self) -> int:
+        """Remove job uploads whose job has expired and queue again the jobs lost by a worker."""
+        removed = 0
+        for entry in os.scandir(job_dir()):
+            if not entry.name.startswith(FILE_PREFIX):
+                continue
+            job_id = entry.name[len(FILE_PREFIX):].split("-", 1)[0]
+            status = await self.redis.hget(_job_key(job_id), "status")
+            if status is None:
+                _remove_file(entry.path)
+                removed += 1
+            elif status == QUEUED:
+                await self.requeue_orphan(job_id)
+        return removed
+
+
+class BulkJobRunner:
+    def __init__(
+        self,
+        driver: AsyncDriver | None,
+        redis: Redis,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        lineage_redis: Redis | None = None,
+    ):
+        self.driver = driver
+        self.redis = redis
+        self.store = BulkJobStore(redis)
+        self.session_factory = session_factory
+        self.lineage_redis = lineage_redis  # the cache Redis, for lineage cache invalidation
+
+    async def run_forever(self, workers: int) -> None:
+        await asyncio.gather(*(self._work(n) for n in range(workers)))
+
+    async def _work(self, n: int) -> None:
+        last_sweep = 0.0
+        while True:
+            try:
+                popped = await self.redis.brpop([QUEUE], timeout=settings.BULK_JOB_POLL_SECONDS)
+                if popped:
+                    await self.run(popped[1])
+                elif n == 0 and time.monotonic() - last_sweep >= SWEEP_INTERVAL:
+                    await self.store.sweep_files()
+                    last_sweep = time.monotonic()
+            except Exception as exc:  # pragma: no cover - external service
+                log.warning("bulk_job_worker_failed", error=str(exc))
+                await asyncio.sleep(settings.BULK_JOB_POLL_SECONDS)
+
+    async def run(self, job_id: str) -> None:
+        job = await self.store.get(job_id)
+        if job is None or job["status"] != QUEUED or not await self.store.acquire(job_id):
+            return  # cancelled while queued, or taken by another worker
+        heartbeat = asyncio.create_task(self.store.keep_lock(job_id))
+        try:
+            if not await self.store.start(job_id):
+                return  # cancelled since it was read
+            log.info("bulk_job_started", job_id=job_id, phase=job["phase"], chunk=job["chunk"])
+            await self._run(job)
+        except JobCancelled:
+            await self.store.finish(job_id, CANCELLED)
+            log.info("bulk_job_cancelled", job_id=job_id)
+        except ParseError as exc:
+            await self.store.finish(job_id, FAILED, f"Could not parse {job['file_format']} file: {exc}")
+        except Exception as exc:
+            await self.store.finish(job_id, FAILED, str(exc))
+            log.warning("bulk_job_failed", job_id=job_id, error=str(exc))
+        finally:
+            heartbeat.cancel()
+            await self.store.release(job_id)
+
+    async def _run(self, job: dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        async with self.session_factory() as session:
+            service = BulkService(session, lineage_driver=self.driver, redis=self.lineage_redis)
+            if job["phase"] == VALIDATE:
+                if not await self._validate(service, job):
+                    return
+            if job["phase"] == ENTITIES:
+                await self._write_entities(service, job)
+            if job["phase"] == LINEAGE:
+                await self._write_lineage(service, job)
+        if job["lineage_errors"]:
+            # like bulk_import's success=False: the client has to look at the errors
+            await self.store.finish(job_id, PARTIAL, f"{job['lineage_errors']} lineage rows could not be written")
+            log.info("bulk_job_partial", job_id=job_id, lineage_errors=job["lineage_errors"])
+            return
+        await self.store.finish(job_id, SUCCEEDED)
+        log.info("bulk_job_succeeded", job_id=job_id, summary=job["summary"])
+
+    async def _chunks(self, job: dict[str, Any]):
+        """(index, records) for the chunks from the checkpoint on."""
+        index = 0
+        async for chunk in read_chunks(job["path"], job["file_format"], job["chunk_size"]):
+            if index >= job["chunk"]:
+                yield index, chunk
+            index += 1
+
+    async def _validate(self, service: BulkService, job: dict[str, Any]) -> bool:
+        """Check the whole file; False when the job ends with this phase."""
+        job_id = job["job_id"]
+        await self.store.reset_errors(job_id)
+        summary = new_summary()
+        preview: dict[str, list] = {"to_create": [], "to_update": []}
+        lineage_rows = 0
+        failed = False
+        index = 0
+        chunks = service.validate_chunks(
+            job["path"], job["file_format"], job["chunk_size"], job["mode"], summary, preview
+        )
+        async for chunk, chunk_errors in chunks:
+            summary["skipped"] += len(chunk_errors)
+            failed = failed or bool(chunk_errors)
+            lineage_rows += sum(1 for rec in chunk if isinstance(rec, dict) and rec.get("type") in LINEAGE_TYPES)
+            await self.store.add_errors(job_id, index, chunk_errors)
+            await self.store.checkpoint(job_id, summary=summary)
+            index += 1
+
+        if job["mode"] != BulkImportMode.EXECUTE:
+            fields: dict[str, Any] = {"summary": summary}
+            if job["mode"] == BulkImportMode.PREVIEW:
+                fields["preview"] = preview
+            await self.store.update(job_id, **fields)
+            job["summary"] = summary
+            await self.store.finish(job_id, SUCCEEDED)
+            return False
+        if failed:
+            await self.store.update(job_id, summary=summary)
+            await self.store.finish(job_id, FAILED, "Validation failed; nothing was written")
+            return False
+        job.update(phase=ENTITIES, summary=summary, lineage_rows=lineage_rows)
+        await self.store.update(job_id, phase=ENTITIES, summary=summary, lineage_rows=lineage_rows)
+        return True
+
+    async def _write_entities(self, service: BulkService, job: dict[str, Any]) -> None:
+        job_id, session, summary = job["job_id"], service.session, job["summary"]
+        await session.commit()  # close the read-only transaction of the validation pass
+        async for index, chunk in self._chunks(job):
+            try:
+                await service.write_entities(chunk, summary)
+                await session.commit()
+            except Exception as exc:
+                await session.rollback()
+                await self.store.add_errors(
+                    job_id, index, [{"row": None, "entity": "chunk", "message": str(exc), "code": "WRITE_FAILED"}]
+                )
+                raise
+            notify_graph_outbox()
+            bulk_job_metrics["chunks"] += 1
+            await self.store.checkpoint(job_id, chunk=index + 1, summary=summary)
+        job.update(phase=LINEAGE, chunk=0)
+        await self.store.update(job_id, phase=LINEAGE, chunk=0)
+
+    async def _write_lineage(self, service: BulkService, job: dict[str, Any]) -> None:
+        job_id, summary = job["job_id"], job["summary"]
+        if not job["lineage_rows"]:
+            return
+        if self.driver is None:
+            await self.store.add_errors(
+                job_id, 0, [{"row": None, "entity": "lineage", "message": "Neo4j driver not available", "code": "NO_NEO4J"}]
+            )
+            # fails at lineage chunk 0, so a resume writes all of it
+            raise RuntimeError("Neo4j driver not available; lineage was not written")
+        # validation only admits lineage between tables/fields that existed before the job, whose
+        # nodes the outbox dispatcher has synced; an edge to a node still pending there is a row error
+        chunk_size = job["chunk_size"]
+        async for index, chunk in self._chunks(job):
+            errors: list[dict[str, Any]] = []
+            await service.write_lineage(chunk, index * chunk_size + 1, summary, errors)
+            await self.store.add_errors(job_id, index, errors)
+            job["lineage_errors"] += len(errors)
+            bulk_job_metrics["chunks"] += 1
+            await self.store.checkpoint(job_id, chunk=index + 1, summary=summary, lineage_errors=job["lineage_errors"])
@@ -1,15 +1,23 @@
-import io
-import json
-from typing import Any
+import math
+import uuid
+from typing import Any, AsyncIterator
 
-import yaml
-import pandas as pd
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.config import settings
 from app.models.table import MetadataTable
 from app.models.field import MetadataField
+from app.repositories.field_repo import FieldRepository
+from app.repositories.outbox_repo import GraphOutboxRepository
+from app.repositories.table_repo import TableRepository
+from app.schemas.lineage import FieldLineageCreateRequest, TableLineageCreateRequest
+from app.services.bulk_export import EXPORT_FORMATS, encode, iter_catalog
+from app.services.bulk_io import ParseError, Source, read_chunks
+from app.services.graph_outbox import notify_graph_outbox
 from app.services.lineage_service import LineageService
 
 
@@ -31,118 +39,367 @@ class BulkImportResult(dict):
         )
 
 
+LINEAGE_TYPES = {"table_lineage", "field_lineage"}
+
+
+def _text(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
+def _uuid(value: Any) -> uuid.UUID | None:
+    return None if value is None else uuid.UUID(str(value))
+
+
+def _table_key(rec: Any) -> tuple[uuid.UUID, str] | None:
+    """(source_id, name_normalized), the key a table record is upserted on; None if it cannot match a row."""
+    if not isinstance(rec, dict) or rec.get("type") != "table" or rec.get("name") is None:
+        return None
+    try:
+        source_id = _uuid(rec.get("source_id"))
+    except ValueError:
+        return None
+    return (source_id, str(rec["name"]).lower()) if source_id else None
+
+
+def _field_key(rec: Any) -> tuple[uuid.UUID, str] | None:
+    """(table_id, name), the key a field record is upserted on; None if it cannot match a row."""
+    if not isinstance(rec, dict) or rec.get("type") != "field" or rec.get("name") is None:
+        return None
+    try:
+        table_id = _uuid(rec.get("table_id"))
+    except ValueError:
+        return None
+    return (table_id, str(rec["name"])) if table_id else None
+
+
+def _table_row(rec: dict[str, Any]) -> dict[str, Any]:
+    name = str(rec.get("name"))
+    return {
+        "id": uuid.uuid4(),
+        "source_id": _uuid(rec.get("source_id")),
+        "name": name,
+        "name_normalized": name.lower(),
+        "schema_name": _text(rec.get("schema_name")),
+        "qualified_name": _text(rec.get("qualified_name")),
+        "description": _text(rec.get("description")),
+    }
+
+
+def _field_row(rec: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "table_id": _uuid(rec.get("table_id")),
+        "name": str(rec.get("name")),
+        "data_type": str(rec.get("data_type")),
+        "description": _text(rec.get("description")),
+        "is_nullable": rec.get("is_nullable"),
+        "is_primary_key": rec.get("is_primary_key"),
+        "is_foreign_key": rec.get("is_foreign_key"),
+    }
+
+
+class _SeenKeys:
+    """Keys of new catalog rows a preview has met so far, in Redis so memory stays flat on big files.
+
+    Without Redis the keys are kept in process.
+    """
+
+    def __init__(self, redis: Redis | None):
+        self.redis = redis
+        self.name = f"bulk:preview:{uuid.uuid4().hex}:keys"
+        self.local: set[str] = set()
+
+    async def add(self, keys: list[tuple]) -> set[tuple]:
+        """Record ``keys``; returns those recorded by an earlier call."""
+        members = [f"{rtype}:{key[0]}:{key[1]}" for rtype, key in keys]
+        if not members:
+            return set()
+        if self.redis is None:
+            seen = [m in self.local for m in members]
+            self.local.update(members)
+        else:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.smismember(self.name, members)
+                pipe.sadd(self.name, *members)
+                pipe.expire(self.name, settings.BULK_PREVIEW_KEYS_TTL_SECONDS)
+                seen, _, _ = await pipe.execute()
+        return {key for key, hit in zip(keys, seen) if hit}
+
+    async def clear(self) -> None:
+        if self.redis is not None:
+            await self.redis.delete(self.name)
+
+
+def new_summary() -> dict[str, Any]:
+    return {
+        "total_rows": 0,
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+    }
+
+
 class BulkService:
     SUPPORTED_FORMATS = {"csv", "json", "yaml", "yml", "xlsx"}
+    IMPORT_FORMATS = SUPPORTED_FORMATS | {"ndjson"}
 
-    def __init__(self, session: AsyncSession, lineage_driver=None):
+    def __init__(self, session: AsyncSession, lineage_driver=None, redis: Redis | None = None):
         self.session = session
         self.lineage_driver = lineage_driver
+        self.redis = redis
 
-    async def bulk_import(self, *, file_bytes: bytes, file_format: str, mode: str, rollback_on_error: bool = True) -> BulkImportResult:
-        if file_format not in self.SUPPORTED_FORMATS:
+    @classmethod
+    def check_import_args(cls, file_format: str, mode: str) -> None:
+        if file_format not in cls.IMPORT_FORMATS:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unsupported format")
         if mode not in {BulkImportMode.VALIDATE, BulkImportMode.PREVIEW, BulkImportMode.EXECUTE}:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unsupported mode")
 
-        records = self._parse(file_bytes, file_format)
-        errors = await self._validate_records(records)
+    async def bulk_import(
+        self,
+        *,
+        file_format: str,
+        mode: str,
+        file_bytes: bytes | None = None,
+        file_path: str | None = None,
+        rollback_on_error: bool = True,
+    ) -> BulkImportResult:
+        """Import a spooled upload (``file_path``) or, for small inputs, its content.
 
-        summary = {
-            "total_rows": len(records),
-            "created": 0,
-            "updated": 0,
-            "skipped": len(errors),
-        }
+        The file is read in chunks of ``BULK_IMPORT_CHUNK_SIZE`` records: once to
+        validate (and classify for preview), again to write tables and fields, and
+        a third time for lineage rows, so memory does not grow with the file.
+        """
+        self.check_import_args(file_format, mode)
+        source = file_path if file_path is not None else file_bytes
+        if source is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="No file given")
+        chunk_size = settings.BULK_IMPORT_CHUNK_SIZE
+
+        summary = new_summary()
+        errors: list[dict[str, Any]] = []
+        preview = {"to_create": [], "to_update": []}
+        lineage_rows = 0
+
+        try:
+            async for chunk, chunk_errors in self.validate_chunks(source, file_format, chunk_size, mode, summary, preview):
+                self._add_errors(errors, summary, chunk_errors)
+                lineage_rows += sum(1 for rec in chunk if isinstance(rec, dict) and rec.get("type") in LINEAGE_TYPES)
+        except ParseError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Could not parse {file_format} file: {exc}"
+            ) from exc
 
         if errors and mode == BulkImportMode.EXECUTE and rollback_on_error:
             # Do not proceed execution
             return BulkImportResult.build(mode, False, summary, errors=errors)
 
-        preview = {"to_create": [], "to_update": []}
-        # Simple deduplication check for preview: table name+source_id, field name+table_id
-        existing_tables = await self._load_table_index()
-        existing_fields = await self._load_field_index()
-
-        if mode in (BulkImportMode.PREVIEW, BulkImportMode.EXECUTE):
-            for rec in records:
-                if rec.get("type") == "table":
-                    key = (rec.get("source_id"), rec.get("name"))
-                    if key in existing_tables:
-                        preview["to_update"].append({"type": "table", "id": existing_tables[key], "name": rec.get("name")})
-                    else:
-                        preview["to_create"].append({"type": "table", "name": rec.get("name")})
-                elif rec.get("type") == "field":
-                    key = (rec.get("table_id"), rec.get("name"))
-                    if key in existing_fields:
-                        preview["to_update"].append({"type": "field", "id": existing_fields[key], "name": rec.get("name"), "table_id": rec.get("table_id")})
-                    else:
-                        preview["to_create"].append({"type": "field", "name": rec.get("name"), "table_id": rec.get("table_id")})
-                elif rec.get("type") in {"table_lineage", "field_lineage"}:
-                    preview["to_create"].append(rec)
-
         if mode == BulkImportMode.EXECUTE and not errors:
-            async with self.session.begin():
-                for rec in records:
-                    if rec.get("type") == "table":
-                        table = MetadataTable(
-                            name=rec.get("name"),
-                            schema_name=rec.get("schema_name"),
-                            qualified_name=rec.get("qualified_name"),
-                            source_id=rec.get("source_id"),
-                            description=rec.get("description"),
-                        )
-                        self.session.add(table)
-                        summary["created"] += 1
-                    elif rec.get("type") == "field":
-                        field = MetadataField(
-                            table_id=rec.get("table_id"),
-                            name=rec.get("name"),
-                            data_type=rec.get("data_type"),
-                            description=rec.get("description"),
-                            is_nullable=rec.get("is_nullable"),
-                            is_primary_key=rec.get("is_primary_key"),
-                            is_foreign_key=rec.get("is_foreign_key"),
-                        )
-                        self.session.add(field)
-                        summary["created"] += 1
-                # Commit transaction block by exiting context
+            await self._execute_entities(source, file_format, chunk_size, summary)
 
             # Process lineage outside DB transaction, against Neo4j if configured
-            lineage_records = [r for r in records if r.get("type") in {"table_lineage", "field_lineage"}]
-            if lineage_records:
+            if lineage_rows:
                 if not self.lineage_driver:
                     errors.append({"row": None, "entity": "lineage", "message": "Neo4j driver not available", "code": "NO_NEO4J"})
                 else:
-                    service = LineageService(self.lineage_driver)
-                    for rec in lineage_records:
-                        if rec.get("type") == "table_lineage":
-                            await service.create_table_lineage(
-                                source_table_id=rec.get("source_table_id"),
-                                target_table_id=rec.get("target_table_id"),
-                                lineage_source=rec.get("lineage_source", "manual"),
-                                transformation_type=rec.get("transformation_type"),
-                                transformation_logic=rec.get("transformation_logic"),
-                                confidence=rec.get("confidence"),
-                            )
-                            summary["created"] += 1
-                        elif rec.get("type") == "field_lineage":
-                            await service.create_field_lineage(
-                                source_field_id=rec.get("source_field_id"),
-                                target_field_id=rec.get("target_field_id"),
-                                lineage_source=rec.get("lineage_source", "manual"),
-                                transformation_logic=rec.get("transformation_logic"),
-                                confidence=rec.get("confidence"),
-                            )
-                            summary["created"] += 1
+                    # validation only lets lineage rows reference tables/fields that existed before this
+                    # import, so their nodes were synced by the outbox dispatcher; an edge whose node is
+                    # still pending there is reported as LINEAGE_WRITE_FAILED
+                    row = 0
+                    async for chunk in read_chunks(source, file_format, chunk_size):
+                        await self.write_lineage(chunk, row + 1, summary, errors)
+                        row += len(chunk)
 
         success = len(errors) == 0
         return BulkImportResult.build(mode, success, summary, errors=errors, preview=preview if mode == BulkImportMode.PREVIEW else {})
 
-    async def _validate_records(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    async def validate_chunks(
+        self,
+        source: Source,
+        file_format: str,
+        chunk_size: int,
+        mode: str,
+        summary: dict[str, Any],
+        preview: dict[str, list],
+    ) -> AsyncIterator[tuple[list[Any], list[dict[str, Any]]]]:
+        """The validation pass: yield each chunk with its errors, classifying it into ``preview`` in preview mode.
+
+        Counts rows into ``summary``; raises ``ParseError`` for malformed input.
+        """
+        seen = _SeenKeys(self.redis)
+        reported_refs: set[str] = set()
+        try:
+            async for chunk in read_chunks(source, file_format, chunk_size):
+                first_row = summary["total_rows"] + 1
+                summary["total_rows"] += len(chunk)
+                chunk_errors = await self._validate_records(chunk, first_row, reported_refs)
+                if mode == BulkImportMode.PREVIEW:
+                    existing_tables, existing_fields = await self._existing_ids(chunk)
+                    earlier = await seen.add(self._new_keys(chunk, existing_tables, existing_fields))
+                    self._classify(chunk, existing_tables, existing_fields, earlier, preview, summary)
+                yield chunk, chunk_errors
+        finally:
+            await seen.clear()
+
+    async def _execute_entities(self, source: Source, file_format: str, chunk_size: int, summary: dict[str, Any]) -> None:
+        """Upsert the table and field rows of every chunk in one transaction."""
+        await self.session.commit()  # close the read-only transaction of the validation pass
+        try:
+            async for chunk in read_chunks(source, file_format, chunk_size):
+                await self.write_entities(chunk, summary)
+            await self.session.commit()
+        except BaseException:
+            await self.session.rollback()
+            raise
+        notify_graph_outbox()
+
+    async def write_entities(self, chunk: list[Any], summary: dict[str, Any]) -> None:
+        """Upsert the table and field rows of one chunk, one statement per kind; the caller commits.
+
+        A record whose key already exists (in the catalog or earlier in the file)
+        updates that row and counts as updated; the others count as created.
+        """
+        outbox = GraphOutboxRepository(self.session)
+        for kind, repo, to_row, key in (
+            ("table", TableRepository(self.session), _table_row, ("source_id", "name_normalized")),
+            ("field", FieldRepository(self.session), _field_row, ("table_id", "name")),
+        ):
+            records = [to_row(rec) for rec in chunk if rec.get("type") == kind]
+            if not records:
+                continue
+            # one statement cannot write the same row twice; the last record for a key wins
+            rows = {tuple(row[k] for k in key): row for row in records}
+            written = await repo.upsert_many(list(rows.values()))
+            created = sum(1 for row in written if row.inserted)
+            summary["created"] += created
+            summary["updated"] += len(records) - created
+            await outbox.enqueue_upserts(kind, written)
+
+    async def write_lineage(
+        self, chunk: list[Any], first_row: int, summary: dict[str, Any], errors: list[dict[str, Any]]
+    ) -> None:
+        """Write the lineage rows of one chunk to Neo4j; its table and field nodes must be synced already."""
+        lineage_records = [
+            (idx, rec) for idx, rec in enumerate(chunk, start=first_row) if rec.get("type") in LINEAGE_TYPES
+        ]
+        if lineage_records:
+            await self._import_lineage(lineage_records, summary, errors)
+
+    @staticmethod
+    def _new_keys(
+        records: list[Any], existing_tables: dict[tuple, uuid.UUID], existing_fields: dict[tuple, uuid.UUID]
+    ) -> list[tuple]:
+        """(type, key) of the table and field records not in the catalog yet."""
+        keys = []
+        for rec in records:
+            if not isinstance(rec, dict):
+                continue
+            if rec.get("type") == "table":
+                key = _table_key(rec)
+                if key is not None and key not in existing_tables:
+                    keys.append(("table", key))
+            elif rec.get("type") == "field":
+                key = _field_key(rec)
+                if key is not None and key not in existing_fields:
+                    keys.append(("field", key))
+        return keys
+
+    @staticmethod
+    def _classify(
+        records: list[Any],
+        existing_tables: dict[tuple, uuid.UUID],
+        existing_fields: dict[tuple, uuid.UUID],
+        seen_keys: set[tuple],
+        preview: dict[str, list],
+        summary: dict[str, Any],
+    ) -> None:
+        """Sort records into to_create/to_update the way EXECUTE will write them.
+
+        A record updates when its key exists in the catalog or appeared earlier in
+        the file: in an earlier chunk (``seen_keys`` on entry) or earlier in this
+        one (added here).
+        """
+        limit = settings.BULK_PREVIEW_MAX_ITEMS
+        for rec in records:
+            if not isinstance(rec, dict):
+                continue
+            rtype = rec.get("type")
+            if rtype == "table":
+                key = _table_key(rec)
+                item = {"type": "table", "name": rec.get("name")}
+                existing_id = existing_tables.get(key)
+            elif rtype == "field":
+                key = _field_key(rec)
+                item = {"type": "field", "name": rec.get("name"), "table_id": rec.get("table_id")}
+                existing_id = existing_fields.get(key)
+            elif rtype in LINEAGE_TYPES:
+                key, item, existing_id = None, rec, None
+            else:
+                continue
+            bucket = "to_create"
+            if existing_id is not None:
+                item = {**item, "id": str(existing_id)}
+                bucket = "to_update"
+            elif key is not None:
+                if (rtype, key) in seen_keys:
+                    bucket = "to_update"
+                seen_keys.add((rtype, key))
+            # counts cover the whole file; the listed items are capped
+            summary[bucket] = summary.get(bucket, 0) + 1
+            if len(preview[bucket]) < limit:
+                preview[bucket].append(item)
+
+    @staticmethod
+    def _add_errors(errors: list[dict[str, Any]], summary: dict[str, Any], new: list[dict[str, Any]]) -> None:
+        summary["skipped"] += len(new)
+        room = settings.BULK_IMPORT_MAX_ERRORS - len(errors)
+        if room > 0:
+            errors.extend(new[:room])
+
+    async def _import_lineage(
+        self,
+        lineage_records: list[tuple[int, dict[str, Any]]],
+        summary: dict[str, Any],
+        errors: list[dict[str, Any]],
+    ) -> None:
+        """Write lineage rows through the batch API, one call per lineage type."""
+        service = LineageService(self.lineage_driver, redis=self.redis)
+        for rtype, request_model, create_batch in (
+            ("table_lineage", TableLineageCreateRequest, service.create_table_lineage_batch),
+            ("field_lineage", FieldLineageCreateRequest, service.create_field_lineage_batch),
+        ):
+            rows: list[int] = []
+            items = []
+            for idx, rec in lineage_records:
+                if rec.get("type") != rtype:
+                    continue
+                values = {k: v for k, v in rec.items() if v is not None and not (isinstance(v, float) and math.isnan(v))}
+                try:
+                    items.append(request_model(**values))
+                except ValidationError as exc:
+                    errors.append({"row": idx, "entity": rtype, "message": str(exc), "code": "INVALID_LINEAGE"})
+                    continue
+                rows.append(idx)
+            if not items:
+                continue
+            result = await create_batch(items)
+            summary["created"] += result.created
+            for item in result.results:
+                if item.status == "error":
+                    errors.append({"row": rows[item.index], "entity": rtype, "message": item.error, "code": "LINEAGE_WRITE_FAILED"})
+
+    async def _validate_records(
+        self, records: list[Any], first_row: int = 1, reported_refs: set[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """Check one chunk; a missing reference already in ``reported_refs`` is not reported again."""
         errors: list[dict[str, Any]] = []
         table_ids = set()
         field_ids = set()
-        for idx, rec in enumerate(records, start=1):
+        reported_refs = reported_refs if reported_refs is not None else set()
+        for idx, rec in enumerate(records, start=first_row):
+            if not isinstance(rec, dict):
+                errors.append({"row": idx, "entity": "unknown", "message": "Record is not an object", "code": "INVALID_RECORD"})
+                continue
             if "type" not in rec:
                 errors.append({"row": idx, "entity": "unknown", "message": "Missing type", "code": "MISSING_TYPE"})
                 continue
@@ -171,10 +428,12 @@ class BulkService:
                     field_ids.update([rec["source_field_id"], rec["target_field_id"]])
 
         # Referential checks for tables/fields
-        missing_tables = await self._missing_ids(MetadataTable, table_ids)
+        missing_tables = await self._missing_ids(MetadataTable, table_ids - reported_refs)
+        reported_refs.update(missing_tables)
         for t in missing_tables:
             errors.append({"row": None, "entity": "table", "message": f"Referenced table_id not found: {t}", "code": "MISSING_REF"})
-        missing_fields = await self._missing_ids(MetadataField, field_ids)
+        missing_fields = await self._missing_ids(MetadataField, field_ids - reported_refs)
+        reported_refs.update(missing_fields)
         for f in missing_fields:
             errors.append({"row": None, "entity": "field", "message": f"Referenced field_id not found: {f}", "code": "MISSING_REF"})
         return errors
@@ -186,48 +445,18 @@ class BulkService:
         found = {str(r[0]) for r in result.fetchall()}
         return [str(i) for i in ids if str(i) not in found]
 
-    async def _load_table_index(self) -> dict[tuple[str | None, str | None], str]:
-        result = await self.session.execute(select(MetadataTable.id, MetadataTable.source_id, MetadataTable.name))
-        return {(str(r.source_id) if r.source_id else None, r.name): str(r.id) for r in result.fetchall()}
-
-    async def _load_field_index(self) -> dict[tuple[str | None, str | None], str]:
-        result = await self.session.execute(select(MetadataField.id, MetadataField.table_id, MetadataField.name))
-        return {(str(r.table_id) if r.table_id else None, r.name): str(r.id) for r in result.fetchall()}
-
-    def _parse(self, file_bytes: bytes, file_format: str) -> list[dict[str, Any]]:
-        fmt = file_format.lower()
-        if fmt == "csv":
-            df = pd.read_csv(io.BytesIO(file_bytes))
-            return df.to_dict(orient="records")
-        if fmt in {"yaml", "yml"}:
-            return yaml.safe_load(io.BytesIO(file_bytes)) or []
-        if fmt == "json":
-            return json.loads(file_bytes.decode("utf-8"))
-        if fmt == "xlsx":
-            df = pd.read_excel(io.BytesIO(file_bytes))
-            return df.to_dict(orient="records")
-        return []
-
-    async def bulk_export(self, *, file_format: str) -> bytes:
-        if file_format not in self.SUPPORTED_FORMATS:
+    @staticmethod
+    def check_export_format(file_format: str) -> None:
+        if file_format.lower() not in EXPORT_FORMATS:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unsupported format")
 
-        # Minimal placeholder export: export tables only
-        rows = []
-        result = await self.session.execute(MetadataTable.__table__.select())
-        for row in result.fetchall():
-            rows.append(dict(row._mapping))
-
-        buf = io.BytesIO()
-        fmt = file_format.lower()
-        if fmt == "csv":
-            pd.DataFrame(rows).to_csv(buf, index=False)
-            return buf.getvalue()
-        if fmt == "json":
-            return json.dumps(rows).encode("utf-8")
-        if fmt in {"yaml", "yml"}:
-            return yaml.safe_dump(rows).encode("utf-8")
-        if fmt == "xlsx":
-            pd.DataFrame(rows).to_excel(buf, index=False)
-            return buf.getvalue()
-        return b""
+    def bulk_export(self, *, file_format: str) -> AsyncIterator[bytes]:
+        """The whole catalog encoded as ``file_format``, produced chunk by chunk as it is read.
+
+        Reads go through ``self.session`` while the stream is consumed, so the
+        session must stay open until the last chunk; lineage is included when the
+        service has a Neo4j driver.
+        """
+        self.check_export_format(file_format)
+        chunks = iter_catalog(self.session, self.lineage_driver, settings.BULK_EXPORT_CHUNK_SIZE)
+        return encode(chunks, file_format)
@@ -0,0 +1,98 @@
+"""Binary encoding for cached lineage payloads.
+
+Payloads are framed as ``<version><serializer><compression><body>``. The body is
+msgpack (falling back to compact JSON when msgpack is not installed) and is
+compressed with zstd (or zlib) once it exceeds ``LINEAGE_CACHE_COMPRESS_MIN_BYTES``.
+The frame records what was used, so any worker can read what another wrote, and
+un-framed JSON text written before the codec existed still decodes.
+"""
+import json
+import zlib
+from typing import Any
+
+from app.config import settings
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+FORMAT_VERSION = 1
+
+SERIALIZER_JSON = 0
+SERIALIZER_MSGPACK = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+
+class CodecError(ValueError):
+    """Raised for payloads this process cannot decode; callers treat them as misses."""
+
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def encode(data: Any, compress_min_bytes: int | None = None) -> tuple[bytes, int]:
+    """Return the framed payload and the size of the serialized body before compression."""
+    if msgpack is not None:
+        serializer = SERIALIZER_MSGPACK
+        body = msgpack.packb(data, use_bin_type=True)
+    else:
+        serializer = SERIALIZER_JSON
+        body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    raw_size = len(body)
+
+    threshold = settings.LINEAGE_CACHE_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+    compression = COMPRESSION_NONE
+    if raw_size >= threshold:
+        if _zstd_compressor is not None:
+            compression = COMPRESSION_ZSTD
+            body = _zstd_compressor.compress(body)
+        else:
+            compression = COMPRESSION_ZLIB
+            body = zlib.compress(body, 6)
+    return bytes((FORMAT_VERSION, serializer, compression)) + body, raw_size
+
+
+def decode(payload: bytes | str) -> Any:
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if not payload:
+        raise CodecError("empty payload")
+    if payload[:1] in (b"{", b"["):
+        # legacy entry: plain JSON text
+        return json.loads(payload)
+    if len(payload) < 3 or payload[0] != FORMAT_VERSION:
+        raise CodecError(f"unsupported cache payload version {payload[0]}")
+
+    serializer, compression, body = payload[1], payload[2], payload[3:]
+    try:
+        if compression == COMPRESSION_ZSTD:
+            if _zstd_decompressor is None:
+                raise CodecError("zstd payload but zstandard is not installed")
+            body = _zstd_decompressor.decompress(body)
+        elif compression == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+        elif compression != COMPRESSION_NONE:
+            raise CodecError(f"unknown compression {compression}")
+
+        if serializer == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise CodecError("msgpack payload but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        if serializer == SERIALIZER_JSON:
+            return json.loads(body)
+    except CodecError:
+        raise
+    except Exception as exc:
+        raise CodecError(str(exc)) from exc
+    raise CodecError(f"unknown serializer {serializer}")
@@ -0,0 +1,214 @@
+"""Materialised per-table criticality (how much of the catalog a change can reach).
+
+For every table the index stores downstream and upstream reachable counts, the
+number of primary-tag domains downstream, and the longest downstream chain, in
+``table_criticality`` so ``GET /tables`` can sort and filter on them.
+
+A full recompute scans the FEEDS_INTO graph once and runs a linear DP over its
+SCC condensation (see ``app.graph.criticality``). Lineage writes record their
+endpoints in two Redis sets; the background loop drains them and recomputes
+only the ancestors of the edge sources (whose downstream changed) and the
+descendants of the edge targets (whose upstream changed), seeding the DP with
+the stored sketches of the tables just outside those regions. Table deletes and
+primary-tag changes are picked up by the periodic full recompute. A Redis lease
+keeps the loop to one app process at a time.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Any, Callable, Iterable
+
+from neo4j import AsyncDriver
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.config import settings
+from app.core.cache import Lease
+from app.db import SessionLocal
+from app.graph import queries
+from app.graph.criticality import Metrics, Reach, pack, propagate, unpack
+from app.repositories.criticality_repo import TableCriticalityRepository
+
+
+log = structlog.get_logger(__name__)
+
+DIRTY_SOURCES = "lineage:criticality:dirty:sources"
+DIRTY_TARGETS = "lineage:criticality:dirty:targets"
+LEASE = "lineage:criticality:lease"
+
+criticality_metrics: dict[str, int] = {
+    "rebuilds": 0,
+    "incremental_updates": 0,
+    "failures": 0,
+    "tables": 0,
+}
+
+
+def criticality_stats() -> dict[str, int]:
+    return dict(criticality_metrics)
+
+
+async def mark_criticality_dirty(redis: Redis, pairs: Iterable[tuple[str, str]]) -> None:
+    """Record lineage edges whose endpoints need their metrics refreshed."""
+    pairs = [(s, t) for s, t in pairs if s and t]
+    if not pairs:
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.sadd(DIRTY_SOURCES, *{s for s, _ in pairs})
+        pipe.sadd(DIRTY_TARGETS, *{t for _, t in pairs})
+        await pipe.execute()
+
+
+def _downstream_row(table_id: str, m: Metrics) -> dict[str, Any]:
+    return {
+        "table_id": table_id,
+        "downstream_count": m.count,
+        "impacted_domains": m.domains,
+        "max_depth": m.depth,
+        "downstream_sketch": pack(m.reach.sketch),
+        "downstream_domains": sorted(m.reach.domains),
+    }
+
+
+def _upstream_row(table_id: str, m: Metrics) -> dict[str, Any]:
+    return {"table_id": table_id, "upstream_count": m.count, "upstream_sketch": pack(m.reach.sketch)}
+
+
+class CriticalityIndex:
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        redis: Redis | None = None,
+    ):
+        self.driver = driver
+        self.session_factory = session_factory
+        self.redis = redis
+
+    # ---- full recompute ----
+    async def rebuild(self) -> dict[str, int]:
+        async with self.session_factory() as session:
+            domains = await TableCriticalityRepository(session).domains()
+        succ: dict[str, list[str]] = defaultdict(list)
+        pred: dict[str, list[str]] = defaultdict(list)
+        async with self.driver.session() as session:
+            result = await session.run(queries.CRITICALITY_EDGES)
+            async for record in result:
+                src, dst = record["from_id"], record["to_id"]
+                # graph nodes without a table row cannot be stored and are left out
+                if src in domains and dst in domains:
+                    succ[src].append(dst)
+                    pred[dst].append(src)
+
+        k = settings.LINEAGE_CRITICALITY_SKETCH_SIZE
+        down = propagate(domains, succ, domains, k)
+        up = propagate(domains, pred, domains, k)
+        rows = [{**_downstream_row(t, down[t]), **_upstream_row(t, up[t])} for t in domains]
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                await TableCriticalityRepository(session).replace(rows)
+
+        criticality_metrics["rebuilds"] += 1
+        criticality_metrics["tables"] = len(rows)
+        log.info("table_criticality_rebuilt", tables=len(rows), edges=sum(len(v) for v in succ.values()))
+        return {"tables": len(rows)}
+
+    # ---- incremental updates ----
+    async def refresh(self) -> int:
+        """Fold the lineage writes recorded since the last call into the metrics."""
+        if self.redis is None:
+            return 0
+        limit = settings.LINEAGE_CRITICALITY_INCREMENTAL_MAX_NODES
+        sources = await self.redis.spop(DIRTY_SOURCES, limit) or []
+        targets = await self.redis.spop(DIRTY_TARGETS, limit) or []
+        if not sources and not targets:
+            return 0
+        try:
+            await self.update(sources, targets)
+        except Exception:
+            # put the work back so the next poll retries it
+            if sources:
+                await self.redis.sadd(DIRTY_SOURCES, *sources)
+            if targets:
+                await self.redis.sadd(DIRTY_TARGETS, *targets)
+            raise
+        return len(sources) + len(targets)
+
+    async def update(self, sources: Iterable[str], targets: Iterable[str]) -> None:
+        ancestors = await self._region(queries.CRITICALITY_ANCESTORS, list(sources))
+        descendants = await self._region(queries.CRITICALITY_DESCENDANTS, list(targets))
+        if len(ancestors) + len(descendants) > settings.LINEAGE_CRITICALITY_INCREMENTAL_MAX_NODES:
+            await self.rebuild()
+            return
+
+        nodes = set(ancestors) | set(descendants)
+        nodes.update(n for region in (ancestors, descendants) for nxt in region.values() for n in nxt)
+        async with self.session_factory() as session:
+            repo = TableCriticalityRepository(session)
+            domains = await repo.domains(nodes)
+            # graph nodes without a table row cannot be stored and are left out
+            ancestors = {t: [n for n in nxt if n in domains] for t, nxt in ancestors.items() if t in domains}
+            descendants = {t: [n for n in nxt if n in domains] for t, nxt in descendants.items() if t in domains}
+            outside_down = {n for nxt in ancestors.values() for n in nxt if n not in ancestors}
+            outside_up = {n for nxt in descendants.values() for n in nxt if n not in descendants}
+            stored = await repo.get_many(outside_down | outside_up)
+
+        k = settings.LINEAGE_CRITICALITY_SKETCH_SIZE
+        down_boundary = {
+            t: Reach(unpack(row.downstream_sketch), frozenset(row.downstream_domains or ()), row.max_depth)
+            for t, row in stored.items()
+            if t in outside_down and row.downstream_sketch
+        }
+        up_boundary = {
+            t: Reach(unpack(row.upstream_sketch), frozenset(), 0)
+            for t, row in stored.items()
+            if t in outside_up and row.upstream_sketch
+        }
+        down = propagate(ancestors, ancestors, domains, k, down_boundary)
+        up = propagate(descendants, descendants, domains, k, up_boundary)
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                repo = TableCriticalityRepository(session)
+                await repo.upsert([_downstream_row(t, m) for t, m in down.items()])
+                await repo.upsert([_upstream_row(t, m) for t, m in up.items()])
+        criticality_metrics["incremental_updates"] += 1
+        log.info("table_criticality_updated", ancestors=len(ancestors), descendants=len(descendants))
+
+    async def _region(self, query: str, seeds: list[str]) -> dict[str, list[str]]:
+        """node -> next nodes for every table reached from ``seeds`` by ``query``."""
+        region: dict[str, list[str]] = {}
+        if not seeds:
+            return region
+        async with self.driver.session() as session:
+            result = await session.run(query, ids=seeds)
+            async for record in result:
+                region[record["id"]] = list(record["next"] or [])
+        return region
+
+    async def run_forever(self, poll_interval: float, rebuild_interval: float) -> None:
+        # every app process starts this loop; only the lease holder recomputes
+        lease = Lease(self.redis, LEASE, settings.LINEAGE_INDEX_LEASE_SECONDS) if self.redis else None
+        last_rebuild: float | None = None
+        try:
+            while True:
+                try:
+                    if lease is None or await lease.claim():
+                        async with lease.kept() if lease else nullcontext():
+                            if last_rebuild is None or time.monotonic() - last_rebuild >= rebuild_interval:
+                                await self.rebuild()
+                                last_rebuild = time.monotonic()
+                            else:
+                                await self.refresh()
+                    else:
+                        last_rebuild = None  # recompute on taking over from another process
+                except Exception as exc:  # pragma: no cover - external service
+                    criticality_metrics["failures"] += 1
+                    log.warning("table_criticality_update_failed", error=str(exc))
+                await asyncio.sleep(poll_interval)
+        finally:
+            if lease is not None:
+                await asyncio.shield(lease.release())
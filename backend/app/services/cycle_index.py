@@ -0,0 +1,291 @@
+"""Persisted index of lineage cycles.
+
+The whole FEEDS_INTO/DERIVES_FROM graph is partitioned into strongly connected
+components (Tarjan, linear time); every component with more than one node or a
+self-loop is stored in Postgres with its membership and a bounded set of
+representative cycles. Lineage writes patch only the component they touch:
+
+* edge insert ``u -> v``: the nodes downstream of ``v`` and upstream of ``u``
+  form the new (merged) component, found with two linear traversals;
+* edge delete / node delete: the affected component is re-split locally.
+
+Inserted edges are not folded in by the write itself: it queues them in Redis
+(a batch larger than ``LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES`` only marks the
+index stale) and the background loop drains the queue, or rebuilds once for
+any number of stale marks; a Redis lease keeps that loop to one app process at a
+time. ``find_cycles`` and ``quality_check`` then become
+lookups. A periodic full rebuild heals anything missed by failed or concurrent
+incremental updates. Whenever the stored components change, the cached cycle
+answers for their members are invalidated: a ``quality_check`` read between an
+edge write and the loop folding it in would otherwise stay cached as "no cycle".
+"""
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Any, Callable, Iterable
+
+from neo4j import AsyncDriver
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.config import settings
+from app.core.cache import Lease
+from app.db import SessionLocal
+from app.graph import queries
+from app.graph.cycles import is_cyclic, representative_cycles, strongly_connected_components
+from app.models.lineage_cycle import LineageCycleComponent
+from app.repositories.cycle_repo import LineageCycleRepository
+from app.services.lineage_cache import LineageCache
+
+
+log = structlog.get_logger(__name__)
+
+cycle_metrics: dict[str, int] = {
+    "rebuilds": 0,
+    "incremental_updates": 0,
+    "incremental_failures": 0,
+    "components": 0,
+}
+
+
+PENDING_EDGES = "lineage:cycles:pending"
+STALE = "lineage:cycles:stale"
+LEASE = "lineage:cycles:lease"
+
+
+def cycle_stats() -> dict[str, int]:
+    return dict(cycle_metrics)
+
+
+async def mark_edges_added(redis: Redis, pairs: Iterable[tuple[str, str]]) -> None:
+    """Queue inserted lineage edges for the background loop; a large batch just marks the index stale."""
+    pairs = {(s, t) for s, t in pairs if s and t}
+    if not pairs:
+        return
+    if len(pairs) > settings.LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES:
+        await redis.set(STALE, "1")
+        return
+    await redis.sadd(PENDING_EDGES, *(f"{s}>{t}" for s, t in pairs))
+
+
+class CycleIndex:
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        redis: Redis | None = None,
+    ):
+        self.driver = driver
+        self.session_factory = session_factory
+        self.redis = redis
+
+    # ---- lookups ----
+    async def component_for(self, node_id: str, session: AsyncSession | None = None) -> LineageCycleComponent | None:
+        if session is not None:
+            return await LineageCycleRepository(session).component_for(node_id)
+        async with self.session_factory() as own:
+            return await LineageCycleRepository(own).component_for(node_id)
+
+    async def components(
+        self, node_type: str | None = None, session: AsyncSession | None = None
+    ) -> list[LineageCycleComponent]:
+        if session is not None:
+            return list(await LineageCycleRepository(session).list_components(node_type))
+        async with self.session_factory() as own:
+            return list(await LineageCycleRepository(own).list_components(node_type))
+
+    # ---- full rebuild ----
+    async def rebuild(self) -> dict[str, int]:
+        succ: dict[str, list[str]] = defaultdict(list)
+        nodes: set[str] = set()
+        async with self.driver.session() as session:
+            result = await session.run(queries.CYCLE_EDGES)
+            async for record in result:
+                src, dst = record["from_id"], record["to_id"]
+                if src and dst:
+                    succ[src].append(dst)
+                    nodes.add(src)
+                    nodes.add(dst)
+
+        cyclic = [c for c in strongly_connected_components(nodes, succ) if is_cyclic(c, succ)]
+        info, out = await self._subgraph([n for c in cyclic for n in c])
+        # skip components that lost a node to a concurrent delete; the next update or rebuild fixes them
+        components = [self._component(c, info, out) for c in cyclic if all(n in info for n in c)]
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                repo = LineageCycleRepository(session)
+                before = await repo.all_memberships()
+                await repo.replace(None, components)
+        after = {n: c["id"] for c in components for n in c["members"]}
+        await self._invalidate({n for n in before.keys() | after.keys() if before.get(n) != after.get(n)})
+
+        cycle_metrics["rebuilds"] += 1
+        cycle_metrics["components"] = len(components)
+        totals = {"components": len(components), "nodes": sum(len(c["members"]) for c in components)}
+        log.info("lineage_cycle_index_rebuilt", scanned_nodes=len(nodes), **totals)
+        return totals
+
+    async def run_forever(self, poll_interval: float, rebuild_interval: float) -> None:
+        # every app process starts this loop; only the lease holder rebuilds and refreshes
+        lease = Lease(self.redis, LEASE, settings.LINEAGE_INDEX_LEASE_SECONDS) if self.redis else None
+        last_rebuild: float | None = None
+        try:
+            while True:
+                try:
+                    if lease is None or await lease.claim():
+                        async with lease.kept() if lease else nullcontext():
+                            if last_rebuild is None or time.monotonic() - last_rebuild >= rebuild_interval:
+                                await self.rebuild()
+                                last_rebuild = time.monotonic()
+                            else:
+                                await self.refresh()
+                    else:
+                        last_rebuild = None  # rebuild on taking over from another process
+                except Exception as exc:  # pragma: no cover - external service
+                    log.warning("lineage_cycle_index_rebuild_failed", error=str(exc))
+                await asyncio.sleep(poll_interval)
+        finally:
+            if lease is not None:
+                await asyncio.shield(lease.release())
+
+    # ---- incremental updates ----
+    async def refresh(self) -> int:
+        """Fold the edges queued since the last call into the index; returns how many were handled."""
+        if self.redis is None:
+            return 0
+        if await self.redis.delete(STALE):
+            # a batch too large to patch: everything queued so far is covered by one rebuild
+            await self.redis.delete(PENDING_EDGES)
+            try:
+                await self.rebuild()
+            except Exception:
+                await self.redis.set(STALE, "1")
+                raise
+            return 1
+        members = await self.redis.spop(PENDING_EDGES, settings.LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES) or []
+        if not members:
+            return 0
+        try:
+            await self.edges_added([tuple(m.split(">", 1)) for m in members])
+        except Exception:
+            cycle_metrics["incremental_failures"] += 1
+            # put the work back so the next poll retries it
+            await self.redis.sadd(PENDING_EDGES, *members)
+            raise
+        return len(members)
+
+    async def edges_added(self, pairs: Iterable[tuple[str, str]]) -> None:
+        pairs = [(s, t) for s, t in pairs if s and t]
+        if not pairs:
+            return
+        if len(pairs) > settings.LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES:
+            await self.rebuild()
+            return
+        memberships = await self._memberships({n for pair in pairs for n in pair})
+        seeds: set[str] = set()
+        async with self.driver.session() as session:
+            for src, dst in pairs:
+                if src in memberships and memberships.get(src) == memberships.get(dst):
+                    continue  # already in one component, membership cannot change
+                result = await session.run(queries.CYCLE_REGION, from_id=src, to_id=dst)
+                record = await result.single()
+                seeds.update((record["ids"] or []) if record else [])
+        if seeds:
+            await self._recompute(seeds)
+
+    async def edges_removed(self, pairs: Iterable[tuple[str, str]]) -> None:
+        pairs = [(s, t) for s, t in pairs if s and t]
+        memberships = await self._memberships({n for pair in pairs for n in pair})
+        # only an edge inside a component can split it
+        seeds = {s for s, t in pairs if s in memberships and memberships.get(s) == memberships.get(t)}
+        if seeds:
+            await self._recompute(seeds)
+
+    async def nodes_removed(self, node_ids: Iterable[str]) -> None:
+        memberships = await self._memberships(set(node_ids))
+        if memberships:
+            await self._recompute(set(memberships))
+
+    async def _memberships(self, node_ids: set[str]) -> dict[str, str]:
+        async with self.session_factory() as session:
+            return await LineageCycleRepository(session).memberships(node_ids)
+
+    async def _recompute(self, seeds: set[str]) -> None:
+        """Re-derive the components covering ``seeds`` and their current components."""
+        async with self.session_factory() as session:
+            repo = LineageCycleRepository(session)
+            old = set((await repo.memberships(seeds)).values())
+            scope = set(seeds) | set(await repo.members_of(old))
+
+        info, out = await self._subgraph(list(scope))
+        alive = set(info)
+        succ = {n: [e["to"] for e in out.get(n, ()) if e["to"] in alive] for n in alive}
+        cyclic = [c for c in strongly_connected_components(alive, succ) if is_cyclic(c, succ)]
+        components = [self._component(c, info, out) for c in cyclic]
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                await LineageCycleRepository(session).replace(old, components)
+        await self._invalidate(scope)
+        cycle_metrics["incremental_updates"] += 1
+        log.info("lineage_cycle_index_updated", scope=len(scope), replaced=len(old), components=len(components))
+
+    # ---- helpers ----
+    async def _invalidate(self, node_ids: Iterable[str]) -> None:
+        """Drop cached cycle answers for nodes whose component changed."""
+        node_ids = list(node_ids)
+        if node_ids:
+            await LineageCache(self.redis).invalidate(node_ids, edges=True)
+
+    async def _subgraph(self, node_ids: list[str]) -> tuple[dict[str, dict[str, Any]], dict[str, list[dict[str, Any]]]]:
+        info: dict[str, dict[str, Any]] = {}
+        out: dict[str, list[dict[str, Any]]] = {}
+        chunk = settings.LINEAGE_BATCH_CHUNK_SIZE
+        async with self.driver.session() as session:
+            for start in range(0, len(node_ids), chunk):
+                result = await session.run(queries.CYCLE_SUBGRAPH, ids=node_ids[start:start + chunk])
+                async for record in result:
+                    node_id = record["id"]
+                    info[node_id] = {
+                        "id": node_id,
+                        "name": record["name"],
+                        "type": "field" if "Field" in (record["labels"] or []) else "table",
+                        "table_id": record["table_id"],
+                        "source_id": record["source_id"],
+                    }
+                    out[node_id] = list(record["out"] or [])
+        return info, out
+
+    @staticmethod
+    def _component(
+        members: list[str], info: dict[str, dict[str, Any]], out: dict[str, list[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        member_set = set(members)
+        succ = {n: [e["to"] for e in out.get(n, ()) if e["to"] in member_set] for n in members}
+        cycles = []
+        for cycle in representative_cycles(members, succ, settings.LINEAGE_CYCLE_SAMPLES):
+            edges = []
+            for i, src in enumerate(cycle):
+                dst = cycle[(i + 1) % len(cycle)]
+                edge = next(e for e in out[src] if e["to"] == dst)
+                edges.append(
+                    {
+                        "id": str(edge["id"]),
+                        "from": src,
+                        "to": dst,
+                        "rel_type": edge["rel_type"],
+                        "lineage_source": edge["lineage_source"],
+                        "confidence": edge["confidence"],
+                    }
+                )
+            cycles.append({"nodes": [info[n] for n in cycle], "edges": edges})
+        ordered = sorted(members)
+        return {
+            "id": ordered[0],
+            "node_type": info[ordered[0]]["type"],
+            "members": ordered,
+            "cycles": cycles,
+        }
@@ -7,16 +7,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.field import MetadataField
 from app.repositories.field_repo import FieldRepository
 from app.schemas.field import Field, FieldCreate, FieldUpdate, FieldCreateInTable
-from app.services.lineage_service import LineageService
+from app.repositories.outbox_repo import GraphOutboxRepository
+from app.services.graph_outbox import notify_graph_outbox
 
 
 class FieldService:
     """PostgreSQL-backed field service."""
 
-    def __init__(self, session: AsyncSession, lineage_driver=None):
+    def __init__(self, session: AsyncSession):
         self.session = session
         self.repo = FieldRepository(session)
-        self.lineage_driver = lineage_driver
+        self.outbox = GraphOutboxRepository(session)
 
     async def list_fields_for_table(self, table_id: str) -> List[Field]:
         fields = await self.repo.list_by_table(table_id)
@@ -37,16 +38,9 @@ class FieldService:
             is_foreign_key=payload.is_foreign_key,
         )
         await self.repo.add(field)
+        self.outbox.enqueue_field(field)
         await self.session.commit()
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).sync_field_node(
-                {
-                    "id": str(field.id),
-                    "name": field.name,
-                    "data_type": field.data_type,
-                    "table_id": str(field.table_id),
-                }
-            )
+        notify_graph_outbox()
         return self._to_schema(field)
 
     async def get_field(self, field_id: str) -> Field:
@@ -61,27 +55,20 @@ class FieldService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Field not found")
         for key, value in payload.model_dump(exclude_unset=True).items():
             setattr(field, key, value)
+        self.outbox.enqueue_field(field)
         await self.session.commit()
+        notify_graph_outbox()
         await self.session.refresh(field)
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).sync_field_node(
-                {
-                    "id": str(field.id),
-                    "name": field.name,
-                    "data_type": field.data_type,
-                    "table_id": str(field.table_id),
-                }
-            )
         return self._to_schema(field)
 
     async def delete_field(self, field_id: str) -> None:
         field = await self.repo.get(field_id)
         if not field:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Field not found")
+        self.outbox.enqueue_delete("field", field.id)
         await self.repo.delete(field)
         await self.session.commit()
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).delete_field_node(str(field.id))
+        notify_graph_outbox()
 
     async def create_fields_batch(self, table_id: str, payloads: List[FieldCreate | FieldCreateInTable]) -> List[Field]:
         created: list[Field] = []
@@ -98,13 +85,9 @@ class FieldService:
                     is_foreign_key=getattr(payload, "is_foreign_key", None),
                 )
                 await self.repo.add(field)
+                self.outbox.enqueue_field(field)
                 created.append(self._to_schema(field))
-        if self.lineage_driver:
-            svc = LineageService(self.lineage_driver)
-            for f in created:
-                await svc.sync_field_node(
-                    {"id": str(f.id), "name": f.name, "data_type": f.data_type, "table_id": str(f.table_id)}
-                )
+        notify_graph_outbox()
         return created
 
     @staticmethod
@@ -0,0 +1,237 @@
+"""Single-pass assembly of lineage records into response models.
+
+Neo4j records, projection dicts and stored cycle nodes are read once into
+slotted ``NodeRecord``/``EdgeRecord`` objects. Distances missing from the
+record are filled by one BFS over the adjacency collected while the edges are
+read, enrichment data is merged in when the records are turned into plain
+dicts, and the result is validated in a single pydantic call (one pass in the
+Rust core instead of a Python-level constructor per node).
+"""
+from collections import deque
+from typing import Any, Iterable, Mapping
+
+from pydantic import TypeAdapter
+
+from app.schemas.lineage import LineageGraphEdge, LineageGraphNode, LineageGraphResponse
+
+
+_NODES = TypeAdapter(list[LineageGraphNode])
+_EDGES = TypeAdapter(list[LineageGraphEdge])
+
+
+class NodeRecord:
+    __slots__ = ("id", "label", "type", "source_id", "parent_id", "ordinal_position", "distance")
+
+    def __init__(self, node_id: str, props: Mapping[str, Any], labels: Iterable[str]) -> None:
+        self.id = node_id
+        self.label = props.get("name")
+        self.source_id = props.get("source_id")
+        self.parent_id = props.get("table_id")
+        self.ordinal_position = props.get("ordinal_position")
+        self.distance = props.get("depth") or props.get("distance")
+        if "Field" in labels:
+            self.type = "field"
+        elif "Table" in labels:
+            self.type = "table"
+        else:
+            # nodes without labels (dicts) are fields when they carry a table_id
+            self.type = "field" if self.parent_id else "table"
+
+    def as_dict(self, extra: Mapping[str, Any] | None = None) -> dict[str, Any]:
+        extra = extra or {}
+        return {
+            "id": self.id,
+            "label": self.label,
+            "type": self.type,
+            "source_id": self.source_id or extra.get("source_id"),
+            "parent_id": self.parent_id,
+            "ordinal_position": self.ordinal_position,
+            "primary_tag": extra.get("primary_tag"),
+            "distance": self.distance,
+            "source_name": extra.get("source_name"),
+        }
+
+
+class EdgeRecord:
+    __slots__ = ("id", "start", "end", "rel_type", "lineage_source", "confidence")
+
+    def __init__(self, rel_id: Any, start: str, end: str, data: Mapping[str, Any]) -> None:
+        self.id = str(rel_id) if rel_id is not None else ""
+        self.start = start
+        self.end = end
+        self.rel_type = data.get("rel_type")
+        self.lineage_source = data.get("lineage_source")
+        self.confidence = data.get("confidence")
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "from": self.start,
+            "to": self.end,
+            "type": "field" if self.rel_type == "DERIVES_FROM" else "table",
+            "lineage_source": self.lineage_source,
+            "confidence": self.confidence,
+            "metadata": {"rel_type": self.rel_type} if self.rel_type else {},
+        }
+
+
+def read_node(node: Any) -> NodeRecord | None:
+    labels: Iterable[str] = ()
+    if isinstance(node, dict):
+        props = node
+    elif hasattr(node, "_properties"):
+        props = getattr(node, "_properties", {}) or {}
+        labels = getattr(node, "labels", ()) or ()
+    else:
+        try:
+            props = dict(node)
+        except Exception:
+            return None
+    node_id = props.get("id")
+    return NodeRecord(node_id, props, labels) if node_id else None
+
+
+def read_edge(rel: Any) -> EdgeRecord | None:
+    data = rel if hasattr(rel, "items") else {}
+    start = data.get("from") or data.get("start") or data.get("start_id")
+    end = data.get("to") or data.get("end") or data.get("end_id")
+    if not start or not end:
+        return None
+    return EdgeRecord(data.get("id"), start, end, data)
+
+
+def build_nodes(
+    records: Iterable[NodeRecord], table_info: Mapping[str, Mapping[str, Any]] | None = None
+) -> list[LineageGraphNode]:
+    info = table_info or {}
+    return _NODES.validate_python([n.as_dict(info.get(n.id)) for n in records])
+
+
+def build_edges(records: Iterable[EdgeRecord]) -> list[LineageGraphEdge]:
+    return _EDGES.validate_python([e.as_dict() for e in records])
+
+
+class GraphAssembly:
+    __slots__ = ("root_id", "nodes", "edges")
+
+    def __init__(self, root_id: str, nodes: list[NodeRecord], edges: list[EdgeRecord]) -> None:
+        self.root_id = root_id
+        self.nodes = nodes
+        self.edges = edges
+
+    def table_ids(self) -> list[str]:
+        return [n.id for n in self.nodes if n.type == "table"]
+
+    def response(self, table_info: Mapping[str, Mapping[str, Any]] | None = None) -> LineageGraphResponse:
+        info = table_info or {}
+        return LineageGraphResponse.model_validate(
+            {
+                "root_id": self.root_id,
+                "nodes": [n.as_dict(info.get(n.id)) for n in self.nodes],
+                "edges": [e.as_dict() for e in self.edges],
+            }
+        )
+
+
+def assemble(record: Mapping[str, Any] | None, direction: str | None = None) -> GraphAssembly:
+    """Read a ``root_id``/``nodes``/``rels`` record once; duplicate nodes keep their smallest distance.
+
+    Missing distances are hop counts from the root along ``direction``
+    (``upstream``/``downstream``), or ignoring edge direction when it is None.
+    """
+    if not record:
+        return GraphAssembly("", [], [])
+    root_id = record.get("root_id") or ""
+
+    nodes: dict[str, NodeRecord] = {}
+    missing = False
+    for raw in record.get("nodes") or ():
+        node = read_node(raw)
+        if node is None:
+            continue
+        if node.distance is None and node.id == root_id:
+            node.distance = 0
+        seen = nodes.get(node.id)
+        if seen is None:
+            nodes[node.id] = node
+            missing = missing or node.distance is None
+        elif node.distance is not None and (seen.distance is None or node.distance < seen.distance):
+            seen.distance = node.distance
+    if root_id and root_id not in nodes:
+        nodes[root_id] = NodeRecord(root_id, {"distance": 0}, ("Table",))
+
+    edges: list[EdgeRecord] = []
+    adjacency: dict[str, list[str]] | None = {} if missing and root_id else None
+    for raw in record.get("rels") or ():
+        edge = read_edge(raw)
+        if edge is None:
+            continue
+        edges.append(edge)
+        if adjacency is not None:
+            if direction != "upstream":
+                adjacency.setdefault(edge.start, []).append(edge.end)
+            if direction != "downstream":
+                adjacency.setdefault(edge.end, []).append(edge.start)
+
+    if adjacency is not None:
+        # hop distance from the root for nodes the record left without one
+        dist = {root_id: 0}
+        queue = deque([root_id])
+        while queue:
+            cur = queue.popleft()
+            for nxt in adjacency.get(cur, ()):
+                if nxt not in dist:
+                    dist[nxt] = dist[cur] + 1
+                    queue.append(nxt)
+        for node in nodes.values():
+            if node.distance is None:
+                node.distance = dist.get(node.id)
+
+    return GraphAssembly(root_id, list(nodes.values()), edges)
+
+
+def within_depth(graph: LineageGraphResponse, direction: str, depth: int, granularity: str) -> LineageGraphResponse:
+    """Cut an upstream or downstream graph down to the one ``depth`` hops deep.
+
+    Tables keep their distance. A FEEDS_INTO edge lies on a path of at most
+    ``depth`` hops when its end nearer the root is under ``depth`` hops away.
+    Fields follow their tables: every column for ``all``, only the endpoints of
+    DERIVES_FROM edges between kept tables for ``field``.
+    """
+    dist = {
+        n.id: n.distance
+        for n in graph.nodes
+        if n.type == "table" and n.distance is not None and n.distance <= depth
+    }
+    parent = {n.id: n.parent_id for n in graph.nodes if n.type == "field"}
+    upstream = direction == "upstream"
+    edges: list[LineageGraphEdge] = []
+    fields: set[str] = set()
+    for edge in graph.edges:
+        if edge.type == "field":
+            if parent.get(edge.from_) in dist and parent.get(edge.to) in dist:
+                edges.append(edge)
+                fields.update((edge.from_, edge.to))
+        elif edge.from_ in dist and edge.to in dist and dist[edge.to if upstream else edge.from_] < depth:
+            edges.append(edge)
+
+    def keep(node: LineageGraphNode) -> bool:
+        if node.type != "field":
+            return node.id in dist
+        return parent[node.id] in dist if granularity == "all" else node.id in fields
+
+    return LineageGraphResponse(root_id=graph.root_id, nodes=[n for n in graph.nodes if keep(n)], edges=edges)
+
+
+def merge_graphs(root_id: str, graphs: Iterable[LineageGraphResponse]) -> LineageGraphResponse:
+    """Union of graphs around the same root; a node reached in several keeps its smallest distance."""
+    nodes: dict[str, LineageGraphNode] = {}
+    edges: dict[str, LineageGraphEdge] = {}
+    for graph in graphs:
+        for node in graph.nodes:
+            seen = nodes.get(node.id)
+            if seen is None or (node.distance is not None and (seen.distance is None or node.distance < seen.distance)):
+                nodes[node.id] = node
+        for edge in graph.edges:
+            edges.setdefault(edge.id, edge)
+    return LineageGraphResponse(root_id=root_id, nodes=list(nodes.values()), edges=list(edges.values()))
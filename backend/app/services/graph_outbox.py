@@ -0,0 +1,133 @@
+"""Transactional outbox dispatcher for Postgres -> Neo4j node sync.
+
+Table and field writes enqueue a ``graph_outbox`` row in the same Postgres
+transaction as the change, so the graph can never miss a committed change or
+see one that rolled back. The dispatcher claims due events in id order (at most
+the oldest per entity, see ``GraphOutboxRepository.claim_batch``), applies them
+to Neo4j as batched UNWIND writes and deletes them once the graph write has
+committed. Events that fail are retried individually and backed off
+exponentially.
+"""
+import asyncio
+from typing import Any, Callable, Sequence
+
+from neo4j import AsyncDriver
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.outbox import GraphOutboxEvent
+from app.repositories.outbox_repo import GraphOutboxRepository
+from app.services.lineage_service import LineageService
+
+
+log = structlog.get_logger(__name__)
+
+_wakeup = asyncio.Event()
+
+outbox_metrics: dict[str, int] = {
+    "dispatched": 0,
+    "failed": 0,
+    "batches": 0,
+    "retried_individually": 0,
+}
+
+
+def notify_graph_outbox() -> None:
+    """Wake the in-process dispatcher after a commit that enqueued events."""
+    _wakeup.set()
+
+
+def outbox_stats() -> dict[str, int]:
+    return dict(outbox_metrics)
+
+
+def _changes(events: Sequence[GraphOutboxEvent]) -> dict[str, list[Any]]:
+    changes: dict[str, list[Any]] = {
+        "table_upserts": [],
+        "field_upserts": [],
+        "field_deletes": [],
+        "table_deletes": [],
+    }
+    for event in events:
+        if event.op == "upsert":
+            changes[f"{event.entity_type}_upserts"].append(event.payload)
+        else:
+            changes[f"{event.entity_type}_deletes"].append(str(event.entity_id))
+    return changes
+
+
+class GraphOutboxDispatcher:
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        redis: Redis | None = None,
+    ):
+        self.lineage = LineageService(driver, redis=redis)
+        self.session_factory = session_factory
+
+    async def dispatch_once(self, limit: int | None = None) -> int:
+        """Apply one batch of due events; returns how many were synced."""
+        limit = limit or settings.GRAPH_OUTBOX_BATCH_SIZE
+        async with self.session_factory() as session:
+            async with session.begin():
+                repo = GraphOutboxRepository(session)
+                events = await repo.claim_batch(limit)
+                if not events:
+                    return 0
+                outbox_metrics["batches"] += 1
+                try:
+                    await self.lineage.apply_node_changes(**_changes(events))
+                    done = list(events)
+                except Exception as exc:
+                    log.warning("graph_outbox_batch_failed", events=len(events), error=str(exc))
+                    done = await self._apply_individually(repo, events)
+                await repo.remove([event.id for event in done])
+        outbox_metrics["dispatched"] += len(done)
+        return len(done)
+
+    async def _apply_individually(
+        self, repo: GraphOutboxRepository, events: Sequence[GraphOutboxEvent]
+    ) -> list[GraphOutboxEvent]:
+        # Isolate the poison event(s) so the rest of the batch still goes through.
+        outbox_metrics["retried_individually"] += len(events)
+        done: list[GraphOutboxEvent] = []
+        for event in events:
+            try:
+                await self.lineage.apply_node_changes(**_changes([event]))
+                done.append(event)
+            except Exception as exc:
+                outbox_metrics["failed"] += 1
+                repo.mark_failed([event], str(exc), settings.GRAPH_OUTBOX_MAX_BACKOFF_SECONDS)
+                log.warning(
+                    "graph_outbox_event_failed",
+                    event_id=event.id,
+                    entity_type=event.entity_type,
+                    entity_id=str(event.entity_id),
+                    attempts=event.attempts,
+                    error=str(exc),
+                )
+        return done
+
+    async def drain(self) -> int:
+        total = 0
+        while True:
+            synced = await self.dispatch_once()
+            total += synced
+            if synced < settings.GRAPH_OUTBOX_BATCH_SIZE:
+                return total
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.GRAPH_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            try:
+                await self.drain()
+            except Exception as exc:  # pragma: no cover - external service
+                log.warning("graph_outbox_dispatch_failed", error=str(exc))
@@ -0,0 +1,477 @@
+"""Two-tier cache for lineage responses with generation-based invalidation.
+
+Every lineage node has a generation (``lineage:gen:<node_id>``). A cached entry
+stores, next to its payload, a snapshot of the generations of the nodes its
+traversal touched. A write takes the next value of the global write sequence
+(``lineage:gen:@all``) and sets it as the generation of the nodes it touches, so
+an edge insert costs a handful of SETs instead of a keyspace SCAN, and entries
+for unrelated parts of the graph stay warm. Reads validate the snapshot
+server-side in a single round trip. Because generations are sequence numbers, a
+value computed after reading the sequence as ``n`` is stale exactly when one of
+its own dependencies has a generation above ``n``; writes elsewhere do not keep
+it out of the cache.
+
+Path- and cycle-style entries can change when an edge is added anywhere between
+their endpoints, so they also depend on the ``@edges`` generation, which every
+edge write bumps.
+
+Redis is the shared L2. In front of it each process keeps a bounded LRU (L1) of
+already-built response objects, indexed by the same dependency ids; writes
+publish the touched ids on ``lineage:invalidate`` so every worker drops the
+affected L1 entries.
+
+Misses are coalesced: one computation per key per process (single-flight) and a
+short Redis lock so only one worker recomputes while the others wait for its
+result. Entries outlive their TTL by a stale window; a TTL-expired entry whose
+generations are still valid is served immediately while one background task
+refreshes it.
+
+Payloads are stored through ``cache_codec`` (msgpack + zstd above a size
+threshold) and read back undecoded, so the shared ``decode_responses`` client
+can be used for binary values.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.client import NEVER_DECODE
+from redis.exceptions import NoScriptError
+import structlog
+
+from app.config import settings
+from app.services import cache_codec
+
+
+log = structlog.get_logger(__name__)
+
+GEN_PREFIX = "lineage:gen:"
+EDGES_GEN = "@edges"
+ALL_GEN = "@all"
+INVALIDATION_CHANNEL = "lineage:invalidate"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+LOCK_POLL_SECONDS = 0.05
+L1_MAX_TRACKED_DEPS = 100_000  # per-dependency invalidation epochs kept before resetting
+
+# Returns {payload, pttl, dep ids...} when every dependency generation still
+# matches the snapshot, nil otherwise.
+_GET_IF_FRESH = """
+local deps = redis.call('HGETALL', KEYS[2])
+if #deps == 0 then
+  return false
+end
+local out = {false, 0}
+for i = 1, #deps, 2 do
+  local cur = redis.call('GET', ARGV[1] .. deps[i]) or '0'
+  if cur ~= deps[i + 1] then
+    return false
+  end
+  out[#out + 1] = deps[i]
+end
+local payload = redis.call('GET', KEYS[1])
+if not payload then
+  return false
+end
+out[1] = payload
+out[2] = redis.call('PTTL', KEYS[1])
+return out
+"""
+
+# Next write sequence number, set as the generation of every touched id (ARGV[2..]).
+_BUMP = """
+local seq = redis.call('INCR', ARGV[1] .. '@all')
+for i = 2, #ARGV do
+  redis.call('SET', ARGV[1] .. ARGV[i], seq)
+end
+return seq
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+cache_metrics: Counter = Counter()
+# key prefix -> requests answered from L1/L2 by get_or_compute
+prefix_hits: Counter = Counter()
+# key prefix -> {"writes", "raw_bytes", "stored_bytes", "max_stored_bytes"}
+payload_metrics: dict[str, Counter] = {}
+
+
+def _record_payload(key: str, raw_size: int, stored_size: int) -> None:
+    stats = payload_metrics.setdefault(key.rsplit(":", 1)[0], Counter())
+    stats["writes"] += 1
+    stats["raw_bytes"] += raw_size
+    stats["stored_bytes"] += stored_size
+    stats["max_stored_bytes"] = max(stats["max_stored_bytes"], stored_size)
+
+
+class L1Cache:
+    """Bounded in-process LRU keyed like Redis, bounded by entry count and approximate bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # Bumped on every invalidation. A fill records the epoch it started at and is
+        # dropped if one of its own deps was invalidated later (or everything was cleared).
+        self.epoch = 0
+        self._dep_epochs: dict[str, int] = {}
+        self._floor = 0
+        # key -> (fresh_until, expires_at, value, deps, nbytes)
+        self._entries: OrderedDict[str, tuple[float, float, Any, tuple[str, ...], int]] = OrderedDict()
+        self._by_dep: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> tuple[Any, bool] | None:
+        """Return ``(value, fresh)``; stale values are kept until the stale window ends."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry[1] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2], entry[0] > now
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        stale: float,
+        deps: Iterable[str],
+        nbytes: int,
+        epoch: int,
+    ) -> None:
+        dep_ids = tuple(deps)
+        if self.invalidated_since(dep_ids, epoch) or ttl + stale <= 0 or nbytes > self.max_bytes or self.max_entries <= 0:
+            return
+        self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, now + ttl + stale, value, dep_ids, nbytes)
+        self.bytes += nbytes
+        for dep in dep_ids:
+            self._by_dep.setdefault(dep, set()).add(key)
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            cache_metrics["l1_evictions"] += 1
+
+    def invalidated_since(self, dep_ids: Iterable[str], epoch: int) -> bool:
+        return epoch < self._floor or any(self._dep_epochs.get(dep, 0) > epoch for dep in dep_ids)
+
+    def invalidate(self, dep_ids: Iterable[str]) -> None:
+        self.epoch += 1
+        for dep in dep_ids:
+            self._dep_epochs[dep] = self.epoch
+            for key in self._by_dep.pop(dep, ()):
+                self._remove(key)
+        if len(self._dep_epochs) > L1_MAX_TRACKED_DEPS:
+            # forget the per-dep epochs; fills already running are dropped instead
+            self._dep_epochs.clear()
+            self._floor = self.epoch
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._floor = self.epoch
+        self._dep_epochs.clear()
+        self._entries.clear()
+        self._by_dep.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[4]
+        for dep in entry[3]:
+            keys = self._by_dep.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_dep[dep]
+
+
+l1_cache = L1Cache(settings.LINEAGE_L1_MAX_ENTRIES, settings.LINEAGE_L1_MAX_BYTES)
+
+# In-process single-flight: cache key -> running computation, and keys being
+# refreshed in the background (tasks are kept referenced until they finish).
+_inflight: dict[str, asyncio.Future] = {}
+_refreshing: dict[str, asyncio.Task] = {}
+
+
+def cache_stats() -> dict[str, Any]:
+    stats: dict[str, Any] = {"l1_entries": len(l1_cache), "l1_bytes": l1_cache.bytes}
+    for name in (
+        "l1_hit",
+        "l1_miss",
+        "l2_hit",
+        "l2_miss",
+        "l1_evictions",
+        "stale_served",
+        "coalesced",
+        "lock_waits",
+        "background_refreshes",
+        "decode_errors",
+    ):
+        stats[name] = cache_metrics[name]
+    stats["hits_by_prefix"] = dict(prefix_hits)
+    stats["payloads"] = {
+        prefix: {
+            **values,
+            "avg_stored_bytes": values["stored_bytes"] // values["writes"],
+            "compression_ratio": round(values["stored_bytes"] / values["raw_bytes"], 3) if values["raw_bytes"] else 1.0,
+        }
+        for prefix, values in payload_metrics.items()
+    }
+    return stats
+
+
+class LineageCache:
+    def __init__(self, redis: Redis | None, l1: L1Cache | None = None):
+        self.redis = redis
+        self.l1 = l1 if l1 is not None else l1_cache
+        self.stale = settings.LINEAGE_CACHE_STALE_SECONDS
+        self.lock_ms = settings.LINEAGE_CACHE_LOCK_MS
+        self._get_if_fresh = redis.register_script(_GET_IF_FRESH) if redis else None
+        self._release_lock = redis.register_script(_RELEASE_LOCK) if redis else None
+        self._bump = redis.register_script(_BUMP) if redis else None
+
+    @staticmethod
+    def key(prefix: str, params: dict[str, Any]) -> str:
+        packed = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(packed.encode("utf-8")).hexdigest()
+        return f"{prefix}:{digest}"
+
+    async def get(self, key: str, model: type[ModelT]) -> ModelT | None:
+        found = await self.lookup(key, model)
+        return found[0] if found else None
+
+    async def lookup(self, key: str, model: type[ModelT]) -> tuple[ModelT, bool] | None:
+        """Return ``(value, fresh)`` from L1 or L2, or None on a miss or stale generations."""
+        if not self.redis:
+            return None
+        found = self.l1.get(key)
+        if found is not None:
+            cache_metrics["l1_hit"] += 1
+            return found
+        cache_metrics["l1_miss"] += 1
+
+        epoch = self.l1.epoch
+        raw = await self._eval_undecoded(self._get_if_fresh, [key, f"{key}:deps"], [GEN_PREFIX])
+        if not raw:
+            cache_metrics["l2_miss"] += 1
+            return None
+        payload, pttl, deps = raw[0], raw[1], [d.decode("utf-8") for d in raw[2:]]
+        try:
+            value = model.model_validate(cache_codec.decode(payload))
+        except (cache_codec.CodecError, ValueError) as exc:
+            cache_metrics["decode_errors"] += 1
+            cache_metrics["l2_miss"] += 1
+            log.warning("lineage_cache_decode_failed", key=key, error=str(exc))
+            return None
+        cache_metrics["l2_hit"] += 1
+        remaining = max(pttl, 0) / 1000
+        fresh_for = max(remaining - self.stale, 0)
+        self.l1.put(key, value, fresh_for, remaining - fresh_for, deps, len(payload), epoch)
+        return value, fresh_for > 0
+
+    async def _eval_undecoded(self, script: Any, keys: list[str], args: list[Any]) -> Any:
+        """EVALSHA with the reply left as bytes (the shared client decodes to str)."""
+        options = {NEVER_DECODE: True}
+        try:
+            return await self.redis.execute_command("EVALSHA", script.sha, len(keys), *keys, *args, **options)
+        except NoScriptError:
+            script.sha = await self.redis.script_load(script.script)
+            return await self.redis.execute_command("EVALSHA", script.sha, len(keys), *keys, *args, **options)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        model: type[ModelT],
+        ttl: int | Callable[[ModelT], int],
+        compute: Callable[[], Awaitable[tuple[ModelT, Iterable[str]]]],
+        refresh: Callable[[], Awaitable[Any]] | None = None,
+    ) -> ModelT:
+        """Serve from cache, or compute once per key across concurrent callers.
+
+        ``compute`` returns the value together with the node ids it depends on;
+        ``refresh`` runs in the background when a stale entry is served; it must
+        not depend on request-scoped resources.
+        """
+        if not self.redis:
+            value, _ = await compute()
+            return value
+        found = await self.lookup(key, model)
+        if found is not None:
+            prefix_hits[key.rsplit(":", 1)[0]] += 1
+            value, fresh = found
+            if not fresh:
+                cache_metrics["stale_served"] += 1
+                if refresh is not None:
+                    self._schedule_refresh(key, refresh)
+            return value
+
+        future = _inflight.get(key)
+        if future is not None:
+            cache_metrics["coalesced"] += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self.fill(key, model, ttl, compute))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def fill(
+        self,
+        key: str,
+        model: type[ModelT],
+        ttl: int | Callable[[ModelT], int],
+        compute: Callable[[], Awaitable[tuple[ModelT, Iterable[str]]]],
+        wait: bool = True,
+    ) -> ModelT | None:
+        """Compute and store ``key`` under a short cross-worker lock.
+
+        If another worker holds the lock, wait (up to the lock timeout) for it to
+        publish a fresh value; with ``wait=False`` give up instead and return None.
+        """
+        lock_key = f"{key}:lock"
+        lock_id = uuid.uuid4().hex
+        token = await self.token()
+        locked = await self.redis.set(lock_key, lock_id, nx=True, px=self.lock_ms)
+        if not locked:
+            if not wait:
+                return None
+            cache_metrics["lock_waits"] += 1
+            deadline = time.monotonic() + self.lock_ms / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                found = await self.lookup(key, model)
+                if found is not None and found[1]:
+                    return found[0]
+                if not await self.redis.exists(lock_key):
+                    break
+            token = await self.token()
+        try:
+            value, deps = await compute()
+            await self.set(key, value, ttl(value) if callable(ttl) else ttl, deps, token)
+            return value
+        finally:
+            if locked:
+                await self._release_lock(keys=[lock_key], args=[lock_id])
+
+    def _schedule_refresh(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        if key in _refreshing:
+            return
+
+        async def run() -> None:
+            try:
+                cache_metrics["background_refreshes"] += 1
+                await refresh()
+            except Exception as exc:
+                log.warning("lineage_cache_refresh_failed", key=key, error=str(exc))
+            finally:
+                _refreshing.pop(key, None)
+
+        _refreshing[key] = asyncio.create_task(run())
+
+    async def token(self) -> tuple[int, int] | None:
+        """Write sequence (and L1 epoch) observed before computing a value that will be cached."""
+        if not self.redis:
+            return None
+        return await self.generation(), self.l1.epoch
+
+    async def generation(self) -> int:
+        """The current write sequence number."""
+        return int(await self.redis.get(GEN_PREFIX + ALL_GEN) or 0)
+
+    async def newer_than(self, deps: Iterable[str], seq: int) -> bool:
+        """Whether a write after sequence number ``seq`` touched one of ``deps``."""
+        dep_ids = [d for d in dict.fromkeys(deps) if d]
+        if not self.redis or not dep_ids:
+            return False
+        gens = await self.redis.mget([GEN_PREFIX + d for d in dep_ids])
+        return any(int(g or 0) > seq for g in gens)
+
+    async def set(
+        self,
+        key: str,
+        value: BaseModel,
+        ttl: int,
+        deps: Iterable[str],
+        token: tuple[int, int] | None,
+    ) -> None:
+        """Store ``value`` in both tiers with a generation snapshot of ``deps``.
+
+        If a lineage write touched one of ``deps`` since ``token`` was taken the
+        value may already be stale, so it is not cached.
+        """
+        if not self.redis:
+            return
+        dep_ids = [d for d in dict.fromkeys(deps) if d]
+        if not dep_ids:
+            return
+        gens = await self.redis.mget([GEN_PREFIX + d for d in dep_ids])
+        if token is not None and any(int(g or 0) > token[0] for g in gens):
+            log.debug("lineage_cache_skip_concurrent_write", key=key)
+            return
+        snapshot = {d: g or "0" for d, g in zip(dep_ids, gens)}
+        payload, raw_size = cache_codec.encode(value.model_dump(mode="json"))
+        _record_payload(key, raw_size, len(payload))
+        expires = ttl + self.stale
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, payload, ex=expires)
+            pipe.delete(f"{key}:deps")
+            pipe.hset(f"{key}:deps", mapping=snapshot)
+            pipe.expire(f"{key}:deps", expires)
+            await pipe.execute()
+        self.l1.put(key, value, ttl, self.stale, dep_ids, len(payload), token[1] if token else self.l1.epoch)
+
+    async def invalidate(self, node_ids: Iterable[str | None], edges: bool = False) -> None:
+        """Bump the generations of the touched nodes (plus ``@edges`` for topology changes)."""
+        touched = [str(n) for n in dict.fromkeys(n for n in node_ids if n)]
+        if edges:
+            touched.append(EDGES_GEN)
+        self.l1.invalidate(touched)
+        if not self.redis:
+            return
+        await self._bump(args=[GEN_PREFIX, *touched])
+        await self.redis.publish(INVALIDATION_CHANNEL, json.dumps(touched))
+
+
+async def listen_for_invalidations(redis: Redis, retry_delay: float = 1.0) -> None:
+    """Apply invalidations published by other workers to this process's L1.
+
+    Messages may be lost while disconnected, so L1 is cleared on every reconnect.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            l1_cache.clear()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    l1_cache.invalidate(json.loads(message["data"]))
+                except (TypeError, ValueError):
+                    log.warning("lineage_invalidation_malformed", data=message.get("data"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pragma: no cover - external service
+            log.warning("lineage_invalidation_listener_failed", error=str(exc))
+            l1_cache.clear()
+            await asyncio.sleep(retry_delay)
+        finally:
+            await pubsub.aclose()
@@ -1,23 +1,34 @@
+import asyncio
+import time
 import uuid
-import json
-import hashlib
-from collections import deque
-from typing import Any
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
 
 from fastapi import HTTPException, status
 from neo4j import AsyncDriver
+from neo4j.exceptions import DriverError, Neo4jError
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 
 from app.schemas.lineage import (
+    TableLineageCreateRequest,
+    FieldLineageCreateRequest,
+    LineageBatchItemResult,
+    LineageBatchResponse,
     FieldTraceResponse,
     FieldRef,
     TracePath,
     TracePathItem,
+    PathItem,
     PathsResponse,
+    ReachabilityResponse,
     CycleListResponse,
     ImpactAnalysisResponse,
     BlastRadiusResponse,
+    ChangeSetImpactedTable,
+    ChangeSetImpactResponse,
+    ChangeSetRootSummary,
     QualityCheckResponse,
     LineageGraphResponse,
     LineageGraphNode,
@@ -29,73 +40,269 @@ from app.schemas.lineage import (
     LineageRelationshipTransformation,
     LineageRelationshipMetadata,
 )
+from app.config import settings
+from app.core.cache import get_redis_client
+from app.db import SessionLocal
 from app.graph import queries
-from app.repositories.table_repo import TableRepository
+from app.graph.paths import WEIGHTS, edge_cost, k_shortest_paths
+from app.graph.projection import LineageProjection, lineage_projection
+from app.graph.traversal import mask_members, multi_source_bfs
+from app.services.criticality_index import mark_criticality_dirty
+from app.services.cycle_index import CycleIndex, cycle_metrics, mark_edges_added
+from app.services.graph_assembly import (
+    assemble,
+    build_edges,
+    build_nodes,
+    merge_graphs,
+    read_edge,
+    read_node,
+    within_depth,
+)
+from app.services.lineage_cache import EDGES_GEN, LineageCache, ModelT, prefix_hits
+from app.services.table_enrichment import TableEnrichmentCache
 from app.repositories.field_repo import FieldRepository
 import structlog
 
 
 log = structlog.get_logger(__name__)
 
+# stage -> {"count", "total_ms", "max_ms"} since process start; reported under /metrics
+stage_latency: dict[str, dict[str, float]] = {}
+
+
+def stage_stats() -> dict[str, dict[str, float]]:
+    return {
+        name: {**values, "avg_ms": round(values["total_ms"] / values["count"], 3)}
+        for name, values in sorted(stage_latency.items())
+    }
+
+
+GRAPH_TTL = 120
+
+# lineage graph builds: answered by cutting a cached deeper graph, by merging the
+# upstream and downstream graphs ("both"), or by a traversal; exact hits are
+# counted by the cache itself
+graph_cache_metrics: dict[str, int] = {"derived_hits": 0, "combined": 0, "misses": 0}
+
+
+def graph_cache_stats() -> dict[str, int]:
+    return {"exact_hits": prefix_hits["lineage:graph"], **graph_cache_metrics}
+
+
+# table: tables only; field: plus fields joined by field lineage; all: plus every column
+GRANULARITIES = ("table", "field", "all")
+GRAPH_QUERIES = {
+    "table": queries.GET_GRAPH_TABLES,
+    "field": queries.GET_GRAPH_FIELDS,
+    "all": queries.GET_GRAPH,
+}
+
 
 class LineageService:
-    def __init__(self, driver: AsyncDriver, db_session: AsyncSession | None = None, redis: Redis | None = None):
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        db_session: AsyncSession | None = None,
+        redis: Redis | None = None,
+        projection: LineageProjection | None = None,
+    ):
         self.driver = driver
         self.db_session = db_session
         self.redis = redis
+        self.projection = projection or lineage_projection
+        self.cache = LineageCache(redis)
+        self.enrichment = TableEnrichmentCache(redis)
+        # one dict per build in progress; a stage is added to all of them so nested builds roll up
+        self._timings: list[dict[str, float]] = []
+
+    # ---- stage timing ----
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for timings in self._timings:
+                timings[name] = timings.get(name, 0.0) + elapsed
+            totals = stage_latency.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] += elapsed
+            totals["max_ms"] = max(totals["max_ms"], elapsed)
+
+    async def _run_build(self, build: str, params: dict[str, Any]) -> Any:
+        """Run a cache builder and log how long each of its stages took."""
+        timings: dict[str, float] = {}
+        self._timings.append(timings)
+        try:
+            with self._stage(f"{build}.total"):
+                answers = self.projection.answers
+                value, deps = await getattr(self, build)(**params)
+                if self.projection.answers != answers and await self._projection_behind(deps):
+                    # another worker wrote to this part of the graph after the projection was
+                    # loaded; answer from Neo4j rather than cache what the projection says
+                    log.debug("lineage_projection_behind", build=build)
+                    service = LineageService(
+                        self.driver, db_session=self.db_session, redis=self.redis, projection=LineageProjection()
+                    )
+                    service._timings = self._timings
+                    value, deps = await getattr(service, build)(**params)
+                return value, deps
+        finally:
+            # by identity: a nested build's dict can compare equal to this one
+            del self._timings[next(i for i, t in enumerate(self._timings) if t is timings)]
+            log.debug("lineage_stages", build=build, **{k: round(v, 2) for k, v in timings.items()})
+
+    async def _projection_behind(self, deps: Iterable[str]) -> bool:
+        generation = self.projection.generation
+        return generation is not None and await self.cache.newer_than(deps, generation)
 
     # ---- cache helpers ----
     def _cache_key(self, prefix: str, params: dict[str, Any]) -> str:
-        packed = json.dumps(params, sort_keys=True, default=str)
-        digest = hashlib.sha1(packed.encode("utf-8")).hexdigest()
-        return f"{prefix}:{digest}"
-
-    async def _cache_get(self, key: str):
-        if not self.redis:
-            return None
-        return await self.redis.get(key)
+        return self.cache.key(prefix, params)
 
-    async def _cache_set(self, key: str, value: Any, ttl: int):
-        if not self.redis:
-            return
-        await self.redis.set(key, json.dumps(value, default=str), ex=ttl)
+    async def _cached(
+        self,
+        prefix: str,
+        params: dict[str, Any],
+        model: type[ModelT],
+        ttl: int | Callable[[ModelT], int],
+        build: str,
+    ) -> ModelT:
+        """Serve ``build(**params)`` through the cache with miss coalescing and stale-while-revalidate.
+
+        Builders return ``(response, deps)`` where deps are the node ids whose
+        generations guard the entry.
+        """
+        key = self._cache_key(prefix, params)
+        return await self.cache.get_or_compute(
+            key,
+            model,
+            ttl,
+            compute=lambda: self._run_build(build, params),
+            refresh=lambda: self._refresh(key, model, ttl, build, params),
+        )
 
-    async def _cache_flush_prefixes(self, prefixes: list[str]):
-        if not self.redis:
-            return
-        for prefix in prefixes:
-            async for k in self.redis.scan_iter(match=f"{prefix}*"):
-                await self.redis.delete(k)
+    async def _refresh(
+        self,
+        key: str,
+        model: type[ModelT],
+        ttl: int | Callable[[ModelT], int],
+        build: str,
+        params: dict[str, Any],
+    ) -> None:
+        # Runs after the request has finished, so it cannot borrow its session or redis client.
+        redis = get_redis_client()
+        try:
+            async with SessionLocal() as session:
+                service = LineageService(self.driver, db_session=session, redis=redis, projection=self.projection)
+                await service.cache.fill(
+                    key, model, ttl, lambda: service._run_build(build, params), wait=False
+                )
+        finally:
+            await redis.aclose()
 
     async def sync_table_node(self, table: dict[str, Any]) -> None:
-        async with self.driver.session() as session:
-            await session.run(
-                queries.CREATE_TABLE_NODE,
-                id=table["id"],
-                name=table["name"],
-                schema_name=table.get("schema_name"),
-                qualified_name=table.get("qualified_name"),
-                source_id=table.get("source_id"),
-            )
+        await self.apply_node_changes(table_upserts=[table])
 
     async def sync_field_node(self, field: dict[str, Any]) -> None:
-        async with self.driver.session() as session:
-            await session.run(
-                queries.CREATE_FIELD_NODE,
-                id=field["id"],
-                name=field["name"],
-                data_type=field.get("data_type"),
-                table_id=field.get("table_id"),
-            )
+        await self.apply_node_changes(field_upserts=[field])
 
     async def delete_table_node(self, table_id: str) -> None:
-        async with self.driver.session() as session:
-            await session.run(queries.DELETE_FIELDS_BY_TABLE, table_id=table_id)
-            await session.run(queries.DELETE_TABLE_NODE, id=table_id)
+        await self.apply_node_changes(table_deletes=[table_id])
 
     async def delete_field_node(self, field_id: str) -> None:
+        await self.apply_node_changes(field_deletes=[field_id])
+
+    async def apply_node_changes(
+        self,
+        table_upserts: list[dict[str, Any]] | None = None,
+        field_upserts: list[dict[str, Any]] | None = None,
+        field_deletes: list[str] | None = None,
+        table_deletes: list[str] | None = None,
+    ) -> None:
+        """Sync Table/Field nodes in one managed transaction (retried on transient errors).
+
+        Upserts run before deletes; the cache is invalidated once for everything touched.
+        """
+        table_rows = [
+            {
+                "id": t["id"],
+                "name": t["name"],
+                "schema_name": t.get("schema_name"),
+                "qualified_name": t.get("qualified_name"),
+                "source_id": t.get("source_id"),
+            }
+            for t in table_upserts or []
+        ]
+        field_rows = [
+            {"id": f["id"], "name": f["name"], "data_type": f.get("data_type"), "table_id": f.get("table_id")}
+            for f in field_upserts or []
+        ]
+        field_deletes = list(field_deletes or [])
+        table_deletes = list(table_deletes or [])
+
+        async def write(tx) -> tuple[list[str], list[str]]:
+            if table_rows:
+                await tx.run(queries.SYNC_TABLE_NODES, rows=table_rows)
+            if field_rows:
+                await tx.run(queries.SYNC_FIELD_NODES, rows=field_rows)
+            parents: list[str] = []
+            cascaded: list[str] = []
+            if field_deletes:
+                result = await tx.run(queries.DELETE_FIELD_NODES, ids=field_deletes)
+                record = await result.single()
+                parents = list(record["table_ids"] or []) if record else []
+            if table_deletes:
+                result = await tx.run(queries.DELETE_FIELDS_BY_TABLES, table_ids=table_deletes)
+                record = await result.single()
+                cascaded = list(record.get("field_ids") or []) if record else []
+                await tx.run(queries.DELETE_TABLE_NODES, ids=table_deletes)
+            return parents, cascaded
+
         async with self.driver.session() as session:
-            await session.run(queries.DELETE_FIELD_NODE, id=field_id)
+            deleted_field_parents, cascaded_fields = await session.execute_write(write)
+
+        for t in table_rows:
+            self.projection.upsert_table(t["id"], t["name"], t["source_id"])
+        for f in field_rows:
+            self.projection.upsert_field(f["id"], f["name"], f["table_id"])
+        for node_id in field_deletes + table_deletes:
+            self.projection.remove_node(node_id)
+
+        await self.enrichment.drop([t["id"] for t in table_rows] + table_deletes)
+        touched = [t["id"] for t in table_rows]
+        touched += [node for f in field_rows for node in (f["id"], f["table_id"])]
+        touched += field_deletes + deleted_field_parents + table_deletes
+        if field_deletes or table_deletes:
+            await self._update_cycle_index("nodes_removed", field_deletes + cascaded_fields + table_deletes)
+        await self.cache.invalidate(touched, edges=bool(field_deletes or table_deletes))
+
+    async def _update_cycle_index(self, method: str, arg: Any) -> None:
+        # Best effort: a failed update must not fail the lineage write; the periodic rebuild repairs it.
+        try:
+            await getattr(CycleIndex(self.driver, redis=self.redis), method)(arg)
+        except Exception as exc:
+            cycle_metrics["incremental_failures"] += 1
+            log.warning("lineage_cycle_index_update_failed", method=method, error=str(exc))
+
+    async def _queue_cycle_edges(self, pairs: list[tuple[str, str]]) -> None:
+        # Folded in by the background loop, off the write path; without Redis the periodic rebuild covers it.
+        if self.redis is None:
+            return
+        try:
+            await mark_edges_added(self.redis, pairs)
+        except Exception as exc:
+            log.warning("lineage_cycle_index_mark_failed", error=str(exc))
+
+    async def _mark_criticality_dirty(self, pairs: list[tuple[str, str]]) -> None:
+        # Also best effort: writes whose marker is lost are covered by the periodic full recompute.
+        if self.redis is None:
+            return
+        try:
+            await mark_criticality_dirty(self.redis, pairs)
+        except Exception as exc:
+            log.warning("table_criticality_mark_failed", error=str(exc))
 
     async def create_table_lineage(
         self,
@@ -119,7 +326,18 @@ class LineageService:
             record = await result.single()
             rel_id = record["rel_id"] if record else None
 
-        await self._cache_flush_prefixes(["lineage:", "blast:", "qc:", "paths:", "trace:"])
+        if rel_id is not None:
+            self.projection.add_edge(
+                rel_id,
+                source_table_id,
+                target_table_id,
+                "FEEDS_INTO",
+                lineage_source.value if isinstance(lineage_source, LineageSource) else lineage_source,
+                confidence,
+            )
+            await self._queue_cycle_edges([(source_table_id, target_table_id)])
+            await self._mark_criticality_dirty([(source_table_id, target_table_id)])
+        await self.cache.invalidate([source_table_id, target_table_id], edges=True)
         return LineageRelationship(
             id=str(rel_id) if rel_id is not None else str(uuid.uuid4()),
             source_node_id=source_table_id,
@@ -149,8 +367,21 @@ class LineageService:
             )
             record = await result.single()
             rel_id = record["rel_id"] if record else None
-
-        await self._cache_flush_prefixes(["lineage:", "blast:", "qc:", "paths:", "trace:"])
+            touched = [source_field_id, target_field_id]
+            if record:
+                touched += [record.get("source_table_id"), record.get("target_table_id")]
+
+        if rel_id is not None:
+            self.projection.add_edge(
+                rel_id,
+                source_field_id,
+                target_field_id,
+                "DERIVES_FROM",
+                lineage_source.value if isinstance(lineage_source, LineageSource) else lineage_source,
+                confidence,
+            )
+            await self._queue_cycle_edges([(source_field_id, target_field_id)])
+        await self.cache.invalidate(touched, edges=True)
         return LineageRelationship(
             id=str(rel_id) if rel_id is not None else str(uuid.uuid4()),
             source_node_id=source_field_id,
@@ -160,35 +391,252 @@ class LineageService:
             confidence=confidence,
         )
 
-    async def get_graph(self, table_id: str, depth: int = 3, direction: str = "downstream") -> LineageGraphResponse:
-        rel_filter = "FEEDS_INTO>"
-        if direction == "upstream":
-            rel_filter = "<FEEDS_INTO"
-        elif direction == "both":
-            rel_filter = "FEEDS_INTO>|<FEEDS_INTO"
+    async def create_table_lineage_batch(self, items: list[TableLineageCreateRequest]) -> LineageBatchResponse:
+        rows = [
+            {
+                "idx": idx,
+                "source_id": item.source_table_id,
+                "target_id": item.target_table_id,
+                "lineage_source": item.lineage_source.value,
+                "transformation_type": item.transformation_type,
+                "transformation_logic": item.transformation_logic,
+                "confidence": item.confidence,
+            }
+            for idx, item in enumerate(items)
+        ]
+        written, failed = await self._write_lineage_batch(queries.CREATE_TABLE_LINEAGE_BATCH, rows)
+
+        response = LineageBatchResponse()
+        touched: list[str] = []
+        for idx, item in enumerate(items):
+            record = written.get(idx)
+            if record is None:
+                response.results.append(
+                    LineageBatchItemResult(
+                        index=idx, status="error", error=failed.get(idx, "Source or target table not found")
+                    )
+                )
+                continue
+            self.projection.add_edge(
+                record["rel_id"],
+                item.source_table_id,
+                item.target_table_id,
+                "FEEDS_INTO",
+                item.lineage_source.value,
+                item.confidence,
+            )
+            touched += [item.source_table_id, item.target_table_id]
+            response.results.append(
+                LineageBatchItemResult(
+                    index=idx,
+                    status="created",
+                    relationship=LineageRelationship(
+                        id=str(record["rel_id"]),
+                        source_node_id=item.source_table_id,
+                        target_node_id=item.target_table_id,
+                        lineage_source=item.lineage_source,
+                        transformation_type=item.transformation_type,
+                        transformation_logic=item.transformation_logic,
+                        confidence=item.confidence,
+                    ),
+                )
+            )
+        return await self._finish_batch(response, touched, tables=True)
+
+    async def create_field_lineage_batch(self, items: list[FieldLineageCreateRequest]) -> LineageBatchResponse:
+        rows = [
+            {
+                "idx": idx,
+                "source_id": item.source_field_id,
+                "target_id": item.target_field_id,
+                "lineage_source": item.lineage_source.value,
+                "transformation_logic": item.transformation_logic,
+                "confidence": item.confidence,
+            }
+            for idx, item in enumerate(items)
+        ]
+        written, failed = await self._write_lineage_batch(queries.CREATE_FIELD_LINEAGE_BATCH, rows)
+
+        response = LineageBatchResponse()
+        touched: list[str] = []
+        for idx, item in enumerate(items):
+            record = written.get(idx)
+            if record is None:
+                response.results.append(
+                    LineageBatchItemResult(
+                        index=idx, status="error", error=failed.get(idx, "Source or target field not found")
+                    )
+                )
+                continue
+            self.projection.add_edge(
+                record["rel_id"],
+                item.source_field_id,
+                item.target_field_id,
+                "DERIVES_FROM",
+                item.lineage_source.value,
+                item.confidence,
+            )
+            touched += [
+                item.source_field_id,
+                item.target_field_id,
+                record.get("source_table_id"),
+                record.get("target_table_id"),
+            ]
+            response.results.append(
+                LineageBatchItemResult(
+                    index=idx,
+                    status="created",
+                    relationship=LineageRelationship(
+                        id=str(record["rel_id"]),
+                        source_node_id=item.source_field_id,
+                        target_node_id=item.target_field_id,
+                        lineage_source=item.lineage_source,
+                        transformation_logic=item.transformation_logic,
+                        confidence=item.confidence,
+                    ),
+                )
+            )
+        return await self._finish_batch(response, touched, tables=False)
+
+    async def _write_lineage_batch(
+        self, query: str, rows: list[dict[str, Any]]
+    ) -> tuple[dict[int, dict[str, Any]], dict[int, str]]:
+        """Write ``rows`` with UNWIND, one managed transaction per chunk.
+
+        Managed transactions are retried by the driver on transient errors; a chunk
+        that still fails marks its rows as failed without aborting the others.
+        Returns (idx -> written record, idx -> error message).
+        """
 
-        cache_key = self._cache_key("lineage:graph", {"table_id": table_id, "direction": direction, "depth": depth})
-        cached = await self._cache_get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return LineageGraphResponse(**data)
+        async def write_chunk(tx, chunk: list[dict[str, Any]]) -> list[dict[str, Any]]:
+            result = await tx.run(query, rows=chunk)
+            return [dict(record) async for record in result]
 
+        written: dict[int, dict[str, Any]] = {}
+        failed: dict[int, str] = {}
+        size = settings.LINEAGE_BATCH_CHUNK_SIZE
         async with self.driver.session() as session:
-            result = await session.run(queries.GET_GRAPH, table_id=table_id, depth=depth, rel_filter=rel_filter)
-            record = await result.single()
-            if record is None:
-                graph = await self._root_only_graph(table_id)
-            else:
-                graph = await self._to_graph(record)
+            for start in range(0, len(rows), size):
+                chunk = rows[start : start + size]
+                try:
+                    records = await session.execute_write(write_chunk, chunk)
+                except (Neo4jError, DriverError) as exc:
+                    log.warning("lineage_batch_chunk_failed", start=start, size=len(chunk), error=str(exc))
+                    failed.update({row["idx"]: f"Lineage write failed: {exc}" for row in chunk})
+                    continue
+                for record in records:
+                    written[record["idx"]] = record
+        return written, failed
+
+    async def _finish_batch(
+        self, response: LineageBatchResponse, touched: list[str], tables: bool
+    ) -> LineageBatchResponse:
+        response.created = sum(1 for r in response.results if r.status == "created")
+        response.failed = len(response.results) - response.created
+        pairs = [
+            (r.relationship.source_node_id, r.relationship.target_node_id)
+            for r in response.results
+            if r.relationship is not None
+        ]
+        if pairs:
+            await self._queue_cycle_edges(pairs)
+            if tables:  # criticality is table-level; field edges do not change it
+                await self._mark_criticality_dirty(pairs)
+        if touched:
+            await self.cache.invalidate(touched, edges=True)
+        return response
 
-        await self._cache_set(cache_key, graph.model_dump(), ttl=120)
-        return graph
+    async def get_graph(
+        self,
+        table_id: str,
+        depth: int = 3,
+        direction: str = "downstream",
+        granularity: str = "field",
+    ) -> LineageGraphResponse:
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"granularity must be one of {', '.join(GRANULARITIES)}",
+            )
+        return await self._cached(
+            "lineage:graph",
+            {"table_id": table_id, "direction": direction, "depth": depth, "granularity": granularity},
+            LineageGraphResponse,
+            ttl=GRAPH_TTL,
+            build="_build_graph",
+        )
+
+    async def _build_graph(
+        self, table_id: str, depth: int, direction: str, granularity: str
+    ) -> tuple[LineageGraphResponse, list]:
+        if direction == "both":
+            # the union of the upstream and downstream graphs, each served through the cache
+            parts = [await self.get_graph(table_id, depth, d, granularity) for d in ("upstream", "downstream")]
+            graph = merge_graphs(table_id, parts)
+            graph_cache_metrics["combined"] += 1
+            return graph, [table_id] + [n.id for n in graph.nodes if n.type == "table"]
+        if direction != "upstream":
+            direction = "downstream"
+
+        graph = await self._derive_graph(table_id, depth, direction, granularity)
+        if graph is not None:
+            graph_cache_metrics["derived_hits"] += 1
+        else:
+            graph_cache_metrics["misses"] += 1
+            rel_filter = "<FEEDS_INTO" if direction == "upstream" else "FEEDS_INTO>"
+            if self.projection.has_table(table_id):
+                with self._stage("graph.projection"):
+                    record = self.projection.graph_record(table_id, direction, depth, granularity)
+            else:
+                with self._stage("graph.neo4j"):
+                    async with self.driver.session() as session:
+                        result = await session.run(
+                            GRAPH_QUERIES[granularity], table_id=table_id, depth=depth, rel_filter=rel_filter
+                        )
+                        record = await result.single()
+            # the Neo4j session is back in the pool before Postgres enrichment starts
+            with self._stage("graph.assemble"):
+                if record is None:
+                    graph = await self._root_only_graph(table_id)
+                else:
+                    graph = await self._to_enriched_graph(record, direction)
+        await self._index_graph_depth(table_id, depth, direction, granularity)
+        return graph, [table_id] + [n.id for n in graph.nodes if n.type == "table"]
+
+    @staticmethod
+    def _depth_index_key(table_id: str, direction: str, granularity: str) -> str:
+        return f"lineage:graph:depths:{table_id}:{direction}:{granularity}"
+
+    async def _index_graph_depth(self, table_id: str, depth: int, direction: str, granularity: str) -> None:
+        """Record that a graph of this depth is being cached, so shallower requests can find it."""
+        if self.redis is None:
+            return
+        index = self._depth_index_key(table_id, direction, granularity)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(index, {str(depth): depth})
+            pipe.expire(index, GRAPH_TTL + settings.LINEAGE_CACHE_STALE_SECONDS)
+            await pipe.execute()
+
+    async def _derive_graph(
+        self, table_id: str, depth: int, direction: str, granularity: str
+    ) -> LineageGraphResponse | None:
+        """Cut the shallowest fresh cached deeper graph of the same root and direction down to ``depth``."""
+        if self.redis is None:
+            return None
+        with self._stage("graph.derive"):
+            index = self._depth_index_key(table_id, direction, granularity)
+            for cached_depth in await self.redis.zrangebyscore(index, depth + 1, "+inf"):
+                params = {"table_id": table_id, "direction": direction, "depth": int(cached_depth), "granularity": granularity}
+                found = await self.cache.lookup(self._cache_key("lineage:graph", params), LineageGraphResponse)
+                if found is not None and found[1]:
+                    return within_depth(found[0], direction, depth, granularity)
+        return None
 
     async def get_upstream(self, table_id: str, depth: int, granularity: str = "table") -> LineageGraphResponse:
-        return await self.get_graph(table_id, depth=depth, direction="upstream")
+        return await self.get_graph(table_id, depth=depth, direction="upstream", granularity=granularity)
 
     async def get_downstream(self, table_id: str, depth: int, granularity: str = "table") -> LineageGraphResponse:
-        return await self.get_graph(table_id, depth=depth, direction="downstream")
+        return await self.get_graph(table_id, depth=depth, direction="downstream", granularity=granularity)
 
     async def delete_lineage(self, rel_id: str) -> None:
         try:
@@ -204,7 +652,13 @@ class LineageService:
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Lineage relationship not found",
                 )
-        await self._cache_flush_prefixes(["lineage:", "blast:", "qc:", "paths:", "trace:"])
+        self.projection.remove_edge(rel_int)
+        touched = record.get("touched") or []
+        if len(touched) >= 2:
+            await self._update_cycle_index("edges_removed", [(touched[0], touched[1])])
+            if record.get("rel_type") == "FEEDS_INTO":
+                await self._mark_criticality_dirty([(touched[0], touched[1])])
+        await self.cache.invalidate(touched, edges=True)
 
     async def get_relationship_detail(self, rel_id: str) -> LineageRelationshipDetail:
         try:
@@ -269,38 +723,55 @@ class LineageService:
         if not self.db_session:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB session required")
 
-        cache_key = self._cache_key("trace", {"field_id": field_id, "direction": direction, "depth": depth})
-        cached = await self._cache_get(cache_key)
-        if cached:
-            return FieldTraceResponse(**json.loads(cached))
+        return await self._cached(
+            "trace",
+            {"field_id": field_id, "direction": direction, "depth": depth},
+            FieldTraceResponse,
+            ttl=120,
+            build="_build_trace",
+        )
 
+    async def _build_trace(self, field_id: str, direction: str, depth: int) -> tuple[FieldTraceResponse, list]:
         field_repo = FieldRepository(self.db_session)
-        table_repo = TableRepository(self.db_session)
 
-        base_field = await field_repo.get(field_id)
+        cap = settings.LINEAGE_TRACE_MAX_RESULTS
+
+        async def fetch_field():
+            with self._stage("trace.field"):
+                return await field_repo.get(field_id)
+
+        async def fetch_trace():
+            with self._stage("trace.neo4j"):
+                async with self.driver.session() as session:
+                    result = await session.run(
+                        queries.TRACE_FIELD,
+                        field_id=field_id,
+                        depth=depth,
+                        upstream=direction in ("upstream", "both"),
+                        downstream=direction in ("downstream", "both"),
+                        limit=cap + 1,  # one extra to tell a full result from a truncated one
+                    )
+                    return await result.single()
+
+        # the field lookup (Postgres) and the traversal (Neo4j) are independent
+        base_field, record = await asyncio.gather(fetch_field(), fetch_trace())
         if not base_field:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Field not found")
 
-        async with self.driver.session() as session:
-            upstream_records = []
-            downstream_records = []
-            if direction in ("upstream", "both"):
-                upstream_cursor = await session.run(
-                    queries.TRACE_FIELD_UPSTREAM, field_id=field_id, depth=depth
-                )
-                upstream_records = [dict(record) async for record in upstream_cursor]
-            if direction in ("downstream", "both"):
-                downstream_cursor = await session.run(
-                    queries.TRACE_FIELD_DOWNSTREAM, field_id=field_id, depth=depth
-                )
-                downstream_records = [dict(record) async for record in downstream_cursor]
+        upstream_records = list(record["upstream"] or []) if record else []
+        downstream_records = list(record["downstream"] or []) if record else []
+        truncated = len(upstream_records) > cap or len(downstream_records) > cap
+        # BFS order is by distance, so the cut keeps the nearest fields
+        upstream_records = upstream_records[:cap]
+        downstream_records = downstream_records[:cap]
 
         table_ids = {base_field.table_id}
         for rec in upstream_records + downstream_records:
             if rec.get("table_id"):
                 table_ids.add(uuid.UUID(str(rec["table_id"])))
 
-        table_map = await table_repo.get_tables_with_primary_tags(list(table_ids))
+        with self._stage("trace.enrich"):
+            table_map = await self.enrichment.get_many(self.db_session, table_ids)
 
         def to_item(rec: dict) -> TracePathItem:
             tbl = table_map.get(str(rec.get("table_id"))) or {}
@@ -310,6 +781,7 @@ class LineageService:
                 field_id=str(rec.get("field_id")),
                 field_name=rec.get("field_name"),
                 distance=int(rec.get("distance", 0)),
+                via_field_id=str(rec["via"]) if rec.get("via") else None,
                 primary_tag_path=(tbl.get("primary_tag") or {}).get("path"),
                 source_name=tbl.get("source_name"),
             )
@@ -336,9 +808,9 @@ class LineageService:
             trace_path=TracePath(upstream=upstream_items, downstream=downstream_items),
             involved_tables=involved_tables,
             involved_fields=involved_fields,
+            truncated=truncated,
         )
-        await self._cache_set(cache_key, response.model_dump(), ttl=120)
-        return response
+        return response, [field_id] + involved_fields + involved_tables
 
     async def find_paths(
         self,
@@ -346,99 +818,187 @@ class LineageService:
         end_id: str,
         max_depth: int = 20,
         shortest_only: bool = False,
+        limit: int | None = None,
+        weight: str = "hops",
     ) -> PathsResponse:
-        cache_key = self._cache_key(
-            "paths", {"start_id": start_id, "end_id": end_id, "max_depth": max_depth, "shortest_only": shortest_only}
+        limit = self._path_limit(limit, shortest_only, weight)
+        return await self._cached(
+            "paths",
+            {"start_id": start_id, "end_id": end_id, "max_depth": max_depth, "limit": limit, "weight": weight},
+            PathsResponse,
+            # partial results from a timed-out search are only kept briefly
+            ttl=lambda r: 15 if r.truncated == "timeout" else 120,
+            build="_build_paths",
         )
-        cached = await self._cache_get(cache_key)
-        if cached:
-            return PathsResponse(**json.loads(cached))
 
-        async with self.driver.session() as session:
-            query = queries.SHORTEST_PATHS if shortest_only else queries.ALL_PATHS
-            result = await session.run(query, start_id=start_id, end_id=end_id, max_depth=max_depth)
-            paths = []
-            nodes_seen = {}
-            edges_seen = {}
-            async for record in result:
-                path = record["path"]
-                if not path:
-                    continue
-                nodes_in_path = list(path.nodes)
-                rels_in_path = list(path.relationships)
-                paths.append(
-                    {"path": [n["id"] for n in nodes_in_path if "id" in n], "length": len(nodes_in_path) - 1}
-                )
-                for idx, n in enumerate(nodes_in_path):
-                    nid = n.get("id")
-                    if nid and nid not in nodes_seen:
-                        # Preserve labels for type detection and attach distance from start
-                        props = dict(n)
-                        props["labels"] = list(getattr(n, "labels", []))
-                        props["distance"] = idx
-                        props.setdefault("id", nid)
-                        nodes_seen[nid] = props
-                for r in rels_in_path:
-                    rid = str(r.id)
-                    if rid not in edges_seen:
-                        edges_seen[rid] = {
-                            "id": rid,
-                            "from": r.start_node["id"],
-                            "to": r.end_node["id"],
-                            "lineage_source": r.get("lineage_source"),
-                            "confidence": r.get("confidence"),
-                            "rel_type": type(r).__name__ if hasattr(r, "__class__") else None,
-                        }
+    async def is_reachable(self, from_id: str, to_id: str) -> ReachabilityResponse:
+        """Whether ``to_id`` is downstream of ``from_id`` (a node reaches itself)."""
+        reachable = self.projection.reachable(from_id, to_id)
+        if reachable is not None:
+            return ReachabilityResponse(from_id=from_id, to_id=to_id, reachable=reachable, index="projection")
+        if from_id == to_id:
+            reachable = True
+        else:
+            async with self.driver.session() as session:
+                result = await session.run(queries.REACHABLE, from_id=from_id, to_id=to_id)
+                reachable = await result.single() is not None
+        return ReachabilityResponse(from_id=from_id, to_id=to_id, reachable=reachable, index="neo4j")
+
+    @staticmethod
+    def _path_limit(limit: int | None, shortest_only: bool, weight: str) -> int:
+        if weight not in WEIGHTS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"weight must be one of {', '.join(WEIGHTS)}",
+            )
+        if shortest_only:
+            return 1
+        return max(1, min(limit or settings.LINEAGE_PATHS_DEFAULT_LIMIT, settings.LINEAGE_PATHS_MAX_LIMIT))
+
+    async def _build_paths(
+        self, start_id: str, end_id: str, max_depth: int, limit: int, weight: str
+    ) -> tuple[PathsResponse, list]:
+        response = PathsResponse()
+        nodes_seen: dict[str, dict[str, Any]] = {}
+        edges_seen: dict[str, dict[str, Any]] = {}
+        async for path, new_nodes, new_edges, truncated in self._search_paths(start_id, end_id, max_depth, limit, weight):
+            if path is not None:
+                response.paths.append(path)
+                nodes_seen.update((n["id"], n) for n in new_nodes)
+                edges_seen.update((e["id"], e) for e in new_edges)
+            response.truncated = truncated
+
+        response.nodes = await self._convert_nodes(list(nodes_seen.values()))
+        response.edges = self._convert_edges(list(edges_seen.values()))
+        return response, [EDGES_GEN, start_id, end_id] + list(nodes_seen)
+
+    def stream_paths(
+        self,
+        start_id: str,
+        end_id: str,
+        max_depth: int = 20,
+        shortest_only: bool = False,
+        limit: int | None = None,
+        weight: str = "hops",
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield ``path`` events as soon as each path is found, then a final ``done`` event.
+
+        Parameters are validated here, before the first event, so errors still
+        surface as HTTP errors. Each path event carries only the nodes and edges
+        not sent before.
+        """
+        limit = self._path_limit(limit, shortest_only, weight)
+        return self._path_events(start_id, end_id, max_depth, limit, weight)
+
+    async def _path_events(
+        self, start_id: str, end_id: str, max_depth: int, limit: int, weight: str
+    ) -> AsyncIterator[dict[str, Any]]:
+        count = 0
+        async for path, new_nodes, new_edges, truncated in self._search_paths(start_id, end_id, max_depth, limit, weight):
+            if path is None:
+                yield {"type": "done", "count": count, "truncated": truncated}
+                return
+            count += 1
+            nodes = await self._convert_nodes(new_nodes)
+            yield {
+                "type": "path",
+                "rank": count,
+                "path": path.model_dump(),
+                "nodes": [n.model_dump(by_alias=True) for n in nodes],
+                "edges": [e.model_dump(by_alias=True) for e in self._convert_edges(new_edges)],
+            }
 
-        nodes = await self._convert_nodes(list(nodes_seen.values()))
-        edges = self._convert_edges(list(edges_seen.values()))
-        response = PathsResponse(
-            nodes=nodes,
-            edges=edges,
-            paths=[{"path": p["path"], "length": p.get("length")} for p in paths],
-        )
-        await self._cache_set(cache_key, response.model_dump(), ttl=120)
-        return response
+    async def _search_paths(
+        self, start_id: str, end_id: str, max_depth: int, limit: int, weight: str
+    ) -> AsyncIterator[tuple[PathItem | None, list[dict[str, Any]], list[dict[str, Any]], str | None]]:
+        """Run the bounded k-shortest search; yields (path, new nodes, new edges, truncated).
+
+        The last item always has ``path=None`` and the final truncation reason.
+        """
+        if self.projection.reachable(start_id, end_id) is False:
+            # no path at any depth: skip the subgraph fetch and the search
+            yield None, [], [], None
+            return
+        record = self.projection.between(start_id, end_id, max_depth)
+        if record is None:
+            async with self.driver.session() as session:
+                result = await session.run(queries.PATH_SUBGRAPH, start_id=start_id, end_id=end_id, max_depth=max_depth)
+                record = await result.single()
+        nodes = {n["id"]: dict(n) for n in (record or {}).get("nodes") or [] if n.get("id")}
+        edges = {str(r["id"]): {**r, "id": str(r["id"])} for r in (record or {}).get("rels") or []}
+        adj: dict[str, list[tuple[str, Any, float]]] = {}
+        for edge_id, edge in edges.items():
+            adj.setdefault(edge["from"], []).append((edge["to"], edge_id, edge_cost(edge.get("confidence"), weight)))
+
+        deadline = time.monotonic() + settings.LINEAGE_PATHS_TIMEOUT_MS / 1000
+        sent_nodes: set[str] = set()
+        sent_edges: set[str] = set()
+        found = 0
+        truncated = None
+        # one path beyond the limit tells us whether the limit actually cut results off
+        for path in k_shortest_paths(start_id, end_id, adj, limit + 1, max_depth, deadline):
+            if found == limit:
+                truncated = "limit"
+                break
+            found += 1
+            new_nodes = []
+            for distance, node_id in enumerate(path.nodes):
+                if node_id not in sent_nodes and node_id in nodes:
+                    sent_nodes.add(node_id)
+                    new_nodes.append({**nodes[node_id], "distance": distance})
+            new_edges = [edges[e] for e in path.edges if e not in sent_edges]
+            sent_edges.update(path.edges)
+            item = PathItem(path=list(path.nodes), length=len(path.edges), cost=path.cost, edge_ids=list(path.edges))
+            yield item, new_nodes, new_edges, None
+            await asyncio.sleep(0)
+        if truncated is None and time.monotonic() > deadline:
+            truncated = "timeout"
+        yield None, [], [], truncated
 
     async def find_cycles(self, table_id: str | None = None, max_depth: int = 10) -> CycleListResponse:
-        cache_key = self._cache_key("qc:cycles", {"table_id": table_id, "max_depth": max_depth})
-        cached = await self._cache_get(cache_key)
-        if cached:
-            return CycleListResponse(**json.loads(cached))
+        return await self._cached(
+            "qc:cycles",
+            {"table_id": table_id, "max_depth": max_depth},
+            CycleListResponse,
+            ttl=60,
+            build="_build_cycles",
+        )
 
-        async with self.driver.session() as session:
-            result = await session.run(queries.CYCLES_BY_TABLE, table_id=table_id, max_depth=max_depth)
-            cycles = []
-            nodes_seen = {}
-            edges_seen = {}
-            async for record in result:
-                path = record["path"]
-                if not path:
-                    continue
-                nodes_in_path = list(path.nodes)
-                rels_in_path = list(path.relationships)
-                cycles.append([n["id"] for n in nodes_in_path if "id" in n])
-                for n in nodes_in_path:
-                    nid = n.get("id")
-                    if nid and nid not in nodes_seen:
-                        nodes_seen[nid] = n
-                for r in rels_in_path:
-                    rid = str(r.id)
-                    if rid not in edges_seen:
-                        edges_seen[rid] = {
-                            "id": rid,
-                            "from": r.start_node["id"],
-                            "to": r.end_node["id"],
-                            "lineage_source": r.get("lineage_source"),
-                            "confidence": r.get("confidence"),
-                            "rel_type": type(r).__name__ if hasattr(r, "__class__") else None,
-                        }
+    async def _build_cycles(self, table_id: str | None, max_depth: int) -> tuple[CycleListResponse, list]:
+        index = CycleIndex(self.driver)
+        if table_id:
+            component = await index.component_for(table_id, session=self.db_session)
+            components = [component] if component else []
+        else:
+            components = await index.components(node_type="table", session=self.db_session)
+
+        cycles: list[list[str]] = []
+        nodes_seen: dict[str, dict[str, Any]] = {}
+        edges_seen: dict[str, dict[str, Any]] = {}
+        for component in components:
+            for cycle in self._select_cycles(component, table_id, max_depth):
+                cycles.append([n["id"] for n in cycle["nodes"]])
+                nodes_seen.update((n["id"], n) for n in cycle["nodes"])
+                edges_seen.update((e["id"], e) for e in cycle["edges"])
 
         nodes = await self._convert_nodes(list(nodes_seen.values()))
         edges = self._convert_edges(list(edges_seen.values()))
         response = CycleListResponse(cycles=cycles, nodes=nodes, edges=edges)
-        await self._cache_set(cache_key, response.model_dump(), ttl=60)
-        return response
+        return response, [EDGES_GEN, table_id] + [n.id for n in nodes]
+
+    @staticmethod
+    def _select_cycles(component, node_id: str | None, max_depth: int) -> list[dict[str, Any]]:
+        """Stored cycles of ``component``, preferring those through ``node_id`` and within ``max_depth`` hops.
+
+        Membership is authoritative, so when no stored cycle passes the filters the
+        component's representatives are returned unfiltered rather than nothing.
+        """
+        cycles = sorted(component.cycles or [], key=lambda c: len(c["nodes"]))
+        if node_id:
+            through = [c for c in cycles if any(n["id"] == node_id for n in c["nodes"])]
+            cycles = through or cycles
+        bounded = [c for c in cycles if len(c["nodes"]) <= max_depth]
+        return bounded or cycles
 
     async def impact_analysis(self, node_id: str, direction: str = "downstream", depth: int = 5) -> ImpactAnalysisResponse:
         # reuse get_graph with direction; gather impacted nodes list
@@ -472,15 +1032,19 @@ class LineageService:
         depth: int = 5,
         granularity: str = "table",
     ):
-        cache_key = self._cache_key(
-            "blast", {"table_id": table_id, "direction": direction, "depth": depth, "granularity": granularity}
+        return await self._cached(
+            "blast",
+            {"table_id": table_id, "direction": direction, "depth": depth, "granularity": granularity},
+            BlastRadiusResponse,
+            ttl=120,
+            build="_build_blast_radius",
         )
-        cached = await self._cache_get(cache_key)
-        if cached:
-            return BlastRadiusResponse(**json.loads(cached))
 
-        # Get graph in the desired direction/depth
-        graph = await self.get_graph(table_id=table_id, depth=depth, direction=direction)
+    async def _build_blast_radius(
+        self, table_id: str, direction: str, depth: int, granularity: str
+    ) -> tuple[BlastRadiusResponse, list]:
+        # Get graph in the desired direction/depth; fields only matter for field granularity
+        graph = await self.get_graph(table_id=table_id, depth=depth, direction=direction, granularity=granularity)
 
         # Deduplicate tables/fields and capture min distance
         table_nodes = [n for n in graph.nodes if n.type == "table" and str(n.id) != graph.root_id]
@@ -501,14 +1065,43 @@ class LineageService:
         total_fields = len(field_distance)
         max_depth_reached = max(table_distance.values()) if table_distance else 0
 
-        def severity_for(count: int) -> str:
-            if count >= 10:
-                return "high"
-            if count >= 5:
-                return "medium"
-            return "low"
+        groups_out = self._domain_groups(table_nodes)
 
-        # Group by primary_tag
+        # Build depth map (hop -> table count)
+        depth_map: dict[int, int] = {}
+        for dist in table_distance.values():
+            if dist <= 0:
+                continue
+            depth_map[dist] = depth_map.get(dist, 0) + 1
+
+        overall_sev = self._severity_for(total_tables)
+
+        response = BlastRadiusResponse(
+            root_id=table_id,
+            direction=direction,
+            depth=depth,
+            granularity=granularity,
+            total_impacted_tables=total_tables,
+            total_impacted_fields=total_fields if granularity == "field" else 0,
+            total_impacted_domains=len(groups_out),
+            max_depth_reached=max_depth_reached,
+            severity_level=overall_sev,
+            domain_groups=groups_out,
+            depth_map=depth_map,
+        )
+        return response, [table_id] + [n.id for n in graph.nodes if n.type == "table"]
+
+    @staticmethod
+    def _severity_for(count: int) -> str:
+        if count >= 10:
+            return "high"
+        if count >= 5:
+            return "medium"
+        return "low"
+
+    @classmethod
+    def _domain_groups(cls, table_nodes: list[LineageGraphNode]) -> list[dict[str, Any]]:
+        """Group impacted tables by primary tag; untagged tables form one group each."""
         domain_groups: dict[str, dict] = {}
         for n in table_nodes:
             pid = None
@@ -528,18 +1121,10 @@ class LineageService:
                 }
             domain_groups[key]["tables"].append({"id": str(n.id), "name": n.label, "distance": n.distance})
 
-        # Build depth map (hop -> table count)
-        depth_map: dict[int, int] = {}
-        for dist in table_distance.values():
-            if dist <= 0:
-                continue
-            depth_map[dist] = depth_map.get(dist, 0) + 1
-
         groups_out = []
         for g in domain_groups.values():
             tables = g["tables"]
             count = len(tables)
-            sev = severity_for(count)
             # sort sample by distance then name
             tables_sorted = sorted(tables, key=lambda t: (t.get("distance") or 0, t.get("name") or ""))[:5]
             groups_out.append(
@@ -548,56 +1133,119 @@ class LineageService:
                     "tag_name": g["tag_name"],
                     "tag_path": g["tag_path"],
                     "table_count": count,
-                    "severity": sev,
+                    "severity": cls._severity_for(count),
                     "sample_tables": tables_sorted,
                 }
             )
 
         # Sort groups: severity high>medium>low, then table_count desc
         sev_order = {"high": 0, "medium": 1, "low": 2}
-        groups_out = sorted(groups_out, key=lambda g: (sev_order.get(g["severity"], 3), -g["table_count"]))
+        return sorted(groups_out, key=lambda g: (sev_order.get(g["severity"], 3), -g["table_count"]))
+
+    async def change_set_impact(self, root_ids: list[str], direction: str = "downstream", depth: int = 5):
+        """Union blast radius of a set of tables changed together, from one multi-source traversal."""
+        roots = sorted({str(r) for r in root_ids})
+        return await self._cached(
+            "blast:batch",
+            {"root_ids": roots, "direction": direction, "depth": depth},
+            ChangeSetImpactResponse,
+            ttl=120,
+            build="_build_change_set_impact",
+        )
 
-        overall_sev = severity_for(total_tables)
+    async def _build_change_set_impact(
+        self, root_ids: list[str], direction: str, depth: int
+    ) -> tuple[ChangeSetImpactResponse, list]:
+        with self._stage("change_set.traverse"):
+            hits = self.projection.multi_source(root_ids, direction, depth)
+            if hits is None:
+                hits = await self._change_set_from_neo4j(root_ids, direction, depth)
+
+        root_set = set(root_ids)
+        impacted = {node_id: hit for node_id, hit in hits.items() if node_id not in root_set}
+        raw_nodes = [{**node, "distance": dist} for node, dist, _, _ in impacted.values()]
+        table_nodes = [n for n in await self._convert_nodes(raw_nodes) if n.type == "table"]
+
+        per_root = {root_id: [0, 0] for root_id in root_ids}  # impacted, exclusive
+        items = []
+        for n in table_nodes:
+            _, dist, mask, nearest = impacted[str(n.id)]
+            roots = mask_members(mask, root_ids)
+            for root_id in roots:
+                per_root[root_id][0] += 1
+                if len(roots) == 1:
+                    per_root[root_id][1] += 1
+            items.append(
+                ChangeSetImpactedTable(
+                    id=str(n.id),
+                    name=n.label,
+                    distance=dist,
+                    roots=roots,
+                    nearest_root=mask_members(nearest, root_ids)[0],
+                    primary_tag=n.primary_tag,
+                    source_name=n.source_name,
+                )
+            )
+        items.sort(key=lambda t: (t.distance, t.name or "", t.id))
 
-        response = BlastRadiusResponse(
-            root_id=table_id,
+        depth_map: dict[int, int] = {}
+        for item in items:
+            depth_map[item.distance] = depth_map.get(item.distance, 0) + 1
+        groups_out = self._domain_groups(table_nodes)
+
+        response = ChangeSetImpactResponse(
+            root_ids=root_ids,
             direction=direction,
             depth=depth,
-            granularity=granularity,
-            total_impacted_tables=total_tables,
-            total_impacted_fields=total_fields if granularity == "field" else 0,
+            missing_roots=[r for r in root_ids if r not in hits],
+            total_impacted_tables=len(items),
             total_impacted_domains=len(groups_out),
-            max_depth_reached=max_depth_reached,
-            severity_level=overall_sev,
+            max_depth_reached=max(depth_map) if depth_map else 0,
+            severity_level=self._severity_for(len(items)),
+            impacted=items,
+            per_root=[
+                ChangeSetRootSummary(root_id=r, impacted_tables=counts[0], exclusive_tables=counts[1])
+                for r, counts in per_root.items()
+            ],
             domain_groups=groups_out,
             depth_map=depth_map,
         )
-        await self._cache_set(cache_key, response.model_dump(), ttl=120)
-        return response
+        return response, list(root_ids) + list(impacted)
+
+    async def _change_set_from_neo4j(
+        self, root_ids: list[str], direction: str, depth: int
+    ) -> dict[str, tuple[dict[str, Any], int, int, int]]:
+        """Fetch the union neighbourhood once and run the same multi-source BFS over it."""
+        rel_filter = "FEEDS_INTO>" if direction == "downstream" else "<FEEDS_INTO"
+        async with self.driver.session() as session:
+            result = await session.run(
+                queries.CHANGE_SET_SUBGRAPH, root_ids=root_ids, rel_filter=rel_filter, depth=depth
+            )
+            record = await result.single()
+        if record is None:
+            return {}
+        info = {n["id"]: dict(n) for n in record["nodes"] or [] if n.get("id")}
+        adj: dict[str, list[str]] = defaultdict(list)
+        for rel in record["rels"] or []:
+            src, dst = (rel["from"], rel["to"]) if direction == "downstream" else (rel["to"], rel["from"])
+            adj[src].append(dst)
+        hits = multi_source_bfs(root_ids, lambda u: adj.get(u, ()), depth)
+        return {node_id: (info[node_id], *hit) for node_id, hit in hits.items() if node_id in info}
 
     async def quality_check(self, table_id: str, max_depth: int = 10):
-        cache_key = self._cache_key("qc", {"table_id": table_id, "max_depth": max_depth})
-        cached = await self._cache_get(cache_key)
-        if cached:
-            return QualityCheckResponse(**json.loads(cached))
+        return await self._cached(
+            "qc",
+            {"table_id": table_id, "max_depth": max_depth},
+            QualityCheckResponse,
+            ttl=lambda qc: 60 if qc.has_cycles else 30,
+            build="_build_quality_check",
+        )
 
-        async with self.driver.session() as session:
-            result = await session.run(queries.QUALITY_CHECK_CYCLES, table_id=table_id, max_depth=max_depth)
-            paths_raw: list[list[str]] = []
-            nodes_seen: dict[str, Any] = {}
-            async for record in result:
-                path = record["path"]
-                if not path:
-                    continue
-                node_ids = []
-                for n in path.nodes:
-                    nid = n.get("id")
-                    if nid:
-                        node_ids.append(nid)
-                        if nid not in nodes_seen:
-                            nodes_seen[nid] = n
-                if node_ids:
-                    paths_raw.append(node_ids)
+    async def _build_quality_check(self, table_id: str, max_depth: int) -> tuple[QualityCheckResponse, list]:
+        component = await CycleIndex(self.driver).component_for(table_id, session=self.db_session)
+        cycles = self._select_cycles(component, table_id, max_depth) if component else []
+        paths_raw = [[n["id"] for n in cycle["nodes"]] for cycle in cycles]
+        nodes_seen = {n["id"]: n for cycle in cycles for n in cycle["nodes"]}
 
         # enrich nodes
         nodes_enriched = await self._convert_nodes(list(nodes_seen.values()))
@@ -615,32 +1263,14 @@ class LineageService:
                 "type": n.type,
             }
 
-        def canonical_cycle(ids: list[str]) -> tuple[str, ...]:
-            # drop trailing duplicate of first if present
-            core = ids[:-1] if len(ids) > 1 and ids[0] == ids[-1] else ids[:]
-            if not core:
-                return tuple()
-            n = len(core)
-            rotations = [tuple(core[i:] + core[:i]) for i in range(n)]
-            rcore = list(reversed(core))
-            rotations += [tuple(rcore[i:] + rcore[:i]) for i in range(n)]
-            return min(rotations)
-
+        # stored cycles are already canonical (rotated to their smallest id) and distinct
         cycles_out: list[list[dict[str, Any]]] = []
-        seen_set = set()
         for ids in paths_raw:
-            key = canonical_cycle(ids)
-            if not key or key in seen_set:
-                continue
-            seen_set.add(key)
-            cycle_nodes = []
-            for nid in key:
-                if nid in node_map:
-                    cycle_nodes.append(to_qc_node(node_map[nid]))
+            cycle_nodes = [to_qc_node(node_map[nid]) for nid in ids if nid in node_map]
             if cycle_nodes:
                 cycles_out.append(cycle_nodes)
 
-        has_cycles = len(cycles_out) > 0
+        has_cycles = component is not None
         severity = "high" if has_cycles else "low"
         from datetime import datetime, timezone
         response = QualityCheckResponse(
@@ -650,247 +1280,41 @@ class LineageService:
             issue_count=len(cycles_out),
             audit_timestamp=datetime.now(timezone.utc).isoformat(),
         )
-        await self._cache_set(cache_key, response.model_dump(), ttl=60 if has_cycles else 30)
-        return response
+        return response, [EDGES_GEN, table_id] + list(nodes_seen)
 
     async def _convert_nodes(self, raw_nodes: list[Any]) -> list[LineageGraphNode]:
-        nodes: list[LineageGraphNode] = []
-        for node in raw_nodes:
-            labels = []
-            if isinstance(node, dict):
-                props = node
-            elif hasattr(node, "_properties"):
-                props = getattr(node, "_properties", {}) or {}
-                labels = list(getattr(node, "labels", []))
-            else:
-                try:
-                    props = dict(node)
-                except Exception:
-                    props = {}
-            business_id = props.get("id")
-            label = props.get("name")
-            source_id = props.get("source_id")
-            parent_id = props.get("table_id")
-            ordinal_position = props.get("ordinal_position")
-            distance = props.get("depth") or props.get("distance")
-            node_type = "table"
-            if "Field" in labels:
-                node_type = "field"
-            elif "Table" in labels:
-                node_type = "table"
-            elif props.get("table_id"):
-                node_type = "field"
-            if business_id:
-                nodes.append(
-                    LineageGraphNode(
-                        id=business_id,
-                        label=label,
-                        type=node_type,
-                        source_id=source_id,
-                        parent_id=parent_id,
-                        ordinal_position=ordinal_position,
-                        distance=distance,
-                    )
-                )
-        if self.db_session and nodes:
-            table_ids = [n.id for n in nodes if n.type == "table"]
-            repo = TableRepository(self.db_session)
-            table_map = await repo.get_tables_with_primary_tags([uuid.UUID(t) for t in table_ids]) if table_ids else {}
-            enriched = []
-            for n in nodes:
-                extra = table_map.get(str(n.id)) or {}
-                enriched.append(
-                    LineageGraphNode(
-                        id=n.id,
-                        label=n.label,
-                        type=n.type,
-                        source_id=n.source_id or extra.get("source_id"),
-                        parent_id=n.parent_id,
-                        ordinal_position=n.ordinal_position,
-                        distance=n.distance,
-                        primary_tag=extra.get("primary_tag"),
-                        source_name=extra.get("source_name"),
-                    )
-                )
-            nodes = enriched
-        return nodes
+        records = [r for r in map(read_node, raw_nodes) if r is not None]
+        table_info = await self._table_info([r.id for r in records if r.type == "table"])
+        return build_nodes(records, table_info)
 
     def _convert_edges(self, raw_edges: list[Any]) -> list[LineageGraphEdge]:
-        edges: list[LineageGraphEdge] = []
-        for rel in raw_edges or []:
-            data = rel if hasattr(rel, "items") else {}
-            rel_id = data.get("id")
-            start_id = data.get("from") or data.get("start") or data.get("start_id")
-            end_id = data.get("to") or data.get("end") or data.get("end_id")
-            lineage_source = data.get("lineage_source")
-            confidence = data.get("confidence")
-            rel_type = data.get("rel_type")
-            edge_type = "field" if rel_type == "DERIVES_FROM" else "table"
-            if not start_id or not end_id:
-                continue
-            edges.append(
-                LineageGraphEdge(
-                    id=str(rel_id) if rel_id is not None else "",
-                    from_=start_id,
-                    to=end_id,
-                    type=edge_type,
-                    lineage_source=lineage_source,
-                    confidence=confidence,
-                    metadata={"rel_type": rel_type} if rel_type else {},
-                )
-            )
-        return edges
-
-    async def _to_graph(self, record) -> LineageGraphResponse:
-        # always return root node even if no edges
-        if not record:
-            return LineageGraphResponse(root_id="", nodes=[], edges=[])
-
-        log.info("lineage_raw", rels=record.get("rels"), nodes=record.get("nodes"))
-        nodes: list[LineageGraphNode] = []
-        edges: list[LineageGraphEdge] = []
-
-        for node in record.get("nodes") or []:
-            labels = []
-            if isinstance(node, dict):
-                props = node
-            elif hasattr(node, "_properties"):
-                props = getattr(node, "_properties", {}) or {}
-                labels = list(getattr(node, "labels", []))
-            else:
-                try:
-                    props = dict(node)
-                except Exception:
-                    props = {}
-
-            business_id = props.get("id")
-            label = props.get("name")
-            source_id = props.get("source_id")
-            parent_id = props.get("table_id")  # table_id if it's a field
-            ordinal_position = props.get("ordinal_position")
-            distance = props.get("depth") or props.get("distance")
-
-            node_type = "table"
-            if "Field" in labels:
-                node_type = "field"
-            elif "Table" in labels:
-                node_type = "table"
-            elif props.get("table_id"):
-                # heuristically treat nodes with table_id property as field nodes when labels missing
-                node_type = "field"
-
-            if business_id:
-                nodes.append(
-                    LineageGraphNode(
-                        id=business_id,
-                        label=label,
-                        type=node_type,
-                        source_id=source_id,
-                        parent_id=parent_id,
-                        ordinal_position=ordinal_position,
-                        distance=distance if distance is not None else (0 if business_id == record.get("root_id") else None),
-                    )
-                )
+        return build_edges(e for e in map(read_edge, raw_edges or ()) if e is not None)
 
-        for rel in record.get("rels") or []:
-            data = rel if hasattr(rel, "items") else {}
-            rel_id = data.get("id")
-            start_id = data.get("from") or data.get("start") or data.get("start_id")
-            end_id = data.get("to") or data.get("end") or data.get("end_id")
-            lineage_source = data.get("lineage_source")
-            confidence = data.get("confidence")
-            rel_type = data.get("rel_type")
-            edge_type = "field" if rel_type == "DERIVES_FROM" else "table"
-            if not start_id or not end_id:
-                continue
-            edges.append(
-                LineageGraphEdge(
-                    id=str(rel_id) if rel_id is not None else "",
-                    from_=start_id,
-                    to=end_id,
-                    type=edge_type,
-                    lineage_source=lineage_source,
-                    confidence=confidence,
-                    metadata={"rel_type": rel_type} if rel_type else {},
-                )
-            )
+    def _to_graph(self, record) -> LineageGraphResponse:
+        """Assemble a graph record without Postgres enrichment."""
+        return assemble(record).response()
 
-        # ensure root node exists
-        root_id = record.get("root_id")
-        if root_id and not any(n.id == root_id for n in nodes):
-            nodes.append(LineageGraphNode(id=root_id, label=None, type="table", distance=0))
-
-        # compute distance using BFS if missing
-        if root_id:
-            adjacency: dict[str, set[str]] = {}
-            for e in edges:
-                adjacency.setdefault(e.from_, set()).add(e.to)
-                adjacency.setdefault(e.to, set()).add(e.from_)
-            dist: dict[str, int] = {str(root_id): 0}
-            q: deque[str] = deque([str(root_id)])
-            while q:
-                cur = q.popleft()
-                for nxt in adjacency.get(cur, []):
-                    if nxt not in dist:
-                        dist[nxt] = dist[cur] + 1
-                        q.append(nxt)
-            enriched = []
-            for n in nodes:
-                enriched.append(
-                    LineageGraphNode(
-                        id=n.id,
-                        label=n.label,
-                        type=n.type,
-                        source_id=n.source_id,
-                        parent_id=n.parent_id,
-                        ordinal_position=n.ordinal_position,
-                        distance=n.distance if n.distance is not None else dist.get(str(n.id)),
-                        source_name=n.source_name,
-                        primary_tag=getattr(n, "primary_tag", None),
-                    )
-                )
-            nodes = enriched
-
-        # enrich primary_tag and source_name if db_session available
-        if self.db_session and nodes:
-            table_ids = [n.id for n in nodes if n.type == "table"]
-            repo = TableRepository(self.db_session)
-            table_map = await repo.get_tables_with_primary_tags([uuid.UUID(t) for t in table_ids]) if table_ids else {}
-            enriched_nodes = []
-            for n in nodes:
-                extra = table_map.get(str(n.id)) or {}
-                enriched_nodes.append(
-                    LineageGraphNode(
-                        id=n.id,
-                        label=n.label,
-                        type=n.type,
-                        source_id=n.source_id or extra.get("source_id"),
-                        parent_id=n.parent_id,
-                        ordinal_position=n.ordinal_position,
-                        primary_tag=extra.get("primary_tag"),
-                        distance=n.distance if n.distance is not None else (0 if str(n.id) == record.get("root_id") else None),
-                        source_name=extra.get("source_name"),
-                    )
-                )
-            nodes = enriched_nodes
+    async def _to_enriched_graph(self, record, direction: str | None = None) -> LineageGraphResponse:
+        graph = assemble(record, direction)
+        return graph.response(await self._table_info(graph.table_ids()))
 
-        return LineageGraphResponse(
-            root_id=root_id or "",
-            nodes=nodes,
-            edges=edges,
-        )
+    async def _table_info(self, table_ids: list[str]) -> dict[str, dict]:
+        """Primary tag, source name and source id per table, when a DB session is available."""
+        if not self.db_session or not table_ids:
+            return {}
+        with self._stage("enrich"):
+            return await self.enrichment.get_many(self.db_session, table_ids)
 
     async def _root_only_graph(self, table_id: str) -> LineageGraphResponse:
         """Return only the focal table node when Neo4j has no data (e.g., no lineage yet)."""
         if not self.db_session:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
-        repo = TableRepository(self.db_session)
         try:
             table_uuid = uuid.UUID(table_id)
         except Exception:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
 
-        table_map = await repo.get_tables_with_primary_tags([table_uuid])
+        table_map = await self.enrichment.get_many(self.db_session, [str(table_uuid)])
         table_info = table_map.get(str(table_id))
         if not table_info:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
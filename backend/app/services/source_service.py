@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from typing import Tuple
 
 from fastapi import HTTPException, status
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.source import DataSource
@@ -11,13 +12,16 @@ from app.schemas.source import Source, SourceCreate, SourceUpdate
 from app.core.encryption import encrypt_dict, decrypt_dict, mask_dict
 from app.services.connection_service import ConnectionService
 from app.repositories.audit_repo import ConnectionTestLogRepository
+from app.repositories.table_repo import TableRepository
+from app.services.table_enrichment import TableEnrichmentCache, invalidate_for_source
 
 
 class SourceService:
     """PostgreSQL-backed source service."""
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Redis | None = None):
         self.session = session
+        self.redis = redis
         self.repo = SourceRepository(session)
         self.audit_repo = ConnectionTestLogRepository(session)
 
@@ -55,13 +59,18 @@ class SourceService:
         if payload.connection_config is not None:
             source.connection_config = encrypt_dict(payload.connection_config or {})
         await self.session.commit()
+        if payload.name is not None:
+            await invalidate_for_source(self.session, self.redis, source.id)
         await self.session.refresh(source)
         return self._to_schema(source)
 
     async def delete_source(self, source_id: str) -> None:
         source = await self._get_entity(source_id)
+        # the source's tables go with it (ON DELETE CASCADE), so collect them first
+        table_ids = await TableRepository(self.session).ids_for_source(source.id)
         await self.repo.delete(source)
         await self.session.commit()
+        await TableEnrichmentCache(self.redis).invalidate(str(t) for t in table_ids)
 
     async def test_connection(self, source_id: str):
         source = await self._get_entity(source_id)
@@ -0,0 +1,125 @@
+"""Shared cache of the table attributes lineage responses decorate nodes with.
+
+Each table's name, source and primary tag live under ``lineage:enrich:<table_id>``
+as JSON, so a graph is enriched with one MGET and only the misses reach Postgres
+(a single ``= ANY($1)`` query, see ``TableRepository.get_tables_with_primary_tags``).
+
+Entries are dropped when the table changes (the graph outbox sync), when its
+primary tag is renamed or when its source is updated or deleted. A fill that
+read Postgres while such an invalidation ran is not written back: the
+``lineage:enrich:gen`` counter is read with the cached entries and checked again
+before the write. Invalidation also bumps the lineage cache generations of the
+affected tables, since cached lineage responses embed the same attributes.
+"""
+import json
+import uuid
+from collections import Counter
+from typing import Iterable
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.repositories.table_repo import TableRepository
+from app.services.lineage_cache import LineageCache
+
+
+ENRICH_PREFIX = "lineage:enrich:"
+ENRICH_GEN = "lineage:enrich:gen"
+
+enrichment_metrics: Counter = Counter()
+
+
+def enrichment_stats() -> dict[str, int]:
+    return {name: enrichment_metrics[name] for name in ("hits", "misses", "fills_skipped", "invalidated")}
+
+
+def _uuids(ids: Iterable[str]) -> dict[str, uuid.UUID]:
+    out: dict[str, uuid.UUID] = {}
+    for value in ids:
+        key = str(value)
+        if key in out:
+            continue
+        try:
+            out[key] = uuid.UUID(key)
+        except ValueError:
+            continue  # graph-only ids have no table row
+    return out
+
+
+class TableEnrichmentCache:
+    def __init__(self, redis: Redis | None):
+        self.redis = redis
+
+    async def get_many(self, session: AsyncSession, table_ids: Iterable[str]) -> dict[str, dict]:
+        """table id -> {name, primary_tag_id, primary_tag, source_id, source_name} for tables that exist."""
+        ids = _uuids(table_ids)
+        if not ids:
+            return {}
+        repo = TableRepository(session)
+        if self.redis is None:
+            return await repo.get_tables_with_primary_tags(list(ids.values()))
+
+        *cached, gen = await self.redis.mget([ENRICH_PREFIX + t for t in ids] + [ENRICH_GEN])
+        found: dict[str, dict] = {}
+        missing: list[uuid.UUID] = []
+        for table_id, raw in zip(ids, cached):
+            if raw is None:
+                missing.append(ids[table_id])
+            else:
+                found[table_id] = json.loads(raw)
+        enrichment_metrics["hits"] += len(found)
+        enrichment_metrics["misses"] += len(missing)
+        if not missing:
+            return found
+
+        loaded = await repo.get_tables_with_primary_tags(missing)
+        found.update(loaded)
+        if loaded:
+            await self._store(loaded, gen)
+        return found
+
+    async def _store(self, rows: dict[str, dict], gen: str | None) -> None:
+        if await self.redis.get(ENRICH_GEN) != gen:
+            # a table, tag or source changed while Postgres was read; the rows may predate it
+            enrichment_metrics["fills_skipped"] += 1
+            return
+        ttl = settings.LINEAGE_ENRICH_TTL_SECONDS
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for table_id, row in rows.items():
+                pipe.set(ENRICH_PREFIX + table_id, json.dumps(row), ex=ttl)
+            await pipe.execute()
+
+    async def invalidate(self, table_ids: Iterable[str]) -> None:
+        """Drop the entries and the cached lineage responses that embed them."""
+        ids = [str(t) for t in dict.fromkeys(table_ids) if t]
+        await self.drop(ids)
+        if self.redis is not None and ids:
+            await LineageCache(self.redis).invalidate(ids)
+
+    async def drop(self, table_ids: Iterable[str]) -> None:
+        ids = [str(t) for t in dict.fromkeys(table_ids) if t]
+        if self.redis is None or not ids:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(ENRICH_GEN)
+            for start in range(0, len(ids), 1000):
+                pipe.delete(*(ENRICH_PREFIX + t for t in ids[start:start + 1000]))
+            await pipe.execute()
+        enrichment_metrics["invalidated"] += len(ids)
+
+
+async def invalidate_for_tags(session: AsyncSession, redis: Redis | None, tag_ids: Iterable[uuid.UUID]) -> None:
+    """Drop the entries of tables whose primary tag is one of ``tag_ids``."""
+    if redis is None:
+        return
+    table_ids = await TableRepository(session).ids_with_primary_tags(list(tag_ids))
+    await TableEnrichmentCache(redis).invalidate(str(t) for t in table_ids)
+
+
+async def invalidate_for_source(session: AsyncSession, redis: Redis | None, source_id: uuid.UUID) -> None:
+    """Drop the entries of the tables of one source."""
+    if redis is None:
+        return
+    table_ids = await TableRepository(session).ids_for_source(source_id)
+    await TableEnrichmentCache(redis).invalidate(str(t) for t in table_ids)
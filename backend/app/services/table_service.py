@@ -7,9 +7,11 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
 
 from app.models.table import MetadataTable
-from app.repositories.table_repo import TableRepository
-from app.schemas.table import Table, TableCreate, TableUpdate, TagSummary
-from app.services.lineage_service import LineageService
+from app.repositories.criticality_repo import TableCriticalityRepository
+from app.repositories.table_repo import CRITICALITY_SORTS, TableRepository
+from app.schemas.table import Table, TableCreate, TableCriticality, TableUpdate, TagSummary
+from app.repositories.outbox_repo import GraphOutboxRepository
+from app.services.graph_outbox import notify_graph_outbox
 from app.repositories.tag_repo import TagRepository
 from app.repositories.source_repo import SourceRepository
 from app.models.tag import Tag
@@ -18,10 +20,11 @@ from app.models.tag import Tag
 class TableService:
     """PostgreSQL-backed table service."""
 
-    def __init__(self, session: AsyncSession, lineage_driver=None):
+    def __init__(self, session: AsyncSession):
         self.session = session
         self.repo = TableRepository(session)
-        self.lineage_driver = lineage_driver
+        self.criticality_repo = TableCriticalityRepository(session)
+        self.outbox = GraphOutboxRepository(session)
         self.tag_repo = TagRepository(session)
         self.source_repo = SourceRepository(session)
 
@@ -34,7 +37,14 @@ class TableService:
         tag_ids: list[str] | None = None,
         tag_match: str | None = "any",
         include_subtags: bool = False,
+        sort: str | None = None,
+        order: str = "desc",
+        min_metrics: dict[str, int] | None = None,
     ) -> Tuple[list[Table], int]:
+        if sort and sort not in ("created_at", *CRITICALITY_SORTS):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unsupported sort: {sort}")
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unsupported order: {order}")
         items, total = await self.repo.paginate(
             page=page,
             size=size,
@@ -43,8 +53,19 @@ class TableService:
             tag_ids=tag_ids,
             tag_match=tag_match,
             include_subtags=include_subtags,
+            sort=sort,
+            order=order,
+            min_metrics=min_metrics,
         )
-        return [await self._to_schema_with_tags(item) for item in items], total
+        criticality = await self.criticality_repo.get_many(str(item.id) for item in items)
+        tables = []
+        for item in items:
+            table = await self._to_schema_with_tags(item)
+            row = criticality.get(str(item.id))
+            if row is not None:
+                table.criticality = TableCriticality.model_validate(row)
+            tables.append(table)
+        return tables, total
 
     async def create_table(self, payload: TableCreate) -> Table:
         tag_ids = payload.tag_ids or []
@@ -80,6 +101,8 @@ class TableService:
         )
         try:
             await self.repo.add(table)
+            await TableCriticalityRepository(self.session).ensure_rows([table.id])
+            self.outbox.enqueue_table(table)
             await self.session.commit()
         except IntegrityError as exc:
             await self.session.rollback()
@@ -88,20 +111,12 @@ class TableService:
                 detail="Table name already exists under this data source",
             ) from exc
 
+        notify_graph_outbox()
+
         if tag_uuid_list:
             await self.tag_repo.add_table_tags(table.id, tag_uuid_list)
             await self.session.commit()
 
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).sync_table_node(
-                {
-                    "id": str(table.id),
-                    "name": table.name,
-                    "schema_name": table.schema_name,
-                    "qualified_name": table.qualified_name,
-                    "source_id": str(table.source_id) if table.source_id else None,
-                }
-            )
         return await self._to_schema_with_tags(table)
 
     async def get_table(self, table_id: str) -> Table:
@@ -135,6 +150,7 @@ class TableService:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="primary_tag_id must be in table tags")
             table.primary_tag_id = uuid.UUID(primary_tag_id)
 
+        self.outbox.enqueue_table(table)
         try:
             await self.session.commit()
         except IntegrityError as exc:
@@ -143,27 +159,18 @@ class TableService:
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Table name already exists under this data source",
             ) from exc
+        notify_graph_outbox()
         await self.session.refresh(table)
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).sync_table_node(
-                {
-                    "id": str(table.id),
-                    "name": table.name,
-                    "schema_name": table.schema_name,
-                    "qualified_name": table.qualified_name,
-                    "source_id": str(table.source_id) if table.source_id else None,
-                }
-            )
         return await self._to_schema_with_tags(table)
 
     async def delete_table(self, table_id: str) -> None:
         table = await self.repo.get(table_id)
         if not table:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
+        self.outbox.enqueue_delete("table", table.id)
         await self.repo.delete(table)
         await self.session.commit()
-        if self.lineage_driver:
-            await LineageService(self.lineage_driver).delete_table_node(str(table.id))
+        notify_graph_outbox()
 
     async def _to_schema_with_tags(self, table: MetadataTable) -> Table:
         tags = await self.tag_repo.list_table_tags(table.id)
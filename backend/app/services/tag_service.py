@@ -2,6 +2,7 @@ import uuid
 from typing import List, Optional
 
 from fastapi import HTTPException, status
+from redis.asyncio import Redis
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,11 +16,13 @@ from app.schemas.tag import (
     TagUsageResponse,
 )
 from app.schemas.user import User
+from app.services.table_enrichment import invalidate_for_tags
 
 
 class TagService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Redis | None = None):
         self.session = session
+        self.redis = redis
         self.repo = TagRepository(session)
 
     async def _is_admin(self, user: User):
@@ -81,15 +84,18 @@ class TagService:
         tag = await self.repo.get(tag_id)
         if not tag:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+        renamed: List[uuid.UUID] = []
         if payload.name:
             tag.name = payload.name
             # recompute path for tag and descendants
-            await self._recompute_paths(tag)
+            renamed = await self._recompute_paths(tag)
         await self.session.commit()
+        await invalidate_for_tags(self.session, self.redis, renamed)
         await self.session.refresh(tag)
         return Tag.model_validate(tag, from_attributes=True)
 
-    async def _recompute_paths(self, tag: TagModel):
+    async def _recompute_paths(self, tag: TagModel) -> List[uuid.UUID]:
+        """Recompute paths below ``tag`` and return the ids of every tag whose path changed."""
         # recompute self path
         parent = None
         if tag.parent_id:
@@ -100,8 +106,10 @@ class TagService:
         descendants = await self.session.execute(
             select(TagModel).where(TagModel.parent_id == tag.id)
         )
+        changed = [tag.id]
         for child in descendants.scalars().all():
-            await self._recompute_paths(child)
+            changed += await self._recompute_paths(child)
+        return changed
 
     async def delete_tag(self, tag_id: uuid.UUID, user: User) -> None:
         await self._is_admin(user)
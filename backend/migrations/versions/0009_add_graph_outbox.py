@@ -0,0 +1,37 @@
+"""add graph outbox for Postgres -> Neo4j sync
+
+Revision ID: 0009_add_graph_outbox
+Revises: 0008_add_ai_conversations
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0009_add_graph_outbox"
+down_revision = "0008_add_ai_conversations"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "graph_outbox",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("entity_type", sa.String(length=16), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("op", sa.String(length=16), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_graph_outbox_entity", "graph_outbox", ["entity_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_graph_outbox_entity", table_name="graph_outbox")
+    op.drop_table("graph_outbox")
@@ -0,0 +1,44 @@
+"""add lineage cycle (SCC) index
+
+Revision ID: 0010_add_lineage_cycle_index
+Revises: 0009_add_graph_outbox
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0010_add_lineage_cycle_index"
+down_revision = "0009_add_graph_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lineage_cycle_components",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("node_type", sa.String(length=16), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("cycles", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_table(
+        "lineage_cycle_members",
+        sa.Column("node_id", sa.String(length=64), primary_key=True),
+        sa.Column(
+            "component_id",
+            sa.String(length=64),
+            sa.ForeignKey("lineage_cycle_components.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+    )
+    op.create_index("ix_lineage_cycle_members_component_id", "lineage_cycle_members", ["component_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_cycle_members_component_id", table_name="lineage_cycle_members")
+    op.drop_table("lineage_cycle_members")
+    op.drop_table("lineage_cycle_components")
@@ -0,0 +1,46 @@
+"""add table criticality metrics
+
+Revision ID: 0011_add_table_criticality
+Revises: 0010_add_lineage_cycle_index
+Create Date: 2026-10-17 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0011_add_table_criticality"
+down_revision = "0010_add_lineage_cycle_index"
+branch_labels = None
+depends_on = None
+
+METRICS = ("downstream_count", "upstream_count", "impacted_domains", "max_depth")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_criticality",
+        sa.Column(
+            "table_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("tables.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("downstream_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("upstream_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("impacted_domains", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_depth", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("downstream_sketch", sa.LargeBinary(), nullable=True),
+        sa.Column("upstream_sketch", sa.LargeBinary(), nullable=True),
+        sa.Column("downstream_domains", postgresql.ARRAY(sa.String(length=64)), nullable=True),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    for column in METRICS:
+        op.create_index(f"ix_table_criticality_{column}", "table_criticality", [column])
+
+
+def downgrade() -> None:
+    for column in METRICS:
+        op.drop_index(f"ix_table_criticality_{column}", table_name="table_criticality")
+    op.drop_table("table_criticality")
@@ -0,0 +1,23 @@
+"""add index on fields (table_id, name)
+
+Revision ID: 0012_add_field_table_name_index
+Revises: 0011_add_table_criticality
+Create Date: 2026-10-17 18:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012_add_field_table_name_index"
+down_revision = "0011_add_table_criticality"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # not unique: existing catalogs may already hold duplicate field names per table
+    op.create_index("ix_fields_table_name", "fields", ["table_id", "name"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fields_table_name", table_name="fields")
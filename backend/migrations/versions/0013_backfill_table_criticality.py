@@ -0,0 +1,32 @@
+"""give every table a criticality row; index metrics with table_id
+
+Revision ID: 0013_backfill_table_criticality
+Revises: 0012_add_field_table_name_index
+Create Date: 2026-10-18 10:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0013_backfill_table_criticality"
+down_revision = "0012_add_field_table_name_index"
+branch_labels = None
+depends_on = None
+
+METRICS = ("downstream_count", "upstream_count", "impacted_domains", "max_depth")
+
+
+def upgrade() -> None:
+    # GET /tables inner-joins table_criticality; tables created so far get zeros until the next recompute
+    op.execute(
+        "INSERT INTO table_criticality (table_id) SELECT id FROM tables ON CONFLICT (table_id) DO NOTHING"
+    )
+    for column in METRICS:
+        op.drop_index(f"ix_table_criticality_{column}", table_name="table_criticality")
+        op.create_index(f"ix_table_criticality_{column}", "table_criticality", [column, "table_id"])
+
+
+def downgrade() -> None:
+    for column in METRICS:
+        op.drop_index(f"ix_table_criticality_{column}", table_name="table_criticality")
+        op.create_index(f"ix_table_criticality_{column}", "table_criticality", [column])
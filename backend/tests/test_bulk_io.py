@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+import yaml
+from openpyxl import Workbook
+
+from app.services import bulk_io
+from app.services.bulk_service import BulkImportMode, BulkService
+
+
+RECORDS = [{"type": "table", "name": f"t{i}", "source_id": "s", "size": i * 1.5} for i in range(25)]
+
+
+async def collect(source, fmt, chunk_size=4):
+    out = []
+    async for chunk in bulk_io.read_chunks(source, fmt, chunk_size):
+        assert 0 < len(chunk) <= chunk_size
+        out.extend(chunk)
+    return out
+
+
+def xlsx_bytes(rows):
+    wb = Workbook()
+    for row in rows:
+        wb.active.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.anyio
+async def test_formats_stream_the_same_records(monkeypatch, tmp_path):
+    monkeypatch.setattr(bulk_io, "JSON_BLOCK", 16)  # force elements to straddle reads
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(RECORDS, indent=2))
+    assert await collect(str(path), "json") == RECORDS
+    assert await collect("\n".join(json.dumps(r) for r in RECORDS).encode(), "ndjson") == RECORDS
+    assert await collect(yaml.safe_dump(RECORDS).encode(), "yaml") == RECORDS
+    csv = "type,name,source_id,size\n" + "".join(f"table,t{i},s,{i * 1.5}\n" for i in range(25))
+    assert await collect(csv.encode(), "csv") == RECORDS
+    header = ["type", "name", "source_id", "size"]
+    sheet = xlsx_bytes([header] + [[r[k] for k in header] for r in RECORDS])
+    assert await collect(sheet, "xlsx") == RECORDS
+
+
+@pytest.mark.anyio
+async def test_empty_cells_and_empty_files(monkeypatch):
+    assert await collect(b"type,name\ntable,\n", "csv") == [{"type": "table", "name": None}]
+    assert await collect(b"", "csv") == []
+    assert await collect(b"", "yaml") == []
+    assert await collect(b" [ ] ", "json") == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "data,fmt",
+    [(b"[{}, {}", "json"), (b"[{} {}]", "json"), (b"{oops", "ndjson"), (b"- a: [", "yaml"), (b"not a zip", "xlsx")],
+)
+async def test_malformed_input_raises_parse_error(data, fmt):
+    with pytest.raises(bulk_io.ParseError):
+        await collect(data, fmt)
+
+
+@pytest.mark.anyio
+async def test_validation_runs_per_chunk_with_file_row_numbers(monkeypatch):
+    monkeypatch.setattr(bulk_io, "JSON_BLOCK", 16)
+    monkeypatch.setattr("app.config.settings.BULK_IMPORT_CHUNK_SIZE", 3)
+    monkeypatch.setattr("app.config.settings.BULK_IMPORT_MAX_ERRORS", 2)
+    rows = [{"type": "table", "name": "a", "source_id": "s"}] * 4 + [{"name": "x"}, 7, {"type": "table", "source_id": "s"}]
+    result = await BulkService(session=None).bulk_import(
+        file_bytes=json.dumps(rows).encode(), file_format="json", mode=BulkImportMode.VALIDATE
+    )
+    assert result["summary"]["total_rows"] == 7
+    assert result["summary"]["skipped"] == 3
+    assert [(e["row"], e["code"]) for e in result["errors"]] == [(5, "MISSING_TYPE"), (6, "INVALID_RECORD")]
@@ -0,0 +1,196 @@
+import json
+import os
+
+import pytest
+
+from app.config import settings
+from app.services import bulk_jobs
+from app.services.bulk_jobs import BulkJobRunner, BulkJobStore, new_job_id
+from app.services.bulk_service import BulkService
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+async def submit(store, tmp_path, records, mode="execute"):
+    job_id = new_job_id()
+    path = tmp_path / f"{bulk_jobs.FILE_PREFIX}{job_id}-upload"
+    path.write_text("\n".join(json.dumps(r) for r in records))
+    await store.create(job_id, path=str(path), file_format="ndjson", mode=mode, created_by=None)
+    return job_id, path
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(bulk_jobs, "notify_graph_outbox", lambda: None)
+
+
+TABLES = [{"type": "table", "name": f"t{i}", "source_id": None} for i in range(5)]
+
+
+@pytest.mark.anyio
+async def test_failed_job_resumes_from_last_committed_chunk(redis_client, tmp_path, monkeypatch, small_chunks):
+    written: list[str] = []
+    fail = {"t2"}
+
+    async def write_entities(self, chunk, summary):
+        for rec in chunk:
+            if rec["name"] in fail:
+                fail.discard(rec["name"])
+                raise RuntimeError("connection reset")
+        written.extend(rec["name"] for rec in chunk)
+        summary["created"] += len(chunk)
+
+    monkeypatch.setattr(BulkService, "write_entities", write_entities)
+    store = BulkJobStore(redis_client)
+    runner = BulkJobRunner(driver=None, redis=redis_client, session_factory=FakeSession)
+    job_id, path = await submit(store, tmp_path, TABLES)
+
+    await runner.run(await redis_client.rpop(bulk_jobs.QUEUE))
+    job = await store.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "connection reset"
+    assert (job["phase"], job["chunk"], job["summary"]["created"]) == ("entities", 1, 2)
+    assert (await store.errors(job_id, 1))[0]["errors"][0]["code"] == "WRITE_FAILED"
+    assert path.exists()
+
+    assert (await store.resume(job_id))["status"] == "queued"
+    await runner.run(await redis_client.rpop(bulk_jobs.QUEUE))
+    job = await store.get(job_id)
+    assert job["status"] == "succeeded"
+    assert written == ["t0", "t1", "t2", "t3", "t4"]
+    assert job["summary"]["created"] == 5
+    assert not path.exists()
+    assert await store.resume(job_id) is None
+
+
+@pytest.mark.anyio
+async def test_running_job_stops_after_cancel(redis_client, tmp_path, monkeypatch, small_chunks):
+    store = BulkJobStore(redis_client)
+
+    async def write_entities(self, chunk, summary):
+        await store.request_cancel(job_id)
+
+    monkeypatch.setattr(BulkService, "write_entities", write_entities)
+    job_id, path = await submit(store, tmp_path, TABLES)
+    await BulkJobRunner(driver=None, redis=redis_client, session_factory=FakeSession).run(job_id)
+
+    job = await store.get(job_id)
+    assert (job["status"], job["chunk"]) == ("cancelled", 1)
+    assert not path.exists()
+    assert await store.request_cancel(job_id) is None
+
+
+@pytest.mark.anyio
+async def test_cancel_and_start_of_a_queued_job_are_exclusive(redis_client, tmp_path, monkeypatch, small_chunks):
+    async def write_entities(self, chunk, summary):
+        raise AssertionError("a cancelled job must not run")
+
+    monkeypatch.setattr(BulkService, "write_entities", write_entities)
+    store = BulkJobStore(redis_client)
+    job_id, path = await submit(store, tmp_path, TABLES)
+    runner = BulkJobRunner(driver=None, redis=redis_client, session_factory=FakeSession)
+    seen_queued = await runner.store.get(job_id)
+
+    async def stale_get(_):
+        return seen_queued
+
+    # the worker read the job as queued, then the cancel won
+    assert (await store.request_cancel(job_id))["status"] == "cancelled"
+    monkeypatch.setattr(runner.store, "get", stale_get)
+    await runner.run(job_id)
+    assert (await store.get(job_id))["status"] == "cancelled"
+    assert not path.exists()
+
+    # the other way round: a started job is only flagged
+    job_id, path = await submit(store, tmp_path, TABLES)
+    assert await store.start(job_id) and not await store.start(job_id)
+    job = await store.request_cancel(job_id)
+    assert (job["status"], job["cancel_requested"]) == ("running", True)
+    assert path.exists()
+
+
+@pytest.mark.anyio
+async def test_validate_job_records_errors_per_chunk(redis_client, tmp_path, monkeypatch, small_chunks):
+    monkeypatch.setattr(settings, "BULK_IMPORT_MAX_ERRORS", 2)
+    store = BulkJobStore(redis_client)
+    records = TABLES[:2] + [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    job_id, _ = await submit(store, tmp_path, records, mode="validate")
+    await BulkJobRunner(driver=None, redis=redis_client, session_factory=FakeSession).run(job_id)
+
+    job = await store.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["summary"]["skipped"] == job["error_count"] == 3
+    # only the first BULK_IMPORT_MAX_ERRORS are kept, under the chunk they came from
+    assert [(c["chunk"], [e["row"] for e in c["errors"]]) for c in await store.errors(job_id)] == [(1, [3, 4])]
+
+
+@pytest.mark.anyio
+async def test_sweep_removes_uploads_of_expired_jobs(redis_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_JOB_DIR", str(tmp_path))
+    store = BulkJobStore(redis_client)
+    job_id, kept = await submit(store, tmp_path, TABLES)
+    orphan = tmp_path / f"{bulk_jobs.FILE_PREFIX}{new_job_id()}-upload"
+    orphan.write_text("")
+    other = tmp_path / "bulk-sync-upload"
+    other.write_text("")
+
+    assert await store.sweep_files() == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([kept.name, other.name])
+    assert await redis_client.lrange(bulk_jobs.QUEUE, 0, -1) == [job_id]
+
+
+@pytest.mark.anyio
+async def test_job_popped_by_a_worker_that_died_is_queued_again(redis_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_JOB_DIR", str(tmp_path))
+    store = BulkJobStore(redis_client)
+    job_id, _ = await submit(store, tmp_path, TABLES)
+    assert await store.resume(job_id) is None  # still in the queue
+
+    # a worker pops the id and dies before starting the job
+    assert await redis_client.rpop(bulk_jobs.QUEUE) == job_id
+    await store.acquire(job_id)
+    assert await store.resume(job_id) is None  # as long as it may still start it
+    await store.release(job_id)
+    assert (await store.resume(job_id))["status"] == "queued"
+    assert await redis_client.lrange(bulk_jobs.QUEUE, 0, -1) == [job_id]
+
+    await redis_client.rpop(bulk_jobs.QUEUE)
+    await store.sweep_files()
+    assert await redis_client.lrange(bulk_jobs.QUEUE, 0, -1) == [job_id]
+
+
+@pytest.mark.anyio
+async def test_lineage_failures_end_the_job_partial_or_failed(redis_client, tmp_path, monkeypatch, small_chunks):
+    async def write_lineage(self, chunk, first_row, summary, errors):
+        errors.extend({"row": first_row + i, "code": "NOT_FOUND"} for i, rec in enumerate(chunk) if rec["name"] == "t3")
+
+    monkeypatch.setattr(BulkService, "write_lineage", write_lineage)
+    store = BulkJobStore(redis_client)
+
+    # no Neo4j: nothing of the lineage is written, so the job fails and can be resumed
+    job_id, path = await submit(store, tmp_path, TABLES)
+    await store.update(job_id, phase=bulk_jobs.LINEAGE, lineage_rows=5)
+    await BulkJobRunner(driver=None, redis=redis_client, session_factory=FakeSession).run(job_id)
+    job = await store.get(job_id)
+    assert (job["status"], job["phase"], job["chunk"]) == ("failed", "lineage", 0)
+    assert (await store.errors(job_id, 0))[0]["errors"][0]["code"] == "NO_NEO4J"
+
+    # rows that cannot be written leave the job partial
+    assert (await store.resume(job_id))["status"] == "queued"
+    await BulkJobRunner(driver=object(), redis=redis_client, session_factory=FakeSession).run(job_id)
+    job = await store.get(job_id)
+    assert (job["status"], job["lineage_errors"]) == ("partial", 1)
+    assert [c["chunk"] for c in await store.errors(job_id)] == [0, 1]
+    assert not path.exists()
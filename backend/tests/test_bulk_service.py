@@ -1,7 +1,10 @@
+import json
+import uuid
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.bulk_service import BulkService, BulkImportMode
+from app.services.bulk_service import BulkService, BulkImportMode, _SeenKeys, _field_key, _table_key
 from app.db import get_db_session
 from app.main import app
 from httpx import AsyncClient, ASGITransport
@@ -27,10 +30,40 @@ async def test_bulk_import_errors_on_missing_type(db_session: AsyncSession):
 
 
 @pytest.mark.anyio
-async def test_bulk_export_json(db_session: AsyncSession):
+async def test_bulk_export_json_imports_back_without_tags(db_session: AsyncSession):
+    from sqlalchemy import func, select
+
+    from app.models.field import MetadataField
+    from app.models.source import DataSource
+    from app.models.table import MetadataTable
+    from app.models.tag import TableTag, Tag
+
+    source = DataSource(name="warehouse", type="postgresql")
+    db_session.add(source)
+    await db_session.flush()
+    table = MetadataTable(source_id=source.id, name="users", name_normalized="users")
+    tag = Tag(name="pii", level=1, path="pii")
+    db_session.add_all([table, tag])
+    await db_session.flush()
+    db_session.add_all(
+        [MetadataField(table_id=table.id, name="id", data_type="int"), TableTag(table_id=table.id, tag_id=tag.id)]
+    )
+    await db_session.commit()
+
     service = BulkService(db_session)
-    payload = await service.bulk_export(file_format="json")
-    assert isinstance(payload, (bytes, bytearray))
+    payload = b"".join([block async for block in service.bulk_export(file_format="json")])
+    records = json.loads(payload)
+    assert {rec["type"] for rec in records} == {"table", "field", "tag", "table_tag"}
+
+    result = await service.bulk_import(file_bytes=payload, file_format="json", mode=BulkImportMode.EXECUTE)
+    assert result["success"] is True
+    # tables and fields are upserted on their keys; tag and table_tag records are skipped
+    entities = sum(1 for rec in records if rec["type"] in ("table", "field"))
+    assert result["summary"]["total_rows"] == len(records)
+    assert (result["summary"]["created"], result["summary"]["updated"]) == (0, entities)
+    assert await db_session.scalar(select(func.count()).select_from(MetadataTable)) == 1
+    # the links survive only because the import leaves existing tagging alone
+    assert await db_session.scalar(select(func.count()).select_from(TableTag)) == 1
 
 
 @pytest.mark.anyio
@@ -43,3 +76,126 @@ async def test_bulk_import_field_ref_missing_table(db_session: AsyncSession):
     result = await service.bulk_import(file_bytes=data, file_format="csv", mode=BulkImportMode.VALIDATE)
     assert result["success"] is False
     assert any(err["code"] == "MISSING_REF" for err in result["errors"])
+
+
+@pytest.mark.anyio
+async def test_bulk_import_execute_upserts_and_counts(db_session: AsyncSession):
+    from sqlalchemy import func, select
+
+    from app.models.field import MetadataField
+    from app.models.outbox import GraphOutboxEvent
+    from app.models.source import DataSource
+    from app.models.table import MetadataTable
+
+    source = DataSource(name="warehouse", type="postgresql")
+    db_session.add(source)
+    await db_session.flush()
+    existing = MetadataTable(source_id=source.id, name="Users", name_normalized="users", description="kept")
+    db_session.add(existing)
+    await db_session.flush()
+    db_session.add(MetadataField(table_id=existing.id, name="id", data_type="int"))
+    await db_session.commit()
+
+    data = "\n".join(
+        [
+            "type,name,source_id,schema_name,table_id,data_type",
+            f"table,USERS,{source.id},public,,",
+            f"table,orders,{source.id},public,,",
+            f"table,orders,{source.id},sales,,",
+            f"field,id,,,{existing.id},bigint",
+            f"field,email,,,{existing.id},text",
+        ]
+    ).encode()
+    service = BulkService(db_session)
+    result = await service.bulk_import(file_bytes=data, file_format="csv", mode=BulkImportMode.EXECUTE)
+    assert result["success"] is True
+    # USERS and the repeated orders row update; orders and email are new
+    assert result["summary"]["created"] == 2
+    assert result["summary"]["updated"] == 3
+
+    fresh = {"populate_existing": True}
+    result = await db_session.execute(select(MetadataTable).execution_options(**fresh))
+    tables = {t.name_normalized: t for t in result.scalars()}
+    assert set(tables) == {"users", "orders"}
+    assert tables["users"].id == existing.id
+    assert tables["users"].name == "USERS" and tables["users"].description == "kept"
+    assert tables["orders"].schema_name == "sales"
+    result = await db_session.execute(select(MetadataField).execution_options(**fresh))
+    fields = {f.name: f.data_type for f in result.scalars()}
+    assert fields == {"id": "bigint", "email": "text"}
+    events = await db_session.scalar(select(func.count()).select_from(GraphOutboxEvent))
+    assert events == 4
+
+
+def test_classify_matches_execute_keys():
+    source_id, table_id, existing = (
+        "00000000-0000-0000-0000-00000000000a",
+        "00000000-0000-0000-0000-00000000000b",
+        "00000000-0000-0000-0000-00000000000c",
+    )
+    records = [
+        {"type": "table", "name": "Users", "source_id": source_id},
+        {"type": "table", "name": "orders", "source_id": source_id},
+        {"type": "table", "name": "ORDERS", "source_id": source_id},
+        {"type": "field", "name": "id", "table_id": table_id},
+        {"type": "field", "name": "ID", "table_id": table_id},
+        {"type": "table_lineage", "source_table_id": source_id, "target_table_id": table_id},
+    ]
+    assert _table_key(records[0]) == (uuid.UUID(source_id), "users")
+    assert _field_key({"type": "field", "name": "id", "table_id": "not-a-uuid"}) is None
+    existing_tables = {(uuid.UUID(source_id), "users"): uuid.UUID(existing)}
+    preview = {"to_create": [], "to_update": []}
+    summary: dict = {}
+    BulkService._classify(records, existing_tables, {}, set(), preview, summary)
+
+    assert summary == {"to_update": 2, "to_create": 4}
+    assert preview["to_update"][0] == {"type": "table", "name": "Users", "id": existing}
+    # the repeated table (case-insensitive) updates; field names are case-sensitive
+    assert preview["to_update"][1]["name"] == "ORDERS"
+    assert [item.get("name") for item in preview["to_create"]] == ["orders", "id", "ID", None]
+
+
+@pytest.mark.anyio
+async def test_preview_remembers_new_keys_across_chunks_in_redis(redis_client):
+    source_id = uuid.UUID("00000000-0000-0000-0000-00000000000a")
+    first = [{"type": "table", "name": "orders", "source_id": str(source_id)}]
+    second = first + [{"type": "table", "name": "users", "source_id": str(source_id)}]
+    seen = _SeenKeys(redis_client)
+    assert await seen.add(BulkService._new_keys(first, {}, {})) == set()
+    assert await seen.add(BulkService._new_keys(second, {}, {})) == {("table", (source_id, "orders"))}
+    assert await redis_client.scard(seen.name) == 2
+    await seen.clear()
+    assert not await redis_client.exists(seen.name)
+
+
+@pytest.mark.anyio
+async def test_bulk_import_preview_looks_up_file_keys(db_session: AsyncSession):
+    from app.models.field import MetadataField
+    from app.models.source import DataSource
+    from app.models.table import MetadataTable
+
+    source = DataSource(name="warehouse", type="postgresql")
+    db_session.add(source)
+    await db_session.flush()
+    table = MetadataTable(source_id=source.id, name="Users", name_normalized="users")
+    db_session.add(table)
+    await db_session.flush()
+    field = MetadataField(table_id=table.id, name="id", data_type="int")
+    db_session.add(field)
+    await db_session.commit()
+
+    records = [
+        {"type": "table", "name": "USERS", "source_id": str(source.id)},
+        {"type": "table", "name": "orders", "source_id": str(source.id)},
+        {"type": "field", "name": "id", "table_id": str(table.id), "data_type": "int"},
+        {"type": "field", "name": "email", "table_id": str(table.id), "data_type": "text"},
+    ]
+    service = BulkService(db_session)
+    result = await service.bulk_import(
+        file_bytes=json.dumps(records).encode(), file_format="json", mode=BulkImportMode.PREVIEW
+    )
+    assert {(i["type"], i.get("id")) for i in result["preview"]["to_update"]} == {
+        ("table", str(table.id)),
+        ("field", str(field.id)),
+    }
+    assert [i["name"] for i in result["preview"]["to_create"]] == ["orders", "email"]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app.services import cache_codec
+
+
+def _graph_payload(n: int) -> dict:
+    tag = {"id": "t1", "name": "finance", "path": "/domains/finance"}
+    return {
+        "root_id": "n0",
+        "nodes": [{"id": f"n{i}", "label": f"table_{i}", "primary_tag": tag, "distance": i % 4} for i in range(n)],
+        "edges": [],
+        "depth_map": {1: 3, 2: 5},
+    }
+
+
+def test_small_payload_is_framed_but_not_compressed():
+    data = _graph_payload(2)
+    payload, raw_size = cache_codec.encode(data, compress_min_bytes=1 << 20)
+    assert payload[0] == cache_codec.FORMAT_VERSION
+    assert payload[2] == cache_codec.COMPRESSION_NONE
+    assert len(payload) == raw_size + 3
+    assert cache_codec.decode(payload) == data
+
+
+def test_large_payload_is_compressed_and_round_trips():
+    data = _graph_payload(2000)
+    payload, raw_size = cache_codec.encode(data, compress_min_bytes=1024)
+    assert payload[2] != cache_codec.COMPRESSION_NONE
+    assert len(payload) < raw_size / 5
+    assert len(payload) < len(json.dumps(data)) / 5
+    assert cache_codec.decode(payload) == data
+
+
+def test_legacy_json_and_unknown_versions():
+    legacy = json.dumps({"root_id": "a", "nodes": []})
+    assert cache_codec.decode(legacy) == {"root_id": "a", "nodes": []}
+    with pytest.raises(cache_codec.CodecError):
+        cache_codec.decode(b"\x09\x01\x00garbage")
+    with pytest.raises(cache_codec.CodecError):
+        cache_codec.decode(bytes((cache_codec.FORMAT_VERSION, 1, 2)) + b"not zstd")
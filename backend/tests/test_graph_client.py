@@ -0,0 +1,23 @@
+import pytest
+
+from app.graph import client
+
+
+@pytest.mark.anyio
+async def test_neo4j_dependency_reuses_shared_driver():
+    first = [d async for d in client.neo4j_dependency()][0]
+    second = [d async for d in client.neo4j_dependency()][0]
+    assert first is second
+    stats = client.neo4j_pool_stats()
+    assert stats["initialized"] is True
+    assert stats["in_use"] == 0
+    opened = stats["sessions"]
+    # sessions connect lazily, so opening one needs no server
+    async with first.session() as session:
+        assert session is not None
+        assert client.neo4j_pool_stats()["in_use"] == 1
+    stats = client.neo4j_pool_stats()
+    assert stats["in_use"] == 0 and stats["peak_in_use"] >= 1
+    assert stats["sessions"] == opened + 1
+    await client.close_neo4j_driver()
+    assert client.neo4j_pool_stats()["initialized"] is False
@@ -0,0 +1,61 @@
+import pytest
+
+from app.graph import queries
+from app.graph.maintenance import backfill_has_field
+
+
+class BatchResult:
+    def __init__(self, record):
+        self.record = record
+
+    async def single(self):
+        return self.record
+
+
+class BackfillTx:
+    def __init__(self, field_tables, tables, linked):
+        self.field_tables = field_tables
+        self.tables = tables
+        self.linked = linked
+
+    async def run(self, query, after, batch_size):
+        assert query == queries.BACKFILL_HAS_FIELD
+        batch = sorted(f for f in self.field_tables if f > after)[:batch_size]
+        found = [f for f in batch if self.field_tables[f] in self.tables]
+        self.linked.update(found)
+        return BatchResult({"last_id": batch[-1] if batch else None, "scanned": len(batch), "linked": len(found)})
+
+
+class BackfillSession:
+    def __init__(self, tx):
+        self.tx = tx
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def execute_write(self, fn, *args):
+        return await fn(self.tx, *args)
+
+
+class BackfillDriver:
+    def __init__(self, tx):
+        self.tx = tx
+
+    def session(self):
+        return BackfillSession(self.tx)
+
+
+@pytest.mark.anyio
+async def test_backfill_pages_through_all_fields_and_skips_orphans():
+    field_tables = {f"f{i:03d}": ("t1" if i % 2 else "t2") for i in range(25)}
+    field_tables["f000"] = "missing"
+    linked: set[str] = set()
+    tx = BackfillTx(field_tables, {"t1", "t2"}, linked)
+
+    totals = await backfill_has_field(BackfillDriver(tx), batch_size=10)
+
+    assert totals == {"scanned": 25, "linked": 24, "batches": 3}
+    assert linked == set(field_tables) - {"f000"}
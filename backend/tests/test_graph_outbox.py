@@ -0,0 +1,158 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.graph import queries
+from app.services import graph_outbox
+from app.services.graph_outbox import GraphOutboxDispatcher
+from app.services.lineage_service import LineageService
+
+
+def event(event_id, entity_type, op, payload=None):
+    entity_id = uuid.uuid4()
+    return SimpleNamespace(
+        id=event_id,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        op=op,
+        payload=payload or {"id": str(entity_id)},
+        attempts=0,
+    )
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def begin(self):
+        return self
+
+
+class FakeRepo:
+    def __init__(self, events):
+        self.events = events
+        self.removed = []
+        self.failed = []
+
+    async def claim_batch(self, limit):
+        return self.events[:limit]
+
+    async def remove(self, ids):
+        self.removed.extend(ids)
+
+    def mark_failed(self, events, error, max_backoff):
+        for e in events:
+            e.attempts += 1
+        self.failed.extend((e.id, error) for e in events)
+
+
+class FakeLineage:
+    def __init__(self, poison=None):
+        self.poison = poison
+        self.calls = []
+
+    async def apply_node_changes(self, **changes):
+        self.calls.append(changes)
+        ids = [p["id"] if isinstance(p, dict) else p for group in changes.values() for p in group]
+        if self.poison in ids:
+            raise RuntimeError("neo4j rejected")
+
+
+def dispatcher(monkeypatch, repo, lineage):
+    monkeypatch.setattr(graph_outbox, "GraphOutboxRepository", lambda session: repo)
+    d = GraphOutboxDispatcher(driver=None, session_factory=FakeSession)
+    d.lineage = lineage
+    return d
+
+
+@pytest.mark.anyio
+async def test_dispatch_groups_events_into_one_graph_write(monkeypatch):
+    events = [
+        event(1, "table", "upsert", {"id": "t1", "name": "orders"}),
+        event(2, "field", "upsert", {"id": "f1", "name": "id", "table_id": "t1"}),
+        event(3, "field", "delete"),
+        event(4, "table", "delete"),
+    ]
+    repo, lineage = FakeRepo(events), FakeLineage()
+
+    synced = await dispatcher(monkeypatch, repo, lineage).dispatch_once()
+
+    assert synced == 4
+    assert len(lineage.calls) == 1
+    changes = lineage.calls[0]
+    assert [t["id"] for t in changes["table_upserts"]] == ["t1"]
+    assert [f["id"] for f in changes["field_upserts"]] == ["f1"]
+    assert changes["field_deletes"] == [str(events[2].entity_id)]
+    assert changes["table_deletes"] == [str(events[3].entity_id)]
+    assert repo.removed == [1, 2, 3, 4]
+
+
+@pytest.mark.anyio
+async def test_dispatch_isolates_failing_event_and_backs_it_off(monkeypatch):
+    events = [
+        event(1, "table", "upsert", {"id": "t1", "name": "a"}),
+        event(2, "table", "upsert", {"id": "bad", "name": "b"}),
+        event(3, "table", "upsert", {"id": "t3", "name": "c"}),
+    ]
+    repo, lineage = FakeRepo(events), FakeLineage(poison="bad")
+
+    synced = await dispatcher(monkeypatch, repo, lineage).dispatch_once()
+
+    assert synced == 2
+    assert repo.removed == [1, 3]
+    assert repo.failed == [(2, "neo4j rejected")]
+    assert events[1].attempts == 1
+
+
+class RecordingTx:
+    def __init__(self):
+        self.queries = []
+
+    async def run(self, query, **params):
+        self.queries.append(query)
+
+        class Result:
+            async def single(self_inner):
+                return {"table_ids": ["t9"]}
+
+        return Result()
+
+
+class RecordingSession:
+    def __init__(self, tx):
+        self.tx = tx
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def execute_write(self, fn, *args):
+        return await fn(self.tx, *args)
+
+
+@pytest.mark.anyio
+async def test_apply_node_changes_runs_upserts_before_deletes_in_one_transaction():
+    tx = RecordingTx()
+    driver = SimpleNamespace(session=lambda: RecordingSession(tx))
+    service = LineageService(driver)
+
+    await service.apply_node_changes(
+        table_upserts=[{"id": "t1", "name": "orders"}],
+        field_upserts=[{"id": "f1", "name": "id", "table_id": "t1"}],
+        field_deletes=["f2"],
+        table_deletes=["t2"],
+    )
+
+    assert tx.queries == [
+        queries.SYNC_TABLE_NODES,
+        queries.SYNC_FIELD_NODES,
+        queries.DELETE_FIELD_NODES,
+        queries.DELETE_FIELDS_BY_TABLES,
+        queries.DELETE_TABLE_NODES,
+    ]
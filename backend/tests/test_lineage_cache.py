@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.schemas.lineage import LineageGraphResponse, PathsResponse
+from app.services import cache_codec
+from app.services.lineage_cache import EDGES_GEN, L1Cache, LineageCache, cache_stats
+
+
+@pytest.mark.anyio
+async def test_write_invalidates_only_entries_touching_node(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    near = cache.key("lineage:graph", {"table_id": "a"})
+    far = cache.key("lineage:graph", {"table_id": "x"})
+    token = await cache.token()
+    await cache.set(near, LineageGraphResponse(root_id="a"), 60, deps=["a", "b"], token=token)
+    await cache.set(far, LineageGraphResponse(root_id="x"), 60, deps=["x", "y"], token=token)
+
+    await cache.invalidate(["b", "c"], edges=True)
+
+    assert await cache.get(near, LineageGraphResponse) is None
+    assert (await cache.get(far, LineageGraphResponse)).root_id == "x"
+
+
+@pytest.mark.anyio
+async def test_edge_generation_and_concurrent_write_guard(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    paths = cache.key("paths", {"start_id": "a", "end_id": "d"})
+    token = await cache.token()
+    await cache.set(paths, PathsResponse(), 60, deps=[EDGES_GEN, "a", "d"], token=token)
+    assert await cache.get(paths, PathsResponse) is not None
+
+    await cache.invalidate(["b", "c"], edges=True)
+    assert await cache.get(paths, PathsResponse) is None
+
+    stale_token = await cache.token()
+    await cache.invalidate(["a"])
+    await cache.set(paths, PathsResponse(), 60, deps=[EDGES_GEN, "a", "d"], token=stale_token)
+    assert await cache.get(paths, PathsResponse) is None
+
+
+@pytest.mark.anyio
+async def test_unrelated_write_does_not_block_a_fill(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    key = cache.key("lineage:graph", {"table_id": "a"})
+    token = await cache.token()
+    await cache.invalidate(["q"])
+    await cache.set(key, LineageGraphResponse(root_id="a"), 60, deps=["a", "b"], token=token)
+    assert await cache.get(key, LineageGraphResponse) is not None
+    assert len(cache.l1) == 1
+
+
+@pytest.mark.anyio
+async def test_l1_serves_built_objects_and_is_promoted_from_l2(redis_client):
+    writer = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    key = writer.key("lineage:graph", {"table_id": "a"})
+    graph = LineageGraphResponse(root_id="a")
+    await writer.set(key, graph, 60, deps=["a"], token=await writer.token())
+    assert await writer.get(key, LineageGraphResponse) is graph
+
+    # another worker: empty L1, filled from Redis and then served locally
+    reader_l1 = L1Cache(16, 1 << 20)
+    reader = LineageCache(redis_client, l1=reader_l1)
+    first = await reader.get(key, LineageGraphResponse)
+    assert first.root_id == "a"
+    assert await reader.get(key, LineageGraphResponse) is first
+
+    # an invalidation message for "a" drops the promoted entry
+    reader_l1.invalidate(["a"])
+    assert len(reader_l1) == 0
+
+
+def test_l1_bounds_entries_and_bytes():
+    l1 = L1Cache(max_entries=2, max_bytes=100)
+    l1.put("k1", 1, 60, 0, ["a"], 40, l1.epoch)
+    l1.put("k2", 2, 60, 0, ["b"], 40, l1.epoch)
+    l1.get("k1")
+    l1.put("k3", 3, 60, 0, ["c"], 40, l1.epoch)
+    assert l1.get("k2") is None  # least recently used
+    assert l1.get("k1") == (1, True) and l1.get("k3") == (3, True)
+    l1.put("k4", 4, 60, 0, ["d"], 90, l1.epoch)
+    assert len(l1) == 1 and l1.bytes == 90
+    stale_epoch = l1.epoch
+    l1.invalidate(["e"])
+    l1.put("k5", 5, 60, 0, ["e"], 10, stale_epoch)
+    assert l1.get("k5") is None
+    l1.put("k5", 5, 60, 0, ["z"], 10, stale_epoch)
+    assert l1.get("k5") == (5, True)
+    l1.clear()
+    l1.put("k5", 5, 60, 0, ["z"], 10, stale_epoch)
+    assert l1.get("k5") is None
+    l1.put("k6", 6, 0.0001, 60, ["f"], 10, l1.epoch)
+    time.sleep(0.001)
+    assert l1.get("k6") == (6, False)
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_compute_once(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    key = cache.key("lineage:graph", {"table_id": "a"})
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return LineageGraphResponse(root_id="a"), ["a"]
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute(key, LineageGraphResponse, 60, compute) for _ in range(10))
+    )
+    assert calls == 1
+    assert {r.root_id for r in results} == {"a"}
+    assert not await redis_client.exists(f"{key}:lock")
+
+    # a second worker (separate in-process state) waits on the Redis lock instead of recomputing
+    await cache.invalidate(["a"])
+    other = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    leader = asyncio.create_task(cache.fill(key, LineageGraphResponse, 60, compute))
+    await asyncio.sleep(0.01)
+    follower = await other.fill(key, LineageGraphResponse, 60, compute)
+    assert (await leader).root_id == follower.root_id == "a"
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_stale_entry_served_while_refreshing(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    key = cache.key("lineage:graph", {"table_id": "a"})
+    await cache.set(key, LineageGraphResponse(root_id="old"), 0, deps=["a"], token=await cache.token())
+    refreshed = asyncio.Event()
+
+    async def refresh():
+        await cache.fill(key, LineageGraphResponse, 60, compute, wait=False)
+        refreshed.set()
+
+    async def compute():
+        return LineageGraphResponse(root_id="new"), ["a"]
+
+    served = await cache.get_or_compute(key, LineageGraphResponse, 60, compute, refresh=refresh)
+    assert served.root_id == "old"
+    await asyncio.wait_for(refreshed.wait(), 1)
+    assert (await cache.get(key, LineageGraphResponse)).root_id == "new"
+
+    # an invalidated entry is never served stale
+    await cache.invalidate(["a"])
+    assert await cache.get(key, LineageGraphResponse) is None
+
+
+@pytest.mark.anyio
+async def test_payloads_are_binary_and_legacy_entries_still_read(redis_client):
+    cache = LineageCache(redis_client, l1=L1Cache(16, 1 << 20))
+    key = cache.key("lineage:graph", {"table_id": "a"})
+    graph = LineageGraphResponse(
+        root_id="a",
+        nodes=[{"id": f"n{i}", "type": "table", "primary_tag": {"id": "t", "path": "/x"}} for i in range(500)],
+    )
+    await cache.set(key, graph, 60, deps=["a"], token=await cache.token())
+    cache.l1.clear()
+
+    stored = await redis_client.execute_command("GET", key, NEVER_DECODE=True)
+    assert stored[0] == cache_codec.FORMAT_VERSION
+    assert len(stored) < len(graph.model_dump_json()) / 5
+    assert (await cache.get(key, LineageGraphResponse)).nodes[499].id == "n499"
+    assert cache_stats()["payloads"]["lineage:graph"]["writes"] >= 1
+
+    # entries written as JSON text before the codec existed are still served
+    await redis_client.set(key, json.dumps({"root_id": "legacy"}))
+    cache.l1.clear()
+    assert (await cache.get(key, LineageGraphResponse)).root_id == "legacy"
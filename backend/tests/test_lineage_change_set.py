@@ -0,0 +1,59 @@
+import pytest
+
+from app.graph.projection import LineageProjection
+from app.graph.traversal import mask_members, multi_source_bfs
+from app.services.lineage_service import LineageService
+
+
+def test_multi_source_bfs_attributes_every_root():
+    adj = {"a": ["c"], "b": ["c", "d"], "c": ["e"], "d": ["e"], "e": ["f"]}
+    roots = ["a", "b"]
+    hits = multi_source_bfs(roots, lambda u: adj.get(u, ()), depth=3)
+
+    assert hits["c"] == (1, 0b11, 0b11)
+    assert hits["d"] == (1, 0b10, 0b10)
+    dist, mask, nearest = hits["e"]
+    assert dist == 2 and mask_members(mask, roots) == ["a", "b"] and mask_members(nearest, roots) == ["a", "b"]
+    assert hits["f"][0] == 3
+    assert "f" not in multi_source_bfs(roots, lambda u: adj.get(u, ()), depth=2)
+
+
+def test_multi_source_bfs_keeps_longer_routes_in_the_mask():
+    # x reaches z in one hop, y only in three
+    adj = {"x": ["z"], "y": ["p"], "p": ["q"], "q": ["z"]}
+    hits = multi_source_bfs(["x", "y"], lambda u: adj.get(u, ()), depth=3)
+    assert hits["z"] == (1, 0b11, 0b01)
+
+
+@pytest.mark.anyio
+async def test_change_set_impact_from_projection():
+    projection = LineageProjection()
+    projection.ready = True
+    for t in ["a", "b", "c", "d", "e"]:
+        projection.upsert_table(t, t.upper(), "src")
+    projection.add_edge(1, "a", "c", "FEEDS_INTO")
+    projection.add_edge(2, "b", "c", "FEEDS_INTO")
+    projection.add_edge(3, "b", "d", "FEEDS_INTO")
+    projection.add_edge(4, "c", "e", "FEEDS_INTO")
+    projection.add_edge(5, "a", "b", "FEEDS_INTO")
+
+    class NoNeo4j:
+        def session(self):
+            raise AssertionError("a ready projection must not hit Neo4j")
+
+    service = LineageService(NoNeo4j(), projection=projection)
+    response, deps = await service._build_change_set_impact(["a", "b", "missing"], "downstream", 5)
+
+    assert response.missing_roots == ["missing"]
+    # roots are the change set itself, even when one root feeds another
+    assert [t.id for t in response.impacted] == ["c", "d", "e"]
+    by_id = {t.id: t for t in response.impacted}
+    assert by_id["c"].roots == ["a", "b"] and by_id["c"].distance == 1
+    assert by_id["d"].roots == ["a", "b"] and by_id["d"].nearest_root == "b"
+    assert by_id["e"].distance == 2
+    per_root = {r.root_id: r for r in response.per_root}
+    assert per_root["a"].impacted_tables == 3 and per_root["a"].exclusive_tables == 0
+    assert per_root["missing"].impacted_tables == 0
+    assert response.depth_map == {1: 2, 2: 1}
+    assert response.total_impacted_domains == 3 and response.severity_level == "low"
+    assert set(deps) >= {"a", "b", "c", "d", "e"}
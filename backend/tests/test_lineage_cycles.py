@@ -0,0 +1,212 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.core.cache import Lease
+from app.graph.cycles import is_cyclic, representative_cycles, strongly_connected_components
+from app.services.cycle_index import LEASE, PENDING_EDGES, STALE, CycleIndex, mark_edges_added
+from app.services.lineage_service import LineageService
+from tests.test_lineage_projection import RecordStream
+
+
+def components(succ):
+    nodes = set(succ) | {v for vs in succ.values() for v in vs}
+    return sorted(sorted(c) for c in strongly_connected_components(nodes, succ) if is_cyclic(c, succ))
+
+
+def test_scc_finds_cycles_and_self_loops_only():
+    succ = {"a": ["b"], "b": ["c"], "c": ["a", "d"], "d": ["e"], "e": ["e"], "f": ["a"]}
+    assert components(succ) == [["a", "b", "c"], ["e"]]
+
+
+def test_scc_is_iterative_on_long_chains():
+    n = 50_000
+    succ = {str(i): [str(i + 1)] for i in range(n)}
+    succ[str(n)] = ["0"]
+    (component,) = components(succ)
+    assert len(component) == n + 1
+
+
+def test_representative_cycles_are_bounded_distinct_and_rotated():
+    # two triangles sharing node a
+    succ = {"a": ["b", "x"], "b": ["c"], "c": ["a"], "x": ["y"], "y": ["a"]}
+    members = ["a", "b", "c", "x", "y"]
+    cycles = representative_cycles(members, succ, limit=10)
+    assert sorted(cycles) == [["a", "b", "c"], ["a", "x", "y"]]
+    assert len(representative_cycles(members, succ, limit=1)) == 1
+
+
+def test_component_records_nodes_and_edges_of_each_cycle(monkeypatch):
+    info = {n: {"id": n, "name": n.upper(), "type": "table", "table_id": None, "source_id": None} for n in "abc"}
+    out = {
+        "a": [{"id": 1, "to": "b", "rel_type": "FEEDS_INTO", "lineage_source": "manual", "confidence": 1.0}],
+        "b": [{"id": 2, "to": "a", "rel_type": "FEEDS_INTO", "lineage_source": "manual", "confidence": 1.0},
+              {"id": 3, "to": "c", "rel_type": "FEEDS_INTO", "lineage_source": "manual", "confidence": 1.0}],
+        "c": [],
+    }
+    component = CycleIndex._component(["b", "a"], info, out)
+    assert component["id"] == "a" and component["members"] == ["a", "b"]
+    (cycle,) = component["cycles"]
+    assert [n["id"] for n in cycle["nodes"]] == ["a", "b"]
+    assert [(e["from"], e["to"], e["id"]) for e in cycle["edges"]] == [("a", "b", "1"), ("b", "a", "2")]
+
+
+def test_select_cycles_prefers_cycles_through_node_within_depth():
+    def cycle(*ids):
+        return {"nodes": [{"id": i} for i in ids], "edges": []}
+
+    component = SimpleNamespace(cycles=[cycle("a", "b", "c", "d"), cycle("a", "x"), cycle("b", "y")])
+    picked = LineageService._select_cycles(component, "a", max_depth=3)
+    assert [[n["id"] for n in c["nodes"]] for c in picked] == [["a", "x"]]
+    # nothing short enough: fall back to the stored cycles through the node
+    picked = LineageService._select_cycles(component, "c", max_depth=2)
+    assert [[n["id"] for n in c["nodes"]] for c in picked] == [["a", "b", "c", "d"]]
+
+
+class RecordingIndex(CycleIndex):
+    def __init__(self, redis):
+        super().__init__(driver=None, redis=redis)
+        self.calls = []
+
+    async def rebuild(self):
+        self.calls.append("rebuild")
+
+    async def edges_added(self, pairs):
+        self.calls.append(sorted(pairs))
+
+
+@pytest.mark.anyio
+async def test_inserted_edges_are_queued_and_large_batches_rebuild_once(redis_client, monkeypatch):
+    monkeypatch.setattr(settings, "LINEAGE_CYCLE_INCREMENTAL_MAX_EDGES", 2)
+    index = RecordingIndex(redis_client)
+
+    await mark_edges_added(redis_client, [("a", "b"), ("b", "c")])
+    assert await redis_client.scard(PENDING_EDGES) == 2
+    assert await index.refresh() == 2
+    assert index.calls == [[("a", "b"), ("b", "c")]]
+
+    big = [(f"s{i}", f"t{i}") for i in range(3)]
+    await mark_edges_added(redis_client, big)
+    await mark_edges_added(redis_client, big)
+    await mark_edges_added(redis_client, [("x", "y")])
+    assert await index.refresh() == 1
+    assert index.calls[1:] == ["rebuild"]
+    assert not await redis_client.exists(STALE, PENDING_EDGES)
+    assert await index.refresh() == 0
+
+
+@pytest.mark.anyio
+async def test_index_lease_is_held_by_one_process_at_a_time(redis_client):
+    first, second = Lease(redis_client, LEASE, 60), Lease(redis_client, LEASE, 60)
+    assert await first.claim() and await first.claim()  # renewing our own lease
+    assert not await second.claim()
+    await second.release()  # not ours: no effect
+    assert not await second.claim()
+    await first.release()
+    assert await second.claim()
+
+
+class StoreSession:
+    def __init__(self, components):
+        self.components = components
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def begin(self):
+        return self
+
+
+class StoreRepository:
+    """The lineage_cycle tables, kept in a dict of component id -> component."""
+
+    def __init__(self, session):
+        self.components = session.components
+
+    async def component_for(self, node_id):
+        found = [c for c in self.components.values() if node_id in c["members"]]
+        return SimpleNamespace(**found[0]) if found else None
+
+    async def all_memberships(self):
+        return {n: c["id"] for c in self.components.values() for n in c["members"]}
+
+    async def memberships(self, node_ids):
+        everything = await self.all_memberships()
+        return {n: everything[n] for n in node_ids if n in everything}
+
+    async def members_of(self, component_ids):
+        return [n for cid in component_ids for n in self.components[cid]["members"]]
+
+    async def replace(self, old_component_ids, components):
+        for cid in list(self.components) if old_component_ids is None else old_component_ids:
+            self.components.pop(cid, None)
+        self.components.update((c["id"], c) for c in components)
+
+
+class CycleDriver:
+    def __init__(self, edges):
+        self.edges = edges  # (rel id, from, to)
+
+    def session(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, **params):
+        if "ids" in params:
+            return RecordStream(
+                {
+                    "id": n,
+                    "name": n.upper(),
+                    "labels": ["Table"],
+                    "table_id": None,
+                    "source_id": None,
+                    "out": [
+                        {"id": rid, "to": dst, "rel_type": "FEEDS_INTO", "lineage_source": "manual", "confidence": 1.0}
+                        for rid, src, dst in self.edges
+                        if src == n
+                    ],
+                }
+                for n in params["ids"]
+            )
+        ids = {n for _, src, dst in self.edges for n in (src, dst)}
+        return RegionResult(sorted(ids))
+
+
+class RegionResult:
+    def __init__(self, ids):
+        self.ids = ids
+
+    async def single(self):
+        return {"ids": self.ids}
+
+
+@pytest.mark.anyio
+async def test_folding_an_edge_into_the_index_invalidates_cached_quality_checks(redis_client, monkeypatch):
+    stored = {}
+    monkeypatch.setattr("app.services.cycle_index.LineageCycleRepository", StoreRepository)
+    monkeypatch.setattr(
+        CycleIndex,
+        "component_for",
+        lambda self, node_id, session=None: StoreRepository(StoreSession(stored)).component_for(node_id),
+    )
+    driver = CycleDriver([(1, "a", "b"), (2, "b", "a")])
+    service = LineageService(driver, redis=redis_client)
+
+    # the write of b -> a: caches invalidated and the edge queued for the loop
+    await service.cache.invalidate(["b", "a"], edges=True)
+    await mark_edges_added(redis_client, [("b", "a")])
+    assert not (await service.quality_check("a")).has_cycles
+
+    index = CycleIndex(driver, session_factory=lambda: StoreSession(stored), redis=redis_client)
+    assert await index.refresh() == 1
+    qc = await service.quality_check("a")
+    assert qc.has_cycles and [[n.id for n in c] for c in qc.cycles] == [["a", "b"]]
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+
+from app.graph import queries
+from app.graph.projection import LineageProjection
+from app.services import lineage_service
+from app.services.graph_assembly import assemble, within_depth
+from app.services.lineage_cache import LineageCache
+from app.services.lineage_service import LineageService
+from tests.test_lineage_projection import ProjectionDriver, _edge
+
+
+def shape(graph):
+    return (
+        sorted((n.id, n.type, n.distance) for n in graph.nodes),
+        sorted(e.id for e in graph.edges),
+    )
+
+
+@pytest.fixture
+async def projection():
+    rng = random.Random(7)
+    tables = [f"t{i}" for i in range(40)]
+    fields = [{"id": f"{t}.f{j}", "name": f"f{j}", "table_id": t} for t in tables for j in range(2)]
+    edges = []
+    for i in range(90):
+        a, b = rng.sample(tables, 2)
+        edges.append(_edge(i, a, b))
+    for i in range(60):
+        f, g = rng.sample(fields, 2)
+        edges.append(_edge(1000 + i, f["id"], g["id"], "DERIVES_FROM"))
+    data = {
+        queries.PROJECTION_TABLES: [{"id": t, "name": t, "source_id": "src"} for t in tables],
+        queries.PROJECTION_FIELDS: fields,
+        queries.PROJECTION_EDGES: edges,
+    }
+    proj = LineageProjection()
+    await proj.load(ProjectionDriver(data))
+    return proj
+
+
+@pytest.mark.anyio
+async def test_cutting_a_deeper_graph_matches_a_fresh_traversal(projection):
+    for root in ("t0", "t5", "t17"):
+        for direction in ("upstream", "downstream"):
+            for granularity in ("table", "field", "all"):
+                deep = projection.graph_record(root, direction, 5, granularity)
+                if deep is None:
+                    continue
+                deep_graph = assemble(deep, direction).response()
+                for depth in range(1, 5):
+                    fresh = assemble(projection.graph_record(root, direction, depth, granularity), direction).response()
+                    cut = within_depth(deep_graph, direction, depth, granularity)
+                    assert shape(cut) == shape(fresh), (root, direction, granularity, depth)
+
+
+@pytest.mark.anyio
+async def test_graph_requests_reuse_deeper_and_one_directional_entries(projection, redis_client, monkeypatch):
+    calls = []
+    graph_record = projection.graph_record
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return graph_record(*args, **kwargs)
+
+    root = next(
+        t for t in (f"t{i}" for i in range(40))
+        if graph_record(t, "upstream", 1) and graph_record(t, "downstream", 1)
+    )
+    monkeypatch.setattr(projection, "graph_record", counting)
+    monkeypatch.setattr(lineage_service, "graph_cache_metrics", {"derived_hits": 0, "combined": 0, "misses": 0})
+    service = LineageService(driver=None, redis=redis_client, projection=projection)
+
+    deep = await service.get_graph(root, depth=4, direction="downstream", granularity="table")
+    shallow = await service.get_graph(root, depth=2, direction="downstream", granularity="table")
+    assert shape(shallow) == shape(within_depth(deep, "downstream", 2, "table"))
+    await service.get_graph(root, depth=4, direction="upstream", granularity="table")
+    both = await service.get_graph(root, depth=3, direction="both", granularity="table")
+    assert [c[1:3] for c in calls] == [("downstream", 4), ("upstream", 4)]
+
+    up = assemble(graph_record(root, "upstream", 3, "table"), "upstream").response()
+    down = assemble(graph_record(root, "downstream", 3, "table"), "downstream").response()
+    assert {n.id for n in both.nodes} == {n.id for n in up.nodes} | {n.id for n in down.nodes}
+    assert {e.id for e in both.edges} == {e.id for e in up.edges} | {e.id for e in down.edges}
+    assert lineage_service.graph_cache_metrics == {"derived_hits": 3, "combined": 1, "misses": 2}
+
+
+class GraphResult:
+    def __init__(self, record):
+        self.record = record
+
+    async def single(self):
+        return self.record
+
+
+class GraphDriver:
+    """Answers the GET_GRAPH queries from a projection of what Neo4j holds now."""
+
+    def __init__(self, projection):
+        self.projection = projection
+
+    def session(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, table_id, depth, rel_filter):
+        direction = "upstream" if rel_filter.startswith("<") else "downstream"
+        return GraphResult(self.projection.graph_record(table_id, direction, depth, "table"))
+
+
+@pytest.mark.anyio
+async def test_projection_behind_another_workers_write_is_not_cached(redis_client):
+    def graph_data(edges):
+        return {
+            queries.PROJECTION_TABLES: [{"id": t, "name": t, "source_id": "src"} for t in ("a", "b", "c")],
+            queries.PROJECTION_EDGES: [_edge(i, src, dst) for i, (src, dst) in enumerate(edges)],
+        }
+
+    local = LineageProjection()
+    await local.load(ProjectionDriver(graph_data([("a", "b")])), redis_client)
+    # another worker adds b -> c after this one loaded its projection
+    neo4j = LineageProjection()
+    await neo4j.load(ProjectionDriver(graph_data([("a", "b"), ("b", "c")])))
+    await LineageCache(redis_client).invalidate(["b", "c"], edges=True)
+
+    service = LineageService(driver=GraphDriver(neo4j), redis=redis_client, projection=local)
+    graph = await service.get_graph("a", depth=3, direction="downstream", granularity="table")
+    assert {n.id for n in graph.nodes} == {"a", "b", "c"}
+    cached = await service.get_graph("a", depth=3, direction="downstream", granularity="table")
+    assert {n.id for n in cached.nodes} == {"a", "b", "c"}
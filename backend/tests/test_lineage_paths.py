@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from app.graph.paths import edge_cost, k_shortest_paths
+from app.graph.projection import LineageProjection
+from app.services.lineage_service import LineageService
+
+
+def adjacency(edges, weight="hops"):
+    adj = {}
+    for edge_id, (src, dst, confidence) in edges.items():
+        adj.setdefault(src, []).append((dst, edge_id, edge_cost(confidence, weight)))
+    return adj
+
+
+# s -> a -> t (confident), s -> b -> c -> t, s -> t (doubtful)
+EDGES = {
+    "e1": ("s", "a", 0.9),
+    "e2": ("a", "t", 0.9),
+    "e3": ("s", "b", 1.0),
+    "e4": ("b", "c", 1.0),
+    "e5": ("c", "t", 1.0),
+    "e6": ("s", "t", 0.1),
+}
+
+
+def test_paths_come_out_by_hop_count():
+    paths = list(k_shortest_paths("s", "t", adjacency(EDGES), k=10, max_hops=10))
+    assert [p.nodes for p in paths] == [("s", "t"), ("s", "a", "t"), ("s", "b", "c", "t")]
+
+
+def test_confidence_weight_prefers_the_most_certain_path():
+    paths = list(k_shortest_paths("s", "t", adjacency(EDGES, "confidence"), k=10, max_hops=10))
+    assert [p.nodes for p in paths][0] == ("s", "b", "c", "t")
+    assert paths[-1].nodes == ("s", "t")
+
+
+def test_hop_bound_does_not_hide_a_costlier_shorter_route():
+    # the most certain way to m takes 3 hops, leaving no room for m -> t within 3 hops
+    edges = {
+        "e1": ("s", "x", 1.0),
+        "e2": ("x", "y", 1.0),
+        "e3": ("y", "m", 1.0),
+        "e4": ("s", "m", 0.5),
+        "e5": ("m", "t", 1.0),
+    }
+    adj = adjacency(edges, "confidence")
+    assert [p.nodes for p in k_shortest_paths("s", "t", adj, k=10, max_hops=3)] == [("s", "m", "t")]
+    assert [p.nodes for p in k_shortest_paths("s", "t", adj, k=10, max_hops=4)] == [
+        ("s", "x", "y", "m", "t"),
+        ("s", "m", "t"),
+    ]
+
+
+def test_limits_on_count_depth_and_time():
+    adj = adjacency(EDGES)
+    assert len(list(k_shortest_paths("s", "t", adj, k=2, max_hops=10))) == 2
+    assert [p.nodes for p in k_shortest_paths("s", "t", adj, k=10, max_hops=2)] == [("s", "t"), ("s", "a", "t")]
+    # an expired budget still returns the first (cheapest) path
+    assert len(list(k_shortest_paths("s", "t", adj, k=10, max_hops=10, deadline=time.monotonic() - 1))) == 1
+
+
+def _projection():
+    projection = LineageProjection()
+    projection.ready = True
+    for t in ("s", "a", "b", "c", "t", "z"):
+        projection.upsert_table(t, t.upper(), "src")
+    for edge_id, (src, dst, confidence) in EDGES.items():
+        projection.add_edge(edge_id, src, dst, "FEEDS_INTO", "manual", confidence)
+    projection.add_edge("e7", "t", "z", "FEEDS_INTO")
+    return projection
+
+
+def test_projection_between_keeps_only_nodes_on_bounded_paths():
+    record = _projection().between("s", "t", max_depth=2)
+    assert sorted(n["id"] for n in record["nodes"]) == ["a", "s", "t"]
+    assert sorted(r["id"] for r in record["rels"]) == ["e1", "e2", "e6"]
+
+
+@pytest.mark.anyio
+async def test_find_paths_reports_truncation_and_streams_incrementally():
+    service = LineageService(driver=None, projection=_projection())
+
+    response, _ = await service._build_paths("s", "t", max_depth=10, limit=2, weight="hops")
+    assert [p.path for p in response.paths] == [["s", "t"], ["s", "a", "t"]]
+    assert response.truncated == "limit"
+    assert {e.id for e in response.edges} == {"e1", "e2", "e6"}
+
+    events = [e async for e in service.stream_paths("s", "t", max_depth=10, limit=5)]
+    assert [e["type"] for e in events] == ["path", "path", "path", "done"]
+    assert events[-1] == {"type": "done", "count": 3, "truncated": None}
+    # nodes are only sent with the first path that reaches them
+    assert [n["id"] for n in events[1]["nodes"]] == ["a"]
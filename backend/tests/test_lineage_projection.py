@@ -0,0 +1,117 @@
+import pytest
+
+from app.graph import queries
+from app.graph.projection import LineageProjection
+
+
+class RecordStream:
+    def __init__(self, records):
+        self._records = list(records)
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for rec in self._records:
+            yield rec
+
+
+class ProjectionSession:
+    def __init__(self, data):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def run(self, query, **params):
+        return RecordStream(self.data.get(query, []))
+
+
+class ProjectionDriver:
+    def __init__(self, data):
+        self.data = data
+
+    def session(self):
+        return ProjectionSession(self.data)
+
+
+def _edge(rel_id, src, dst, rel_type="FEEDS_INTO"):
+    return {
+        "rel_id": rel_id,
+        "from_id": src,
+        "to_id": dst,
+        "rel_type": rel_type,
+        "lineage_source": "manual",
+        "confidence": None,
+    }
+
+
+@pytest.fixture
+async def projection():
+    # a -> b -> c -> d, plus x -> b; fields a.f1 -> b.f2
+    data = {
+        queries.PROJECTION_TABLES: [
+            {"id": t, "name": t.upper(), "source_id": "src"} for t in ("a", "b", "c", "d", "x")
+        ],
+        queries.PROJECTION_FIELDS: [
+            {"id": "a.f1", "name": "f1", "table_id": "a"},
+            {"id": "b.f2", "name": "f2", "table_id": "b"},
+            {"id": "d.f3", "name": "f3", "table_id": "d"},
+            {"id": "c.f4", "name": "f4", "table_id": "c"},
+        ],
+        queries.PROJECTION_EDGES: [
+            _edge(1, "a", "b"),
+            _edge(2, "b", "c"),
+            _edge(3, "c", "d"),
+            _edge(4, "x", "b"),
+            _edge(5, "a.f1", "b.f2", "DERIVES_FROM"),
+        ],
+    }
+    proj = LineageProjection()
+    await proj.load(ProjectionDriver(data))
+    return proj
+
+
+@pytest.mark.anyio
+async def test_traverse_directions(projection):
+    assert projection.traverse("a", "downstream", 2) == {"a": 0, "b": 1, "c": 2}
+    assert projection.traverse("c", "upstream", 5) == {"c": 0, "b": 1, "a": 2, "x": 2}
+    assert projection.traverse("x", "both", 2) == {"x": 0, "b": 1, "a": 2, "c": 2}
+
+
+@pytest.mark.anyio
+async def test_graph_record_includes_fields_and_bounded_edges(projection):
+    record = projection.graph_record("a", "downstream", 2)
+    node_ids = {n["id"] for n in record["nodes"]}
+    assert node_ids == {"a", "b", "c", "a.f1", "b.f2", "c.f4"}
+    rel_ids = {r["id"] for r in record["rels"]}
+    assert rel_ids == {1, 2, 5}
+    assert projection.graph_record("d", "downstream", 3) is None
+
+
+@pytest.mark.anyio
+async def test_graph_record_granularity(projection):
+    tables = projection.graph_record("a", "downstream", 2, granularity="table")
+    assert {n["id"] for n in tables["nodes"]} == {"a", "b", "c"}
+    assert {r["id"] for r in tables["rels"]} == {1, 2}
+
+    lineage_fields = projection.graph_record("a", "downstream", 2, granularity="field")
+    assert {n["id"] for n in lineage_fields["nodes"]} == {"a", "b", "c", "a.f1", "b.f2"}
+    assert {r["id"] for r in lineage_fields["rels"]} == {1, 2, 5}
+
+
+@pytest.mark.anyio
+async def test_incremental_updates(projection):
+    projection.add_edge(6, "d", "a", "FEEDS_INTO")
+    assert projection.traverse("c", "downstream", 3) == {"c": 0, "d": 1, "a": 2, "b": 3}
+    projection.remove_edge(2)
+    assert projection.traverse("a", "downstream", 5) == {"a": 0, "b": 1}
+    projection.remove_node("b")
+    assert projection.traverse("a", "downstream", 5) == {"a": 0}
+    assert projection.graph_record("a", "downstream", 5) is None
+    assert projection.stats()["nodes"] == 7  # b and its field b.f2 are gone
+    projection.upsert_table("b", "B", "src")
+    assert projection.has_table("b")
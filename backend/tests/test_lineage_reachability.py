@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from app.graph.projection import LineageProjection
+from app.services.lineage_service import LineageService
+
+
+def bfs_reachable(edges, src, dst):
+    seen, stack = {src}, [src]
+    while stack:
+        node = stack.pop()
+        for s, t in edges.values():
+            if s == node and t not in seen:
+                seen.add(t)
+                stack.append(t)
+    return dst in seen
+
+
+def ready_projection(tables):
+    projection = LineageProjection()
+    projection.ready = True
+    for t in tables:
+        projection.upsert_table(t, t, "src")
+    return projection
+
+
+def test_index_matches_bfs_under_random_inserts_and_deletes():
+    rng = random.Random(7)
+    tables = [f"t{i}" for i in range(30)]
+    projection = ready_projection(tables)
+    edges = {}
+    for step in range(400):
+        if edges and rng.random() < 0.3:
+            rel = rng.choice(sorted(edges))
+            projection.remove_edge(rel)
+            del edges[rel]
+        else:
+            rel = f"r{step}"
+            # mostly forward edges, occasionally closing a cycle
+            a, b = sorted(rng.sample(range(len(tables)), 2))
+            if rng.random() < 0.1:
+                a, b = b, a
+            edges[rel] = (tables[a], tables[b])
+            projection.add_edge(rel, tables[a], tables[b], "FEEDS_INTO")
+        if step % 20 == 0:
+            for _ in range(40):
+                src, dst = rng.choice(tables), rng.choice(tables)
+                if src != dst:
+                    assert projection.reachable(src, dst) == bfs_reachable(edges, src, dst), (step, src, dst)
+
+
+def test_index_is_patched_in_place_for_acyclic_inserts():
+    projection = ready_projection(["a", "b", "c"])
+    projection.add_edge(1, "a", "b", "FEEDS_INTO")
+    assert projection.reachable("a", "b") is True  # first query builds the index
+    rebuilds = projection.stats()["reachability"]["rebuilds"]
+
+    # c -> a goes against the current topological order and is reordered locally
+    projection.add_edge(2, "c", "a", "FEEDS_INTO")
+    projection.upsert_table("d", "d", "src")
+    projection.add_edge(3, "b", "d", "FEEDS_INTO")
+    assert projection.reachable("c", "d") is True
+    assert projection.reachable("d", "c") is False
+    projection.remove_edge(1)
+    assert projection.reachable("c", "d") is False
+    assert projection.stats()["reachability"]["rebuilds"] == rebuilds
+
+
+@pytest.mark.anyio
+async def test_find_paths_is_pruned_when_target_is_unreachable():
+    projection = ready_projection(["a", "b"])
+
+    class NoNeo4j:
+        def session(self):
+            raise AssertionError("unreachable pairs must not hit Neo4j")
+
+    service = LineageService(NoNeo4j(), projection=projection)
+    result = await service.is_reachable("a", "b")
+    assert result.reachable is False and result.index == "projection"
+    response, _ = await service._build_paths("a", "b", max_depth=5, limit=3, weight="hops")
+    assert response.paths == []
@@ -1,6 +1,8 @@
 import pytest
 from fastapi import HTTPException
 
+from app.services.criticality_index import DIRTY_SOURCES
+from app.services.graph_assembly import assemble
 from app.services.lineage_service import LineageService
 
 
@@ -69,6 +71,18 @@ async def test_delete_lineage_raises_when_missing():
     assert exc.value.status_code == 404
 
 
+@pytest.mark.anyio
+@pytest.mark.parametrize("rel_type, dirty", [("FEEDS_INTO", {"s1"}), ("DERIVES_FROM", set())])
+async def test_delete_lineage_marks_criticality_for_table_edges_only(redis_client, monkeypatch, rel_type, dirty):
+    async def skip(self, method, arg):
+        pass
+
+    monkeypatch.setattr(LineageService, "_update_cycle_index", skip)
+    record = {"deleted_count": 1, "rel_type": rel_type, "touched": ["s1", "t1", None, None]}
+    await LineageService(DummyDriver(responses=[record]), redis=redis_client).delete_lineage("7")
+    assert await redis_client.smembers(DIRTY_SOURCES) == dirty
+
+
 @pytest.mark.anyio
 async def test_to_graph_handles_empty_record():
     driver = DummyDriver(responses=[{}])
@@ -77,3 +91,177 @@ async def test_to_graph_handles_empty_record():
     assert graph.nodes == []
     assert graph.edges == []
     assert graph.root_id == ""
+
+
+class BatchTx:
+    def __init__(self, existing, fail_on=None):
+        self.existing = existing
+        self.fail_on = fail_on
+        self.chunks = []
+
+    async def run(self, query, rows):
+        from neo4j.exceptions import ClientError
+
+        self.chunks.append(rows)
+        if self.fail_on and any(r["source_id"] == self.fail_on for r in rows):
+            raise ClientError("constraint violated")
+        out = [
+            {"idx": r["idx"], "rel_id": 100 + r["idx"]}
+            for r in rows
+            if r["source_id"] in self.existing and r["target_id"] in self.existing
+        ]
+
+        async def stream():
+            for rec in out:
+                yield rec
+
+        return stream()
+
+
+class BatchSession(DummySession):
+    def __init__(self, tx):
+        super().__init__([])
+        self.tx = tx
+
+    async def execute_write(self, fn, *args):
+        return await fn(self.tx, *args)
+
+
+class BatchDriver(DummyDriver):
+    def __init__(self, tx):
+        super().__init__([])
+        self.tx = tx
+
+    def session(self):
+        return BatchSession(self.tx)
+
+
+@pytest.mark.anyio
+async def test_table_lineage_batch_chunks_and_reports_per_row(monkeypatch):
+    from app.config import settings
+    from app.schemas.lineage import TableLineageCreateRequest
+
+    monkeypatch.setattr(settings, "LINEAGE_BATCH_CHUNK_SIZE", 2)
+    tx = BatchTx(existing={"a", "b", "c", "d", "x"}, fail_on="x")
+    service = LineageService(BatchDriver(tx))
+    items = [
+        TableLineageCreateRequest(source_table_id="a", target_table_id="b"),
+        TableLineageCreateRequest(source_table_id="b", target_table_id="missing"),
+        TableLineageCreateRequest(source_table_id="c", target_table_id="d"),
+        TableLineageCreateRequest(source_table_id="x", target_table_id="d"),
+    ]
+
+    result = await service.create_table_lineage_batch(items)
+
+    assert [len(chunk) for chunk in tx.chunks] == [2, 2]
+    assert (result.created, result.failed) == (1, 3)
+    assert result.results[0].relationship.id == "100"
+    assert result.results[1].error == "Source or target table not found"
+    # the whole chunk containing the failing row is reported as failed
+    assert result.results[2].status == result.results[3].status == "error"
+    assert "constraint violated" in result.results[3].error
+
+
+class DummyDbResult:
+    def all(self):
+        return []
+
+
+class DummyDbSession:
+    def __init__(self, field):
+        self.field = field
+
+    async def get(self, model, id_):
+        return self.field
+
+    async def execute(self, stmt):
+        return DummyDbResult()
+
+
+@pytest.mark.anyio
+async def test_trace_field_uses_one_round_trip_and_caps_results(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "LINEAGE_TRACE_MAX_RESULTS", 2)
+    upstream = [
+        {"field_id": f"u{i}", "field_name": f"u{i}", "table_id": "11111111-1111-1111-1111-111111111111", "distance": d, "via": via}
+        for i, (d, via) in enumerate([(1, "f"), (1, "f"), (2, "u0")])
+    ]
+    driver = DummyDriver(responses=[{"upstream": upstream, "downstream": []}])
+    field = SimpleNamespace(id="f", name="f", table_id="22222222-2222-2222-2222-222222222222")
+    service = LineageService(driver, db_session=DummyDbSession(field))
+
+    response, _ = await service._build_trace("f", "both", 5)
+
+    assert len(driver.sessions) == 1 and len(driver.sessions[0].calls) == 1
+    params = driver.sessions[0].calls[0]["params"]
+    assert params["upstream"] and params["downstream"] and params["limit"] == 3
+    assert response.truncated is True
+    assert [(i.field_id, i.distance, i.via_field_id) for i in response.trace_path.upstream] == [
+        ("u0", 1, "f"),
+        ("u1", 1, "f"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_trace_field_overlaps_postgres_and_neo4j_and_records_stages():
+    import asyncio
+    from types import SimpleNamespace
+
+    from app.services.lineage_service import stage_stats
+
+    neo4j_started = asyncio.Event()
+
+    class WaitingDbSession(DummyDbSession):
+        async def get(self, model, id_):
+            # only completes if the Neo4j query was issued without waiting for this lookup
+            await neo4j_started.wait()
+            return self.field
+
+    class SignallingSession(DummySession):
+        async def run(self, query, **params):
+            neo4j_started.set()
+            return await super().run(query, **params)
+
+    class SignallingDriver(DummyDriver):
+        def session(self):
+            return SignallingSession(self.responses)
+
+    field = SimpleNamespace(id="f", name="f", table_id="22222222-2222-2222-2222-222222222222")
+    service = LineageService(
+        SignallingDriver(responses=[{"upstream": [], "downstream": []}]), db_session=WaitingDbSession(field)
+    )
+    response, _ = await asyncio.wait_for(service._run_build("_build_trace", {"field_id": "f", "direction": "both", "depth": 3}), 2)
+
+    assert response.field.id == "f"
+    stats = stage_stats()
+    for stage in ("trace.field", "trace.neo4j", "trace.enrich", "_build_trace.total"):
+        assert stats[stage]["count"] >= 1
+
+
+def test_assemble_dedupes_nodes_and_fills_missing_distances():
+    record = {
+        "root_id": "a",
+        "nodes": [
+            {"id": "a", "name": "a"},
+            {"id": "b", "name": "b", "distance": 3},
+            {"id": "b", "name": "b", "distance": 1},
+            {"id": "c", "name": "c"},
+            {"id": "f", "name": "f", "table_id": "c"},
+        ],
+        "rels": [
+            {"id": 1, "from": "b", "to": "a", "rel_type": "FEEDS_INTO", "lineage_source": "manual"},
+            {"id": 2, "from": "b", "to": "c", "rel_type": "FEEDS_INTO"},
+            {"id": 3, "from": "x"},
+        ],
+    }
+    graph = assemble(record).response({"c": {"source_name": "warehouse"}})
+    nodes = {n.id: n for n in graph.nodes}
+    assert [n.id for n in graph.nodes] == ["a", "b", "c", "f"]
+    assert (nodes["a"].distance, nodes["b"].distance, nodes["c"].distance) == (0, 1, 2)
+    assert nodes["f"].type == "field" and nodes["f"].parent_id == "c"
+    assert nodes["c"].source_name == "warehouse"
+    assert [(e.from_, e.to) for e in graph.edges] == [("b", "a"), ("b", "c")]
+    assert graph.edges[0].lineage_source.value == "manual"
@@ -117,3 +117,22 @@ async def test_tables_and_fields_flow(client: AsyncClient):
     # delete table
     del_table = await client.delete(f"/api/v1/tables/{table_id}")
     assert del_table.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_new_tables_are_listed_when_sorting_by_criticality(client: AsyncClient):
+    source_resp = await client.post(
+        "/api/v1/sources",
+        json={"name": "Source C", "type": "postgresql", "connection_config": {"host": "h"}},
+    )
+    source_id = source_resp.json()["id"]
+    table_resp = await client.post(
+        "/api/v1/tables", json={"source_id": source_id, "name": "fresh", "type": "table"}
+    )
+    table_id = table_resp.json()["id"]
+
+    # not measured yet: listed with zeros rather than dropped by the criticality join
+    list_resp = await client.get("/api/v1/tables", params={"sort": "downstream_count", "source_id": source_id})
+    assert [t["id"] for t in list_resp.json()["items"]] == [table_id]
+    list_resp = await client.get("/api/v1/tables", params={"min_downstream": 1, "source_id": source_id})
+    assert list_resp.json()["total"] == 0
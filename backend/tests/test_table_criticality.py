@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from app.graph.criticality import Reach, estimate, merge, node_hash, pack, propagate, unpack
+from app.services.criticality_index import DIRTY_SOURCES, DIRTY_TARGETS, CriticalityIndex, mark_criticality_dirty
+
+
+def reachable(succ, start):
+    seen, stack = set(), [start]
+    while stack:
+        for nxt in succ.get(stack.pop(), ()):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    seen.discard(start)
+    return seen
+
+
+def random_graph(seed, n=60, m=120):
+    rng = random.Random(seed)
+    nodes = [f"t{i}" for i in range(n)]
+    succ = {t: [] for t in nodes}
+    for _ in range(m):
+        a, b = rng.sample(range(n), 2)
+        if a > b and rng.random() > 0.05:  # mostly acyclic, a few cycles
+            a, b = b, a
+        succ[nodes[a]].append(nodes[b])
+    domains = {t: f"d{rng.randrange(6)}" if rng.random() > 0.2 else None for t in nodes}
+    return nodes, succ, domains
+
+
+def test_propagate_is_exact_below_the_sketch_size():
+    nodes, succ, domains = random_graph(3)
+    metrics = propagate(nodes, succ, domains, k=len(nodes) + 1)
+    for t in nodes:
+        below = reachable(succ, t)
+        assert metrics[t].count == len(below), t
+        assert metrics[t].domains == len({domains[x] for x in below if domains[x]}), t
+
+
+def test_sketch_estimates_large_sets():
+    k = 64
+    sketch = merge([sorted(node_hash(f"n{i}") for i in range(20000))], k)
+    assert len(sketch) == k
+    assert abs(estimate(sketch, k) - 20000) < 20000 * 0.4
+    assert unpack(pack(sketch)) == sketch
+
+
+def test_region_seeded_from_boundary_matches_full_pass():
+    nodes, succ, domains = random_graph(11)
+    k = 16
+    full = propagate(nodes, succ, domains, k)
+
+    # recompute only the ancestors of one node, as after a write on its out-edges
+    pred = {t: [] for t in nodes}
+    for s, outs in succ.items():
+        for t in outs:
+            pred[t].append(s)
+    seed = "t30"
+    region = reachable(pred, seed) | {seed}
+    boundary = {
+        t: Reach(full[t].reach.sketch, full[t].reach.domains, full[t].reach.depth)
+        for s in region
+        for t in succ[s]
+        if t not in region
+    }
+    partial = propagate(region, succ, domains, k, boundary)
+    for t in region:
+        assert partial[t] == full[t], t
+
+
+@pytest.mark.anyio
+async def test_refresh_requeues_dirty_tables_when_the_update_fails(redis_client):
+    await mark_criticality_dirty(redis_client, [("a", "b"), ("a", "c")])
+    assert await redis_client.smembers(DIRTY_SOURCES) == {"a"}
+    assert await redis_client.smembers(DIRTY_TARGETS) == {"b", "c"}
+
+    class Broken(CriticalityIndex):
+        async def update(self, sources, targets):
+            raise RuntimeError("neo4j down")
+
+    with pytest.raises(RuntimeError):
+        await Broken(driver=None, redis=redis_client).refresh()
+    assert await redis_client.smembers(DIRTY_SOURCES) == {"a"}
+    assert await redis_client.smembers(DIRTY_TARGETS) == {"b", "c"}
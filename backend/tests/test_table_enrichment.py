@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+
+from app.repositories.table_repo import TableRepository
+from app.services.table_enrichment import ENRICH_PREFIX, TableEnrichmentCache
+
+
+def row(table_id, name):
+    return {"id": table_id, "name": name, "primary_tag_id": None, "primary_tag": None, "source_id": None, "source_name": "s"}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    names = {}
+    calls = []
+
+    async def fake(self, table_ids):
+        calls.append(sorted(str(t) for t in table_ids))
+        return {str(t): row(str(t), names[str(t)]) for t in table_ids if str(t) in names}
+
+    monkeypatch.setattr(TableRepository, "get_tables_with_primary_tags", fake)
+    return names, calls
+
+
+@pytest.mark.anyio
+async def test_only_misses_reach_postgres(redis_client, lookups):
+    names, calls = lookups
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+    names.update({a: "orders", b: "customers"})
+    cache = TableEnrichmentCache(redis_client)
+
+    first = await cache.get_many(None, [a, "graph-only-id"])
+    assert first[a]["name"] == "orders"
+    both = await cache.get_many(None, [a, b])
+    assert {t: r["name"] for t, r in both.items()} == {a: "orders", b: "customers"}
+    assert calls == [[a], [b]]
+
+
+@pytest.mark.anyio
+async def test_invalidation_drops_entries_and_skips_racing_fills(redis_client, lookups, monkeypatch):
+    names, calls = lookups
+    a = str(uuid.uuid4())
+    names[a] = "orders"
+    cache = TableEnrichmentCache(redis_client)
+    await cache.get_many(None, [a])
+
+    names[a] = "orders_v2"
+    await cache.invalidate([a])
+    assert await redis_client.get(ENRICH_PREFIX + a) is None
+    assert (await cache.get_many(None, [a]))[a]["name"] == "orders_v2"
+
+    # a change committed while Postgres is being read must not be written back stale
+    async def racing(self, table_ids):
+        await cache.drop([a])
+        return {a: row(a, "stale")}
+
+    await cache.drop([a])
+    monkeypatch.setattr(TableRepository, "get_tables_with_primary_tags", racing)
+    assert (await cache.get_many(None, [a]))[a]["name"] == "stale"
+    assert await redis_client.get(ENRICH_PREFIX + a) is None
@@ -5,7 +5,7 @@ const USE_MOCKS = import.meta.env.VITE_USE_MOCKS === 'true';
 const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
 
 export const lineageApi = {
-  getGraph: async (params: { table_id: string; direction: string; depth?: number }) => {
+  getGraph: async (params: { table_id: string; direction: string; depth?: number; granularity?: 'table' | 'field' | 'all' }) => {
     if (USE_MOCKS) {
       await sleep(600);
       return {
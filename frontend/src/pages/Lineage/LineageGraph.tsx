@@ -311,7 +311,8 @@ const LineageGraphContent: React.FC = () => {
     
     try {
       setIsFirstLoad(true);
-      const params = { table_id: tableId, direction, depth };
+      // table boxes list every column, so request all fields explicitly
+      const params = { table_id: tableId, direction, depth, granularity: 'all' };
       const data = await client.get<any, any>(`/lineage/graph`, { params });
       
       // Only update if this is still the latest request
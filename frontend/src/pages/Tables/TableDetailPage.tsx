@@ -75,7 +75,7 @@ const TableDetailPage: React.FC = () => {
   const loadLineage = async (tableId: string) => {
     try {
       // Call unified API for depth 1 to get immediate neighbors
-      const data = await lineageApi.getGraph({ table_id: tableId, direction: 'both', depth: 1 });
+      const data = await lineageApi.getGraph({ table_id: tableId, direction: 'both', depth: 1, granularity: 'table' });
       
       const upstreamEdges = (data.edges || []).filter(e => (e.to || e.target_id) === tableId);
       const downstreamEdges = (data.edges || []).filter(e => (e.from || e.source_id) === tableId);